@@ -6,8 +6,10 @@ from pathlib import Path
 from fastapi import APIRouter, HTTPException, status
 
 from app.models.auth import LoginRequest, RegisterRequest, TokenResponse
+from app.storage.aio import AsyncStore
 from app.storage.users_store import UsersStore
 from app.utils.auth_hash import hash_password, verify_password
+from app.utils.hash_pool import HashPoolBusy, get_hash_pool
 from app.utils.jwt_auth import create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -15,25 +17,38 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 DEFAULT_DATA_DIR = Path(__file__).resolve().parents[3] / "data"
 DATA_DIR = Path(os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
 users = UsersStore(DATA_DIR)
+ausers = AsyncStore(users)
+
+
+async def _hash_job(fn, *args):
+    # bcrypt runs on the hashing process pool; when it is saturated fail fast
+    try:
+        return await get_hash_pool().run(fn, *args)
+    except HashPoolBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(req: RegisterRequest):
-    if users.get(req.user_id) is not None:
+async def register(req: RegisterRequest):
+    if await ausers.get(req.user_id) is not None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User exists")
 
-    hpw = hash_password(req.password)  # corect: nu stoca niciodată plaintext
-    users.create(req.user_id, hpw)
+    hpw = await _hash_job(hash_password, req.password)  # corect: nu stoca niciodată plaintext
+    await ausers.create(req.user_id, hpw)
     return {"user_id": req.user_id}
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(req: LoginRequest):
-    rec = users.get(req.user_id)
+async def login(req: LoginRequest):
+    rec = await ausers.get(req.user_id)
     if rec is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    if not verify_password(req.password, rec.hashed_password):
+    if not await _hash_job(verify_password, req.password, rec.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     token = create_access_token(subject=req.user_id)
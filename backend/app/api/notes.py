@@ -1,36 +1,62 @@
+from datetime import datetime
 from pathlib import Path
 from uuid import UUID
+import base64
+import json
+import logging
 import uuid
 import os
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from app.models.notes import NoteCreate, NoteOut, NoteUpdate
-from app.storage.notes_store import NotesStore
-from app.storage.locks_store import LocksStore
-from app.storage.event_log import EventLog, Event
+from app.models.notes import (
+    NoteBatchCreate,
+    NoteBatchGet,
+    NoteBatchOut,
+    NoteBatchUpdate,
+    NoteCreate,
+    NoteOut,
+    NoteSearchHitOut,
+    NoteSummaryOut,
+    NoteUpdate,
+)
+from app.storage.engine import open_engine
+from app.storage.event_log import Event
+from app.storage.aio import AsyncStore, get_executor
 from app.utils.jwt_auth import get_current_user
 
 router = APIRouter(prefix="/notes", tags=["notes"])
+log = logging.getLogger(__name__)
 
 # DATA_DIR config via env var
 DEFAULT_DATA_DIR = Path(__file__).resolve().parents[3] / "data"
 DATA_DIR = Path(os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
-store = NotesStore(DATA_DIR)
+
+# storage engine: "files" (default) or "sqlite", via STORAGE_ENGINE
+engine = open_engine(DATA_DIR)
+store = engine.notes()
+
+# max items per batch request (NOTES_BATCH_MAX)
+BATCH_MAX = int(os.getenv("NOTES_BATCH_MAX", "100"))
 
 # TTL config (now via env)
 LOCK_TTL_SECONDS = int(os.getenv("LOCK_TTL_SECONDS", "300"))
 
 # Day 4: event log + pass it into LocksStore for LOCK_EXPIRED
-event_log = EventLog(DATA_DIR)
-locks = LocksStore(DATA_DIR, default_ttl_seconds=LOCK_TTL_SECONDS, event_log=event_log)
+event_log = engine.event_log()
+locks = engine.locks(default_ttl_seconds=LOCK_TTL_SECONDS, event_log=event_log)
+
+# async views: blocking store I/O runs on the dedicated storage executor (STORE_IO_WORKERS)
+astore = AsyncStore(store)
+alocks = AsyncStore(locks)
+aevents = AsyncStore(event_log)
 
 
 @router.post("", response_model=NoteOut, status_code=201)
-def create_note(payload: NoteCreate, user_id: str = Depends(get_current_user)) -> NoteOut:
-    note = store.create_note(user_id=user_id, title=payload.title, content=payload.content)
+async def create_note(payload: NoteCreate, user_id: str = Depends(get_current_user)) -> NoteOut:
+    note = await astore.create_note(user_id=user_id, title=payload.title, content=payload.content)
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="NOTE_CREATED",
         user_id=user_id,
         note_id=str(note.id),
@@ -40,15 +66,198 @@ def create_note(payload: NoteCreate, user_id: str = Depends(get_current_user)) -
     return NoteOut(**note.to_dict())
 
 
-@router.get("", response_model=list[NoteOut])
-def list_notes(user_id: str = Depends(get_current_user)) -> list[NoteOut]:
-    notes = store.list_notes(user_id=user_id)
-    return [NoteOut(**n.to_dict()) for n in notes]
+# ==========================================================
+# Batch endpoints
+# ==========================================================
+# One request, one auth check and one executor hop for up to BATCH_MAX notes. Each item
+# gets its own result ({status, note} or {status, error}, in request order); the events
+# of the items that succeeded are appended with one write + fsync (emit_many).
+#
+# The notes are written before their events are appended. A failed append is retried
+# once (it is rolled back, so this cannot duplicate events); if that fails too, it is
+# logged and the items it covered report 500, as POST/PUT /notes do when the event is
+# not recorded: the write is not replicated until the client writes the note again.
+
+
+def _check_batch_size(n: int) -> None:
+    if n > BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {BATCH_MAX})")
+
+
+def _emit_batch_events(events: list[Event], results: list[dict], at: list[int]) -> None:
+    """Append the events; on failure, mark their items (`results[at[i]]`) as failed."""
+    try:
+        event_log.emit_many(events)
+    except Exception:
+        try:
+            event_log.emit_many(events)
+        except Exception:
+            log.exception("%d note events of user %s not appended", len(events), events[0].user_id)
+            for i in at:
+                results[i] = {"status": 500, "error": "Event append failed"}
+
+
+def _batch_create(user_id: str, items: list[NoteCreate]) -> list[dict]:
+    results, events, at = [], [], []
+    for item in items:
+        try:
+            note = store.create_note(user_id=user_id, title=item.title, content=item.content)
+        except OSError:
+            results.append({"status": 500, "error": "Write failed"})
+            continue
+        at.append(len(results))
+        results.append({"status": 201, "note": note.to_dict()})
+        events.append(Event(
+            event_type="NOTE_CREATED",
+            user_id=user_id,
+            note_id=str(note.id),
+            meta={"version": note.version},
+        ))
+    _emit_batch_events(events, results, at)
+    return results
+
+
+def _batch_get(user_id: str, ids: list[UUID]) -> list[dict]:
+    results = []
+    for nid in ids:
+        note = store.get_note(user_id=user_id, note_id=uuid.UUID(str(nid)))
+        if note is None:
+            results.append({"status": 404, "error": "Note not found"})
+        else:
+            results.append({"status": 200, "note": note.to_dict()})
+    return results
+
+
+def _batch_update(user_id: str, items: list) -> list[dict]:
+    results, events, at = [], [], []
+    for item in items:
+        nid = uuid.UUID(str(item.id))
+        if store.get_note(user_id=user_id, note_id=nid) is None:
+            results.append({"status": 404, "error": "Note not found"})
+            continue
+        if not locks.require_valid_lock(user_id=user_id, note_id=nid, lock_id=uuid.UUID(str(item.lock_id))):
+            results.append({"status": 409, "error": "Valid lock required"})
+            continue
+        try:
+            updated = store.update_note(user_id=user_id, note_id=nid, title=item.title, content=item.content)
+        except OSError:
+            results.append({"status": 500, "error": "Write failed"})
+            continue
+        if updated is None:
+            results.append({"status": 404, "error": "Note not found"})
+            continue
+        at.append(len(results))
+        results.append({"status": 200, "note": updated.to_dict()})
+        events.append(Event(
+            event_type="NOTE_UPDATED",
+            user_id=user_id,
+            note_id=str(nid),
+            lock_id=str(item.lock_id),
+            meta={"version": updated.version},
+        ))
+    _emit_batch_events(events, results, at)
+    return results
+
+
+@router.post(":batchCreate", response_model=NoteBatchOut, response_model_exclude_none=True)
+async def batch_create(payload: NoteBatchCreate, user_id: str = Depends(get_current_user)) -> dict:
+    _check_batch_size(len(payload.items))
+    return {"results": await get_executor().run(_batch_create, user_id, payload.items)}
+
+
+@router.post(":batchGet", response_model=NoteBatchOut, response_model_exclude_none=True)
+async def batch_get(payload: NoteBatchGet, user_id: str = Depends(get_current_user)) -> dict:
+    _check_batch_size(len(payload.ids))
+    return {"results": await get_executor().run(_batch_get, user_id, payload.ids)}
+
+
+@router.put(":batchUpdate", response_model=NoteBatchOut, response_model_exclude_none=True)
+async def batch_update(payload: NoteBatchUpdate, user_id: str = Depends(get_current_user)) -> dict:
+    """Same rules per item as PUT /notes/{id}: each item needs a valid lock_id for its note."""
+    _check_batch_size(len(payload.items))
+    return {"results": await get_executor().run(_batch_update, user_id, payload.items)}
+
+
+def _encode_cursor(sort: str, order: str, updated_since: datetime | None, key: tuple[int, str]) -> str:
+    raw = {"s": sort, "o": order, "u": updated_since.isoformat() if updated_since else None, "k": list(key)}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort: str, order: str, updated_since: datetime | None) -> tuple[int, str]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        key = (int(raw["k"][0]), str(raw["k"][1]))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # a cursor only makes sense for the query that produced it
+    if raw.get("s") != sort or raw.get("o") != order or raw.get("u") != (updated_since.isoformat() if updated_since else None):
+        raise HTTPException(status_code=400, detail="Cursor does not match query")
+    return key
+
+
+# listing is served from the per-user manifest: no note bodies are read.
+# Next page (if any) is announced via the X-Next-Cursor response header.
+@router.get("", response_model=list[NoteSummaryOut])
+async def list_notes(
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: str | None = None,
+    sort: str = Query(default="updated_at", pattern="^(updated_at|created_at)$"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$"),
+    updated_since: datetime | None = None,
+    user_id: str = Depends(get_current_user),
+) -> list[NoteSummaryOut]:
+    after = _decode_cursor(cursor, sort, order, updated_since) if cursor else None
+    notes, next_key = await astore.page_summaries(
+        user_id=user_id,
+        limit=limit,
+        after=after,
+        sort=sort,
+        descending=order == "desc",
+        updated_since=updated_since,
+    )
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort, order, updated_since, next_key)
+    return [NoteSummaryOut(**n.to_dict()) for n in notes]
+
+
+def _encode_search_cursor(q: str, key: tuple[float, str]) -> str:
+    raw = {"q": q, "k": list(key)}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def _decode_search_cursor(cursor: str, q: str) -> tuple[float, str]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        key = (float(raw["k"][0]), str(raw["k"][1]))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if raw.get("q") != q:
+        raise HTTPException(status_code=400, detail="Cursor does not match query")
+    return key
+
+
+# full-text search (per-user inverted index, see app.storage.search_index); declared
+# before /{note_id} so "search" is not taken for a note id. Ranked by score, next page
+# via X-Next-Cursor like GET /notes.
+@router.get("/search", response_model=list[NoteSearchHitOut])
+async def search_notes(
+    response: Response,
+    q: str = Query(min_length=1, max_length=500),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    user_id: str = Depends(get_current_user),
+) -> list[NoteSearchHitOut]:
+    after = _decode_search_cursor(cursor, q) if cursor else None
+    hits, next_key = await astore.search(user_id=user_id, q=q, limit=limit, after=after)
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = _encode_search_cursor(q, next_key)
+    return [NoteSearchHitOut(**h.to_dict()) for h in hits]
 
 
 @router.get("/{note_id}", response_model=NoteOut)
-def get_note(note_id: UUID, user_id: str = Depends(get_current_user)) -> NoteOut:
-    note = store.get_note(user_id=user_id, note_id=uuid.UUID(str(note_id)))
+async def get_note(note_id: UUID, user_id: str = Depends(get_current_user)) -> NoteOut:
+    note = await astore.get_note(user_id=user_id, note_id=uuid.UUID(str(note_id)))
     if note is None:
         raise HTTPException(status_code=404, detail="Note not found")
     return NoteOut(**note.to_dict())
@@ -56,13 +265,13 @@ def get_note(note_id: UUID, user_id: str = Depends(get_current_user)) -> NoteOut
 
 # Day 3: Locking
 @router.post("/{note_id}/lock")
-def acquire_lock(note_id: UUID, user_id: str = Depends(get_current_user)) -> dict:
+async def acquire_lock(note_id: UUID, user_id: str = Depends(get_current_user)) -> dict:
     nid = uuid.UUID(str(note_id))
-    lock = locks.acquire_lock(user_id=user_id, note_id=nid)
+    lock = await alocks.acquire_lock(user_id=user_id, note_id=nid)
     if lock is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="LOCK_ACQUIRED",
         user_id=user_id,
         note_id=str(note_id),
@@ -75,11 +284,11 @@ def acquire_lock(note_id: UUID, user_id: str = Depends(get_current_user)) -> dic
 
 # Day 4 stabilization: make DELETE idempotent (recommended)
 @router.delete("/{note_id}/lock", status_code=204)
-def release_lock(note_id: UUID, user_id: str = Depends(get_current_user)) -> None:
+async def release_lock(note_id: UUID, user_id: str = Depends(get_current_user)) -> None:
     nid = uuid.UUID(str(note_id))
-    locks.release_lock(user_id=user_id, note_id=nid)
+    await alocks.release_lock(user_id=user_id, note_id=nid)
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="LOCK_RELEASED",
         user_id=user_id,
         note_id=str(note_id),
@@ -90,21 +299,21 @@ def release_lock(note_id: UUID, user_id: str = Depends(get_current_user)) -> Non
 
 # Day 3: Update (requires lock)
 @router.put("/{note_id}", response_model=NoteOut)
-def update_note(note_id: UUID, payload: NoteUpdate, user_id: str = Depends(get_current_user)) -> NoteOut:
+async def update_note(note_id: UUID, payload: NoteUpdate, user_id: str = Depends(get_current_user)) -> NoteOut:
     nid = uuid.UUID(str(note_id))
 
-    existing = store.get_note(user_id=user_id, note_id=nid)
+    existing = await astore.get_note(user_id=user_id, note_id=nid)
     if existing is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    if not locks.require_valid_lock(user_id=user_id, note_id=nid, lock_id=uuid.UUID(str(payload.lock_id))):
+    if not await alocks.require_valid_lock(user_id=user_id, note_id=nid, lock_id=uuid.UUID(str(payload.lock_id))):
         raise HTTPException(status_code=409, detail="Valid lock required")
 
-    updated = store.update_note(user_id=user_id, note_id=nid, title=payload.title, content=payload.content)
+    updated = await astore.update_note(user_id=user_id, note_id=nid, title=payload.title, content=payload.content)
     if updated is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="NOTE_UPDATED",
         user_id=user_id,
         note_id=str(note_id),
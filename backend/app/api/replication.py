@@ -1,81 +1,246 @@
+from contextlib import ExitStack
+from dataclasses import dataclass
 from pathlib import Path
 import json
 import os
-from typing import List
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Query
 from fastapi import Request, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from app.utils.compression import StreamCompressor, pick_encoding
 from app.utils.replication_auth import verify_replication_token
+from app.utils.text_delta import apply_delta, content_hash, make_delta
 
+from app.storage import merkle
+from app.storage.engine import open_engine
 from app.storage.event_log import Event
-from app.storage.event_log import _events_path
-from app.storage.notes_store import NotesStore
+from app.storage.seen_events import SeenEventsStore, UserSeenEvents
+from app.storage.aio import get_executor
 
 router = APIRouter(prefix="/replicate", tags=["replication"])
 
 # DATA_DIR config via env var (consistent with other modules)
 DEFAULT_DATA_DIR = Path(__file__).resolve().parents[3] / "data"
 DATA_DIR = Path(os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
-store = NotesStore(DATA_DIR)
+engine = open_engine(DATA_DIR)
+store = engine.notes()
+event_log = engine.event_log()
+seen_store = SeenEventsStore(DATA_DIR)
 
+NDJSON = "application/x-ndjson"
+# events read + enriched per executor hop while streaming
+STREAM_CHUNK = int(os.getenv("REPL_STREAM_CHUNK", "64"))
 
-def _read_events_for_user(base_dir: Path, user_id: str) -> List[dict]:
-    p = _events_path(base_dir, user_id)
-    if not p.exists():
-        return []
-    out = []
-    for line in p.read_text(encoding="utf-8").splitlines():
-        if not line.strip():
-            continue
-        try:
-            out.append(json.loads(line))
-        except Exception:
-            continue
-    return out
+
+@dataclass(frozen=True)
+class PullShape:
+    """How a pulled batch is enriched (query flags of GET /replicate/events)."""
+
+    coalesce: bool = False
+    delta: bool = False
 
 
 @router.get("/events")
-def get_events(user_id: str, since_event_id: str | None = None, limit: int = 100) -> List[dict]:
+async def get_events(
+    request: Request,
+    user_id: str,
+    since_event_id: str | None = None,
+    since_seq: int | None = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=0),
+    coalesce: bool = False,
+    delta: bool = False,
+) -> List[dict]:
     """
     Return replication-ready events for a given user. For note-related events the result
     is enriched with a `payload` field containing the full note JSON (so the receiver can apply it).
+    Every event carries a monotonic per-user `seq`; pass the last one seen as `since_seq`
+    to resume. `since_event_id` (UUID cursor) is still accepted for older clients.
+
+    With `Accept: application/x-ndjson` the events are streamed one JSON object per line,
+    read and enriched a chunk at a time, and compressed with gzip or zstd if the client
+    allows it in Accept-Encoding.
+
+    `coalesce=true` still returns every event, but each note's payload is read and attached
+    only once per batch (streamed: per chunk), on that note's last event; the earlier ones
+    carry `payload_event_id` pointing at it.
+
+    `delta=true` replaces the payload of a NOTE_UPDATED with `payload_delta` (a diff of
+    title/content against the previous version, identified by `base_version` and
+    `base_hash`) when that version is still retained and the diff is smaller. Only for
+    a note's sole event in the batch (streamed: chunk) whose version is the note's
+    current one: the receiver is then at the previous version. A note updated more than
+    once since the cursor gets its full payload.
+
+    Old log segments are only deleted once every known peer has acknowledged them (POST
+    /replicate/ack). A cursor older than the retained log gets 410: bootstrap from
+    /replicate/snapshot instead.
     """
-    events = _read_events_for_user(DATA_DIR, user_id)
+    try:
+        since_seq = await get_executor().run(_open_cursor, user_id, since_event_id, since_seq)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    if since_seq is None:
+        raise HTTPException(status_code=410, detail="Cursor is older than the retained event log; bootstrap from /replicate/snapshot")
+
+    shape = PullShape(coalesce=coalesce, delta=delta)
+    if _wants_ndjson(request.headers.get("accept")):
+        encoding = pick_encoding(request.headers.get("accept-encoding"))
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return StreamingResponse(
+            _stream_events(user_id, since_event_id, since_seq, limit, shape, encoding),
+            media_type=NDJSON,
+            headers=headers,
+        )
+    return await get_executor().run(_collect_events, user_id, since_event_id, since_seq, limit, shape)
+
+
+def _wants_ndjson(accept: Optional[str]) -> bool:
+    if not accept:
+        return False
+    return any(part.split(";")[0].strip().lower() == NDJSON for part in accept.split(","))
 
-    # find start index
-    start = 0
+
+def _resolve_cursor(user_id: str, since_event_id: str | None, since_seq: int | None) -> int:
+    if since_seq is not None:
+        return since_seq
     if since_event_id:
-        for i, e in enumerate(events):
-            if e.get("event_id") == since_event_id:
-                start = i + 1
-                break
-
-    selected = events[start : start + limit]
-
-    # enrich
-    enriched = []
-    for e in selected:
-        ee = dict(e)
-        note_id = ee.get("note_id")
-        if ee.get("event_type") in ("NOTE_CREATED", "NOTE_UPDATED") and note_id:
-            # attempt to include current note content from storage
-            try:
-                from uuid import UUID
-                nid = UUID(str(note_id))
-                note_obj = store.get_note(user_id=ee.get("user_id"), note_id=nid)
-                if note_obj:
+        # unknown cursor -> start from the beginning (previous behavior)
+        return event_log.seq_for_event_id(user_id, since_event_id) or 0
+    return 0
+
+
+def _carries_note(e: dict) -> bool:
+    return e.get("event_type") in ("NOTE_CREATED", "NOTE_UPDATED") and bool(e.get("note_id"))
+
+
+def _open_cursor(user_id: str, since_event_id: str | None, since_seq: int | None) -> Optional[int]:
+    cursor = _resolve_cursor(user_id, since_event_id, since_seq)
+    if cursor < event_log.first_seq(user_id) - 1:
+        return None
+    return cursor
+
+
+def _delta_base_ok(e: dict, note) -> bool:
+    """The event is the note's latest update, so its receiver holds the version before it."""
+    meta = e.get("meta") or {}
+    return e.get("event_type") == "NOTE_UPDATED" and meta.get("version") == note.version
+
+
+def _enrich(e: dict, delta: bool = False) -> dict:
+    """`delta`: the caller checked this is the note's only event in the batch."""
+    ee = dict(e)
+    if _carries_note(ee):
+        # attempt to include current note content from storage
+        try:
+            from uuid import UUID
+            nid = UUID(str(ee["note_id"]))
+            note_obj = store.get_note(user_id=ee.get("user_id"), note_id=nid)
+            if note_obj:
+                d = _note_delta(note_obj) if delta and _delta_base_ok(ee, note_obj) else None
+                if d is not None:
+                    ee["payload_delta"] = d
+                else:
                     ee["payload"] = note_obj.to_dict()
-            except Exception:
-                pass
-        enriched.append(ee)
+        except Exception:
+            pass
+    return ee
+
 
-    return enriched
+def _note_delta(note) -> Optional[dict]:
+    prev = store.get_previous(user_id=note.owner_user_id, note_id=note.id)
+    if prev is None or prev.version != note.version - 1:
+        return None
+    d = {
+        "id": str(note.id),
+        "owner_user_id": note.owner_user_id,
+        "created_at": note.created_at,
+        "updated_at": note.updated_at,
+        "version": note.version,
+        "base_version": prev.version,
+        "base_hash": content_hash(prev.content),
+        "hash": content_hash(note.content),
+        "title": note.title,
+        "content": make_delta(prev.content, note.content),
+    }
+    # not worth it for short notes or rewrites
+    if len(d["content"]["t"]) + 160 >= len(note.content):
+        return None
+    return d
 
 
-def _ensure_replication_dir(base_dir: Path, user_id: str) -> Path:
-    p = base_dir / "replication" / user_id
-    p.mkdir(parents=True, exist_ok=True)
-    return p
+def _enrich_batch(events: List[dict], shape: PullShape) -> List[dict]:
+    # per note: its last event and how many events it has in the batch (a delta only
+    # fits a receiver one version behind, i.e. a note with a single event here)
+    last_for: dict[tuple, str] = {}
+    count: dict[tuple, int] = {}
+    for e in events:
+        if _carries_note(e):
+            key = (e.get("user_id"), str(e["note_id"]))
+            last_for[key] = e.get("event_id")
+            count[key] = count.get(key, 0) + 1
+
+    def single(e: dict) -> bool:
+        return shape.delta and count[(e.get("user_id"), str(e["note_id"]))] == 1
+
+    if not shape.coalesce:
+        return [_enrich(e, single(e)) if _carries_note(e) else dict(e) for e in events]
+    # the payload is the note's *current* state either way, so one read on the last
+    # event per note carries everything the earlier events would have
+    out = []
+    for e in events:
+        if not _carries_note(e):
+            out.append(dict(e))
+            continue
+        carrier = last_for[(e.get("user_id"), str(e["note_id"]))]
+        if e.get("event_id") == carrier:
+            out.append(_enrich(e, single(e)))
+        else:
+            out.append({**e, "payload_event_id": carrier})
+    return out
+
+
+def _collect_events(
+    user_id: str, since_event_id: str | None, since_seq: int | None, limit: int, shape: PullShape = PullShape()
+) -> List[dict]:
+    since_seq = _resolve_cursor(user_id, since_event_id, since_seq)
+    selected = event_log.read_events(user_id, since_seq=since_seq, limit=limit)
+    return _enrich_batch(selected, shape)
+
+
+def _read_chunk(user_id: str, since_seq: int, limit: int, shape: PullShape = PullShape()) -> tuple[bytes, int, int]:
+    """Next chunk as NDJSON bytes, plus (last seq, event count)."""
+    events = list(event_log.iter_events(user_id, since_seq=since_seq, limit=limit))
+    if not events:
+        return b"", since_seq, 0
+    lines = [json.dumps(e, ensure_ascii=False) for e in _enrich_batch(events, shape)]
+    return ("\n".join(lines) + "\n").encode("utf-8"), int(events[-1].get("seq", since_seq)), len(events)
+
+
+async def _stream_events(
+    user_id: str,
+    since_event_id: str | None,
+    since_seq: int | None,
+    limit: int,
+    shape: PullShape,
+    encoding: Optional[str],
+) -> AsyncIterator[bytes]:
+    executor = get_executor()
+    compressor = StreamCompressor(encoding)
+    cursor = await executor.run(_resolve_cursor, user_id, since_event_id, since_seq)
+    remaining = limit
+    while remaining > 0:
+        # each hop resumes from the last seq, so no reader state is held across threads
+        data, cursor, n = await executor.run(_read_chunk, user_id, cursor, min(STREAM_CHUNK, remaining), shape)
+        if n == 0:
+            break
+        remaining -= n
+        yield compressor.compress(data)
+    tail = compressor.finish()
+    if tail:
+        yield tail
 
 
 @router.post("/events")
@@ -86,6 +251,8 @@ async def post_events(
     """
     Accept a batch of enriched events and apply them idempotently.
     Payload: JSON array of event objects (as returned by GET /replicate/events).
+    Events whose `payload_delta` does not fit the local note are left unapplied and
+    listed in `need_full`; the sender should resend them with a full payload.
     SECURITY: requires X-Replication-Token (HMAC) computed over raw request body.
     """
 
@@ -112,54 +279,328 @@ async def post_events(
     if not isinstance(body, list):
         raise HTTPException(status_code=400, detail="Expected a JSON array")
 
+    # apply on the storage executor: note writes fsync and must not block the event loop
+    applied, need_full = await get_executor().run(_apply_events, body)
+    result: dict = {"applied": applied}
+    if need_full:
+        result["need_full"] = need_full
+    return result
+
+
+def _apply_events(body: list) -> tuple[int, list[str]]:
+    # each user's dedup set stays pinned (not evicted) until its new ids are persisted
+    with ExitStack() as pins:
+        return _apply_events_pinned(body, pins)
+
+
+def _apply_events_pinned(body: list, pins: ExitStack) -> tuple[int, list[str]]:
     applied = 0
+    need_full: list[str] = []
+    # dedup sets stay resident across batches; ids are persisted once per user per batch
+    seen_by_user: dict[str, UserSeenEvents] = {}
+    newly_seen: dict[str, set[str]] = {}
     for e in body:
         event_id = e.get("event_id")
         user_id = e.get("user_id")
         if not event_id or not user_id:
             continue
 
-        rep_dir = _ensure_replication_dir(DATA_DIR, user_id)
-        seen_file = rep_dir / "seen_events.txt"
-        seen = set()
-        if seen_file.exists():
-            seen = set(
-                x.strip()
-                for x in seen_file.read_text(encoding="utf-8").splitlines()
-                if x.strip()
-            )
-
-        if event_id in seen:
+        seen = seen_by_user.get(user_id)
+        if seen is None:
+            try:
+                seen = seen_by_user[user_id] = pins.enter_context(seen_store.pinned(user_id))
+            except ValueError:
+                continue
+
+        if seen.contains(event_id) or event_id in newly_seen.get(user_id, ()):
             continue
 
         # apply event
         etype = e.get("event_type")
-        if etype in ("NOTE_CREATED", "NOTE_UPDATED"):
-            payload = e.get("payload") or {}
+        if etype in ("NOTE_CREATED", "NOTE_UPDATED") and "payload_delta" in e:
+            try:
+                ok = _apply_note_delta(user_id, e["payload_delta"])
+            except Exception:
+                ok = False
+            if not ok:
+                # not marked seen: the full payload must still be applied
+                need_full.append(event_id)
+                continue
+        elif etype in ("NOTE_CREATED", "NOTE_UPDATED"):
             try:
-                from uuid import UUID
-
-                nid = UUID(str(payload.get("id"))) if payload.get("id") else None
-                if nid is not None:
-                    existing = store.get_note(user_id=user_id, note_id=nid)
-                    incoming_version = int(payload.get("version", 1))
-                    if existing is None:
-                        store.apply_note_raw(payload)
-                    else:
-                        if incoming_version > existing.version:
-                            store.apply_note_raw(payload)
+                _apply_note_payload(user_id, e.get("payload") or {})
             except Exception:
                 # ignore apply failures for now; in production log + alert
                 pass
 
         # mark seen
+        newly_seen.setdefault(user_id, set()).add(event_id)
+        applied += 1
+
+    for user_id, ids in newly_seen.items():
         try:
-            with seen_file.open("a", encoding="utf-8") as f:
-                f.write(event_id + "\n")
+            seen_by_user[user_id].add_many(ids)
         except Exception:
             pass
 
-        applied += 1
+    return applied, need_full
+
+
+def _apply_note_payload(user_id: str, payload: dict) -> bool:
+    """Write a replicated note unless we already hold the same or a newer version."""
+    from uuid import UUID
+
+    nid = UUID(str(payload.get("id"))) if payload.get("id") else None
+    if nid is None:
+        return False
+    existing = store.get_note(user_id=user_id, note_id=nid)
+    incoming_version = int(payload.get("version", 1))
+    if existing is None or incoming_version > existing.version:
+        store.apply_note_raw(payload)
+        return True
+    return False
+
+
+def _apply_note_delta(user_id: str, d: dict) -> bool:
+    """
+    Apply a `payload_delta`. True if the note is now at (or past) its version, False
+    if the local base is not the one the delta was computed against.
+    """
+    from uuid import UUID
 
-    return {"applied": applied}
+    existing = store.get_note(user_id=user_id, note_id=UUID(str(d["id"])))
+    if existing is None:
+        return False
+    if existing.version >= int(d["version"]):
+        return True
+    if existing.version != int(d["base_version"]) or content_hash(existing.content) != d["base_hash"]:
+        return False
+    content = apply_delta(existing.content, d["content"])
+    if content_hash(content) != d["hash"]:
+        return False
+    payload = {k: v for k, v in d.items() if k not in ("base_version", "base_hash", "hash")}
+    payload["content"] = content
+    store.apply_note_raw(payload)
+    return True
+
+
+# ==========================================================
+# Anti-entropy (hash tree compare)
+# ==========================================================
+# A replica walks the peer's tree from the root, asking only for the children whose hash
+# differs from its own (all prefixes of one level in one request), then fetches the notes
+# that differ in the leaves via GET /replicate/notes. See app.storage.merkle.
+
+MAX_TREE_PREFIXES = 256
+MAX_NOTES_PER_FETCH = 500
+
+
+@router.get("/merkle")
+async def get_merkle(user_id: str, prefix: List[str] = Query(default=[""])):
+    """
+    Nodes of the user's (note_id, version, content hash) tree. Inner nodes list their
+    non-empty children's hashes; leaves list {note_id: [version, content_hash]}.
+    """
+    if len(prefix) > MAX_TREE_PREFIXES:
+        raise HTTPException(status_code=400, detail="Too many prefixes")
+    try:
+        return await get_executor().run(_merkle_response, user_id, prefix)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+
+def _merkle_response(user_id: str, prefixes: list[str]) -> dict:
+    return {"user_id": user_id, "depth": merkle.DEPTH, "nodes": store.merkle_nodes(user_id, prefixes)}
+
+
+@router.get("/notes")
+async def get_replica_notes(user_id: str, id: List[str] = Query(default=[])):
+    """Current payloads of the given notes (missing ones are left out)."""
+    if len(id) > MAX_NOTES_PER_FETCH:
+        raise HTTPException(status_code=400, detail="Too many ids")
+    try:
+        return await get_executor().run(_read_notes, user_id, id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id or note id")
+
+
+def _read_notes(user_id: str, ids: list[str]) -> list[dict]:
+    from uuid import UUID
+
+    out = []
+    for i in ids:
+        note = store.get_note(user_id=user_id, note_id=UUID(i))
+        if note is not None:
+            out.append(note.to_dict())
+    return out
+
+
+def _apply_repair(user_id: str, payloads: list[dict]) -> int:
+    """Take peer notes that win over the local copy (see merkle.wins)."""
+    from uuid import UUID
+
+    applied = 0
+    for p in payloads:
+        if p.get("owner_user_id") != user_id:
+            continue
+        try:
+            existing = store.get_note(user_id=user_id, note_id=UUID(str(p["id"])))
+            mine = (existing.version, content_hash(existing.content)) if existing is not None else None
+            if merkle.wins((int(p["version"]), content_hash(p.get("content", ""))), mine):
+                store.apply_note_raw(p)
+                applied += 1
+        except Exception:
+            continue
+    return applied
+
+
+# ==========================================================
+# Snapshot bootstrap
+# ==========================================================
+# NDJSON, one object per line:
+#   {"type": "snapshot", "user_id": ..., "cursor": <seq>, "notes": <count>}
+#   {"type": "note", "payload": {...note...}}            (x count)
+#   {"type": "end", "notes": <count>}
+# `cursor` is the event seq read *before* the notes, so every change not reflected in
+# the snapshot has seq > cursor. A new replica loads the snapshot, then tails
+# /replicate/events?since_seq=<cursor>; replaying a change it already has is a no-op
+# (version check).
+
+
+@router.get("/snapshot")
+async def get_snapshot(request: Request, user_id: str):
+    """
+    Stream the current state of all of a user's notes plus the event cursor it
+    corresponds to (gzip/zstd per Accept-Encoding). Cost is one read per note,
+    independent of the event history length.
+    """
+    executor = get_executor()
+    try:
+        cursor, note_ids = await executor.run(_snapshot_head, user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+
+    encoding = pick_encoding(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding", "X-Snapshot-Cursor": str(cursor)}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        _stream_snapshot(user_id, cursor, note_ids, encoding),
+        media_type=NDJSON,
+        headers=headers,
+    )
+
+
+def _snapshot_head(user_id: str) -> tuple[int, list[str]]:
+    cursor = event_log.last_seq(user_id)  # first: anything written after it is replayed from the log
+    return cursor, [str(s.id) for s in store.list_summaries(user_id)]
+
+
+def _read_snapshot_notes(user_id: str, note_ids: list[str]) -> tuple[bytes, int]:
+    from uuid import UUID
+
+    lines = []
+    for nid in note_ids:
+        note = store.get_note(user_id=user_id, note_id=UUID(nid))
+        if note is not None:  # deleted meanwhile
+            lines.append(json.dumps({"type": "note", "payload": note.to_dict()}, ensure_ascii=False))
+    return (("\n".join(lines) + "\n").encode("utf-8") if lines else b""), len(lines)
+
+
+async def _stream_snapshot(user_id: str, cursor: int, note_ids: list[str], encoding: Optional[str]) -> AsyncIterator[bytes]:
+    executor = get_executor()
+    compressor = StreamCompressor(encoding)
+    head = {"type": "snapshot", "user_id": user_id, "cursor": cursor, "notes": len(note_ids)}
+    yield compressor.compress((json.dumps(head) + "\n").encode("utf-8"))
+    sent = 0
+    for i in range(0, len(note_ids), STREAM_CHUNK):
+        data, n = await executor.run(_read_snapshot_notes, user_id, note_ids[i : i + STREAM_CHUNK])
+        sent += n
+        if data:
+            yield compressor.compress(data)
+    yield compressor.compress((json.dumps({"type": "end", "notes": sent}) + "\n").encode("utf-8"))
+    tail = compressor.finish()
+    if tail:
+        yield tail
+
+
+@router.post("/snapshot")
+async def post_snapshot(
+    request: Request,
+    x_replication_token: str | None = Header(default=None, alias="X-Replication-Token"),
+):
+    """
+    Load a snapshot produced by GET /replicate/snapshot (uncompressed NDJSON body).
+    SECURITY: same X-Replication-Token (HMAC over the raw body) as POST /replicate/events.
+    Returns the cursor to tail events from.
+    """
+    if not x_replication_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing replication token")
+
+    raw_body = await request.body()
+    if not verify_replication_token(raw_body, x_replication_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid replication token")
+
+    try:
+        lines = [json.loads(line) for line in raw_body.decode("utf-8").splitlines() if line.strip()]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid NDJSON")
+    if (
+        len(lines) < 2
+        or not all(isinstance(x, dict) for x in lines)
+        or lines[0].get("type") != "snapshot"
+        or lines[-1].get("type") != "end"
+    ):
+        # a truncated snapshot must not be mistaken for a complete one
+        raise HTTPException(status_code=400, detail="Incomplete snapshot")
+
+    return await get_executor().run(_apply_snapshot, lines)
+
+
+def _apply_snapshot(lines: list[dict]) -> dict:
+    head = lines[0]
+    user_id = str(head.get("user_id") or "")
+    applied = 0
+    for x in lines[1:-1]:
+        payload = x.get("payload") or {}
+        if x.get("type") != "note" or payload.get("owner_user_id") != user_id:
+            continue
+        try:
+            if _apply_note_payload(user_id, payload):
+                applied += 1
+        except Exception:
+            # same policy as event apply: skip bad notes
+            continue
+    return {"user_id": user_id, "applied": applied, "cursor": int(head.get("cursor", 0))}
+
+
+@router.post("/ack")
+async def post_ack(
+    request: Request,
+    x_replication_token: str | None = Header(default=None, alias="X-Replication-Token"),
+):
+    """
+    Record that a peer has consumed a user's events up to `seq`:
+    {"user_id": ..., "peer": <its node id>, "seq": ...}. Retention only deletes log
+    segments every acknowledging peer has consumed; `seq` is capped at the last event.
+    SECURITY: same X-Replication-Token (HMAC over the raw body) as POST /replicate/events.
+    """
+    if not x_replication_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing replication token")
+
+    raw_body = await request.body()
+    if not verify_replication_token(raw_body, x_replication_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid replication token")
+
+    try:
+        body = json.loads(raw_body.decode("utf-8"))
+        user_id, peer, seq = str(body["user_id"]), str(body["peer"]), int(body["seq"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Expected {user_id, peer, seq}")
+    if not peer or len(peer) > 128 or seq < 0:
+        raise HTTPException(status_code=400, detail="Expected {user_id, peer, seq}")
+    try:
+        kept = await get_executor().run(event_log.ack, user_id, peer, seq)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    return {"user_id": user_id, "peer": peer, "seq": kept}
@@ -7,10 +7,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
 from app.utils.auth_stub import get_user_id
-from app.storage.notes_store import NotesStore
-from app.storage.shares_store import SharesStore
-from app.storage.locks_store import LocksStore
-from app.storage.event_log import EventLog, Event
+from app.storage.engine import open_engine
+from app.storage.event_log import Event
+from app.storage.aio import AsyncStore
 
 
 router = APIRouter(prefix="/shares", tags=["shares"])
@@ -18,12 +17,19 @@ router = APIRouter(prefix="/shares", tags=["shares"])
 DEFAULT_DATA_DIR = Path(__file__).resolve().parents[3] / "data"
 DATA_DIR = Path(os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
 
-notes = NotesStore(DATA_DIR)
-shares = SharesStore(DATA_DIR)
+engine = open_engine(DATA_DIR)
+notes = engine.notes()
+shares = engine.shares()
 
 LOCK_TTL_SECONDS = int(os.getenv("LOCK_TTL_SECONDS", "300"))
-event_log = EventLog(DATA_DIR)
-locks = LocksStore(DATA_DIR, default_ttl_seconds=LOCK_TTL_SECONDS, event_log=event_log)
+event_log = engine.event_log()
+locks = engine.locks(default_ttl_seconds=LOCK_TTL_SECONDS, event_log=event_log)
+
+# async views: blocking store I/O runs on the dedicated storage executor (STORE_IO_WORKERS)
+anotes = AsyncStore(notes)
+ashares = AsyncStore(shares)
+alocks = AsyncStore(locks)
+aevents = AsyncStore(event_log)
 
 
 class ShareCreateIn(BaseModel):
@@ -39,10 +45,10 @@ class SharedNoteUpdateIn(BaseModel):
 
 
 @router.post("/notes/{note_id}", status_code=201)
-def create_share(note_id: UUID, payload: ShareCreateIn, user_id: str = Depends(get_user_id)):
+async def create_share(note_id: UUID, payload: ShareCreateIn, user_id: str = Depends(get_user_id)):
     # owner creates share for their own note
     try:
-        s = shares.create_share(
+        s = await ashares.create_share(
             owner_user_id=user_id,
             note_id=uuid.UUID(str(note_id)),
             shared_with_user_id=payload.shared_with_user_id,
@@ -54,7 +60,7 @@ def create_share(note_id: UUID, payload: ShareCreateIn, user_id: str = Depends(g
     except ValueError:
         raise HTTPException(status_code=422, detail="Invalid share data")
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="SHARE_CREATED",
         user_id=user_id,
         note_id=str(note_id),
@@ -65,12 +71,12 @@ def create_share(note_id: UUID, payload: ShareCreateIn, user_id: str = Depends(g
 
 
 @router.post("/{share_id}/revoke", status_code=200)
-def revoke_share(share_id: UUID, user_id: str = Depends(get_user_id)):
-    ok = shares.revoke_share(owner_user_id=user_id, share_id=uuid.UUID(str(share_id)))
+async def revoke_share(share_id: UUID, user_id: str = Depends(get_user_id)):
+    ok = await ashares.revoke_share(owner_user_id=user_id, share_id=uuid.UUID(str(share_id)))
     if not ok:
         raise HTTPException(status_code=404, detail="Share not found")
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="SHARE_REVOKED",
         user_id=user_id,
         meta={"share_id": str(share_id)},
@@ -79,13 +85,13 @@ def revoke_share(share_id: UUID, user_id: str = Depends(get_user_id)):
 
 
 @router.get("/{share_id}")
-def read_shared_note(share_id: UUID, user_id: str = Depends(get_user_id)):
-    s = shares.find_share_for_user(share_id=uuid.UUID(str(share_id)), user_id=user_id)
+async def read_shared_note(share_id: UUID, user_id: str = Depends(get_user_id)):
+    s = await ashares.find_share_for_user(share_id=uuid.UUID(str(share_id)), user_id=user_id)
     if s is None:
         # do not leak existence
         raise HTTPException(status_code=404, detail="Share not found")
 
-    note = notes.get_note(user_id=s.owner_user_id, note_id=s.note_id)
+    note = await anotes.get_note(user_id=s.owner_user_id, note_id=s.note_id)
     if note is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
@@ -93,8 +99,8 @@ def read_shared_note(share_id: UUID, user_id: str = Depends(get_user_id)):
 
 
 @router.post("/{share_id}/lock")
-def acquire_shared_lock(share_id: UUID, user_id: str = Depends(get_user_id)):
-    s = shares.find_share_for_user(share_id=uuid.UUID(str(share_id)), user_id=user_id)
+async def acquire_shared_lock(share_id: UUID, user_id: str = Depends(get_user_id)):
+    s = await ashares.find_share_for_user(share_id=uuid.UUID(str(share_id)), user_id=user_id)
     if s is None:
         raise HTTPException(status_code=404, detail="Share not found")
 
@@ -102,11 +108,11 @@ def acquire_shared_lock(share_id: UUID, user_id: str = Depends(get_user_id)):
         # AR2: RO share must never allow writes
         raise HTTPException(status_code=403, detail="Read-only share")
 
-    lock = locks.acquire_lock_for_share(note_owner_user_id=s.owner_user_id, note_id=s.note_id, share_id=s.share_id)
+    lock = await alocks.acquire_lock_for_share(note_owner_user_id=s.owner_user_id, note_id=s.note_id, share_id=s.share_id)
     if lock is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="LOCK_ACQUIRED",
         user_id=user_id,
         note_id=str(s.note_id),
@@ -118,15 +124,15 @@ def acquire_shared_lock(share_id: UUID, user_id: str = Depends(get_user_id)):
 
 
 @router.put("/{share_id}")
-def update_shared_note(share_id: UUID, payload: SharedNoteUpdateIn, user_id: str = Depends(get_user_id)):
-    s = shares.find_share_for_user(share_id=uuid.UUID(str(share_id)), user_id=user_id)
+async def update_shared_note(share_id: UUID, payload: SharedNoteUpdateIn, user_id: str = Depends(get_user_id)):
+    s = await ashares.find_share_for_user(share_id=uuid.UUID(str(share_id)), user_id=user_id)
     if s is None:
         raise HTTPException(status_code=404, detail="Share not found")
 
     if s.mode != "rw":
         raise HTTPException(status_code=403, detail="Read-only share")
 
-    if not locks.require_valid_lock_for_share(
+    if not await alocks.require_valid_lock_for_share(
         note_owner_user_id=s.owner_user_id,
         note_id=s.note_id,
         share_id=s.share_id,
@@ -134,7 +140,7 @@ def update_shared_note(share_id: UUID, payload: SharedNoteUpdateIn, user_id: str
     ):
         raise HTTPException(status_code=409, detail="Valid lock required")
 
-    updated = notes.update_note(
+    updated = await anotes.update_note(
         user_id=s.owner_user_id,
         note_id=s.note_id,
         title=payload.title,
@@ -143,7 +149,7 @@ def update_shared_note(share_id: UUID, payload: SharedNoteUpdateIn, user_id: str
     if updated is None:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    event_log.emit(Event(
+    await aevents.emit(Event(
         event_type="NOTE_UPDATED",
         user_id=user_id,
         note_id=str(s.note_id),
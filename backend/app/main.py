@@ -1,11 +1,48 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.api import notes as notes_api
 from app.api.notes import router as notes_router
 from app.api.replication import router as replication_router
 from app.api.auth import router as auth_router
 from app.api.shares import router as shares_router
+from app.storage import user_layout
+from app.storage.aio import get_executor
+from app.storage.note_format import FormatRewriter
+from app.utils.hash_pool import get_hash_pool
+from app.utils.jwt_auth import load_keys, token_cache
+from app.utils.replicator import Replicator
+
+# background pull replication, only when REPL_PEERS / REPL_USERS are set
+replicator = Replicator.from_env(notes_api.DATA_DIR)
+
+# NOTES_REWRITE=1: convert existing note files to the NOTES_COMPRESS format (file engine)
+rewriter = (
+    FormatRewriter(notes_api.store, notes_api.store.codec)
+    if os.getenv("NOTES_REWRITE") == "1" and hasattr(notes_api.store, "rewrite_note")
+    else None
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if replicator is not None:
+        replicator.start()
+    if rewriter is not None:
+        rewriter.start()
+    yield
+    if replicator is not None:
+        await replicator.stop()
+    if rewriter is not None:
+        rewriter.stop(timeout=5)
 
-app = FastAPI(title="Secure Notes API")
+
+app = FastAPI(title="Secure Notes API", lifespan=lifespan)
+
+# JWT signing keys are read once here, not per request
+load_keys()
 
 app.include_router(auth_router)
 app.include_router(notes_router)
@@ -15,3 +52,18 @@ app.include_router(shares_router)
 @app.get("/health")
 def health():
     return {"ok": True}
+
+
+@app.get("/metrics")
+def metrics():
+    cache = getattr(notes_api.store, "cache", None)
+    return {
+        "storage_engine": notes_api.engine.name,
+        "users_layout": user_layout.layout_for(notes_api.DATA_DIR),
+        "notes_cache": cache.stats() if cache is not None else None,
+        "store_io": get_executor().stats(),
+        "auth_hash": get_hash_pool().stats(),
+        "auth_tokens": token_cache.stats(),
+        "replicator": replicator.stats() if replicator is not None else None,
+        "note_rewriter": rewriter.stats() if rewriter is not None else None,
+    }
@@ -22,3 +22,38 @@ class NoteOut(BaseModel):
     created_at: str
     updated_at: str
     version: int
+
+class NoteSummaryOut(BaseModel):
+    id: str
+    title: str
+    created_at: str
+    updated_at: str
+    version: int
+
+class NoteBatchCreate(BaseModel):
+    items: list[NoteCreate] = Field(min_length=1)
+
+class NoteBatchGet(BaseModel):
+    ids: list[UUID] = Field(min_length=1)
+
+class NoteBatchUpdateItem(NoteUpdate):
+    id: UUID
+
+class NoteBatchUpdate(BaseModel):
+    items: list[NoteBatchUpdateItem] = Field(min_length=1)
+
+class NoteBatchResult(BaseModel):
+    status: int
+    note: NoteOut | None = None
+    error: str | None = None
+
+class NoteBatchOut(BaseModel):
+    results: list[NoteBatchResult]
+
+class NoteSearchHitOut(BaseModel):
+    id: str
+    title: str
+    created_at: str
+    updated_at: str
+    version: int
+    score: float
@@ -0,0 +1,102 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class IOExecutor:
+    """
+    Dedicated, fixed-size thread pool for blocking storage I/O (fsync, mkdir, file reads).
+    Keeps slow disks from starving Starlette's default threadpool, and tracks queue depth
+    so the pool can be sized against the disks it fronts.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="store-io")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._peak_queued = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def _call(self, submitted: float, fn: Callable[..., Any]) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_total += started - submitted
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._run_total += time.perf_counter() - started
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        call = functools.partial(self._call, time.perf_counter(), functools.partial(fn, *args, **kwargs))
+        return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            done = self._completed or 1
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "peak_queue_depth": self._peak_queued,
+                "active": self._active,
+                "completed": self._completed,
+                "avg_wait_ms": round(self._wait_total / done * 1000, 3),
+                "avg_run_ms": round(self._run_total / done * 1000, 3),
+            }
+
+
+_executor: Optional[IOExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> IOExecutor:
+    """Process-wide storage executor, sized by STORE_IO_WORKERS (default 16)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = IOExecutor(max_workers=int(os.getenv("STORE_IO_WORKERS", "16")))
+        return _executor
+
+
+class AsyncStore:
+    """
+    Awaitable view of a store (NotesStore, LocksStore, SharesStore, EventLog, ...):
+    every public method is exposed as a coroutine that runs on the I/O executor.
+
+        notes = AsyncStore(NotesStore(DATA_DIR))
+        note = await notes.get_note(user_id=..., note_id=...)
+    """
+
+    def __init__(self, store: Any, executor: Optional[IOExecutor] = None):
+        self.sync = store
+        self._executor = executor
+
+    @property
+    def executor(self) -> IOExecutor:
+        return self._executor or get_executor()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.sync, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.executor.run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,139 @@
+"""Storage engine selection.
+
+An engine bundles the four stores the API needs (notes, shares, locks, event log)
+over one data dir. Three implementations exist:
+
+- "files"  : the JSON-file layout under data/users/<id>/{notes,locks,shares,events}
+- "pack"   : the files layout, but each user's notes in one append-only pack file
+             (data/users/<id>/notes.pack, see app/storage/pack_store.py)
+- "sqlite" : a single SQLite database in WAL mode (see app/storage/sqlite_engine.py)
+
+The engine is chosen with STORAGE_ENGINE (default "files").
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional, Protocol
+import uuid
+
+
+class NotesBackend(Protocol):
+    cache: Any
+
+    def create_note(self, user_id: str, title: str, content: str) -> Any: ...
+    def list_notes(self, user_id: str) -> list[Any]: ...
+    def list_summaries(self, user_id: str) -> list[Any]: ...
+    def page_summaries(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[tuple[int, str]] = None,
+        sort: str = "updated_at",
+        descending: bool = False,
+        updated_since: Optional[datetime] = None,
+    ) -> tuple[list[Any], Optional[tuple[int, str]]]: ...
+    def get_note(self, user_id: str, note_id: uuid.UUID) -> Any: ...
+    def update_note(self, user_id: str, note_id: uuid.UUID, title: str, content: str) -> Any: ...
+    def get_previous(self, user_id: str, note_id: uuid.UUID) -> Any: ...
+    def apply_note_raw(self, raw: dict[str, Any]) -> Any: ...
+    def merkle_nodes(self, user_id: str, prefixes: list[str]) -> list[dict[str, Any]]: ...
+    def search(
+        self, user_id: str, q: str, limit: int = 20, after: Optional[tuple[float, str]] = None
+    ) -> tuple[list[Any], Optional[tuple[float, str]]]: ...
+    def rebuild_search_index(self, user_id: str) -> int: ...
+
+
+class SharesBackend(Protocol):
+    def create_share(
+        self,
+        owner_user_id: str,
+        note_id: uuid.UUID,
+        shared_with_user_id: str,
+        mode: str,
+        ttl_minutes: Optional[int] = None,
+    ) -> Any: ...
+    def get_share(self, owner_user_id: str, share_id: uuid.UUID) -> Any: ...
+    def revoke_share(self, owner_user_id: str, share_id: uuid.UUID) -> bool: ...
+    def find_share_for_user(self, share_id: uuid.UUID, user_id: str) -> Any: ...
+
+
+class LocksBackend(Protocol):
+    def acquire_lock(self, user_id: str, note_id: uuid.UUID) -> Any: ...
+    def release_lock(self, user_id: str, note_id: uuid.UUID) -> bool: ...
+    def require_valid_lock(self, user_id: str, note_id: uuid.UUID, lock_id: uuid.UUID) -> bool: ...
+    def acquire_lock_for_share(self, note_owner_user_id: str, note_id: uuid.UUID, share_id: uuid.UUID) -> Any: ...
+    def require_valid_lock_for_share(
+        self, note_owner_user_id: str, note_id: uuid.UUID, share_id: uuid.UUID, lock_id: uuid.UUID
+    ) -> bool: ...
+
+
+class EventLogBackend(Protocol):
+    def emit(self, event: Any, wait: bool = True) -> Any: ...
+    def emit_many(self, events: list[Any], wait: bool = True) -> list[Any]: ...
+    def last_seq(self, user_id: str) -> int: ...
+    def first_seq(self, user_id: str) -> int: ...
+    def ack(self, user_id: str, peer: str, seq: int) -> int: ...
+    def iter_events(self, user_id: str, since_seq: int = 0, limit: Optional[int] = None) -> Iterator[dict[str, Any]]: ...
+    def read_events(self, user_id: str, since_seq: int = 0, limit: int = 100) -> list[dict[str, Any]]: ...
+    def seq_for_event_id(self, user_id: str, event_id: str) -> Optional[int]: ...
+
+
+class FileEngine:
+    name = "files"
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+
+    def notes(self) -> NotesBackend:
+        from app.storage.notes_store import NotesStore
+        return NotesStore(self.base_dir)
+
+    def shares(self) -> SharesBackend:
+        from app.storage.shares_store import SharesStore
+        return SharesStore(self.base_dir)
+
+    def locks(self, default_ttl_seconds: int = 300, event_log=None) -> LocksBackend:
+        from app.storage.locks_store import LocksStore
+        return LocksStore(self.base_dir, default_ttl_seconds=default_ttl_seconds, event_log=event_log)
+
+    def event_log(self) -> EventLogBackend:
+        from app.storage.event_log import EventLog
+        return EventLog(self.base_dir)
+
+
+class PackEngine(FileEngine):
+    name = "pack"
+
+    def notes(self) -> NotesBackend:
+        from app.storage.pack_store import PackNotesStore
+        return PackNotesStore(self.base_dir)
+
+    def shares(self) -> SharesBackend:
+        from app.storage.shares_store import SharesStore
+        return SharesStore(self.base_dir, note_exists=self.notes().note_exists)
+
+    def locks(self, default_ttl_seconds: int = 300, event_log=None) -> LocksBackend:
+        from app.storage.locks_store import LocksStore
+        return LocksStore(
+            self.base_dir,
+            default_ttl_seconds=default_ttl_seconds,
+            event_log=event_log,
+            note_exists=self.notes().note_exists,
+        )
+
+
+ENGINES = ("files", "pack", "sqlite")
+
+
+def open_engine(base_dir: Path, name: Optional[str] = None):
+    name = name or os.getenv("STORAGE_ENGINE", "files")
+    if name == "files":
+        return FileEngine(base_dir)
+    if name == "pack":
+        return PackEngine(base_dir)
+    if name == "sqlite":
+        from app.storage.sqlite_engine import SqliteEngine
+        return SqliteEngine.for_data_dir(base_dir)
+    raise ValueError(f"Unknown storage engine: {name}")
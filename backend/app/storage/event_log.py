@@ -1,13 +1,33 @@
+import bisect
 import json
 import os
+import struct
+import threading
+import time
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 from app.storage.notes_store import _safe_user_dir
 
+# events.idx: one fixed-size record per event -> (seq, byte offset of its line in events.log).
+# seq is dense, so within a segment starting at seq F the record for seq N lives at
+# (N - F) * _IDX_RECORD.size.
+_IDX_RECORD = struct.Struct("<QQ")
+
+# Segments: events.log / events.idx are the *active* segment. Once it exceeds
+# EVENT_LOG_SEGMENT_BYTES (or is older than EVENT_LOG_SEGMENT_SECONDS) it is sealed:
+# both files move to segments/<first seq, 20 digits>.{log,idx} and its header
+# (first/last seq, first/last ts, bytes) is recorded in segments.json. Sealed segments are
+# immutable, so startup only checks the active segment's tail.
+# Retention (EVENT_LOG_RETENTION_SECONDS, 0 = keep forever) deletes the oldest sealed
+# segments once they are older than the retention period and every known peer
+# (peers.json: peer -> last consumed seq, see EventLog.ack) has consumed them; with no
+# known peer nothing is deleted. `floor` is the last deleted seq; cursors below it can
+# no longer be served.
+
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -23,6 +43,49 @@ def _events_path(base_dir: Path, user_id: str) -> Path:
     return _events_dir(base_dir, user_id) / "events.log"
 
 
+def _events_index_path(base_dir: Path, user_id: str) -> Path:
+    return _events_dir(base_dir, user_id) / "events.idx"
+
+
+def _segment_path(events_dir: Path, first_seq: int, suffix: str) -> Path:
+    return events_dir / "segments" / f"{first_seq:020d}{suffix}"
+
+
+def _atomic_write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _ts_epoch(ts: Optional[str]) -> float:
+    try:
+        dt = datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _line_ts(log_path: Path, offset: int) -> Optional[str]:
+    with log_path.open("rb") as f:
+        f.seek(offset)
+        e = _parse_line(f.readline(), 0)
+    return e.get("ts") if e is not None else None
+
+
 @dataclass(frozen=True)
 class Event:
     event_type: str
@@ -31,7 +94,7 @@ class Event:
     lock_id: Optional[str] = None
     meta: Optional[dict[str, Any]] = None
 
-    def to_json_line(self) -> str:
+    def to_json_line(self, seq: Optional[int] = None) -> str:
         obj = {
             "event_id": str(uuid.uuid4()),
             "event_type": self.event_type,
@@ -41,19 +104,563 @@ class Event:
             "lock_id": self.lock_id,
             "meta": self.meta or {},
         }
+        if seq is not None:
+            obj["seq"] = seq
         return json.dumps(obj, ensure_ascii=False)
 
 
+class EventCommit:
+    """Handle returned by EventLog.emit; wait() blocks until the event is fsynced."""
+
+    def __init__(self):
+        self.seq: Optional[int] = None  # assigned when the event is written
+        self._done = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _resolve(self, error: Optional[BaseException] = None) -> None:
+        self._error = error
+        self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if not self._done.wait(timeout):
+            return False
+        if self._error is not None:
+            raise self._error
+        return True
+
+
+class _LogState:
+    """
+    Per-file writer state shared by every EventLog instance in the process
+    (notes, shares and locks each hold their own EventLog over the same files).
+
+    All appends go through `queue`, as groups of events that must be written together
+    (one per emit, several per emit_many). Whoever finds no flush in progress becomes the
+    flusher: it (optionally) waits for the group-commit window, assigns seqs, writes
+    the queued lines, fsyncs once, and repeats until the queue is empty. Seqs are only
+    assigned at write time, so a failed write never leaves a gap in events.idx.
+    """
+
+    def __init__(self, last_seq: int, end: int, base: int = 1):
+        self.cond = threading.Condition()
+        self.queue: list[list[tuple[Event, EventCommit]]] = []
+        self.flushing = False
+        self.last_seq = last_seq  # last durable + indexed seq (what readers may see)
+        self.end = end  # byte size of events.log covered by complete, indexed lines
+        self.base = base  # first seq of the active segment (events.log)
+        self.floor = 0  # last seq removed by retention
+        self.segments: list[dict[str, Any]] = []  # sealed segment headers, oldest first
+        self.active_since: Optional[float] = None  # epoch of the active segment's first event
+
+
+def _queued(queue: list[list[tuple[Event, EventCommit]]]) -> int:
+    return sum(len(g) for g in queue)
+
+
+def _take(
+    queue: list[list[tuple[Event, EventCommit]]], limit: int
+) -> tuple[list[tuple[Event, EventCommit]], list[list[tuple[Event, EventCommit]]]]:
+    # whole groups only; a group larger than `limit` goes out on its own
+    n = i = 0
+    while i < len(queue) and (i == 0 or n + len(queue[i]) <= limit):
+        n += len(queue[i])
+        i += 1
+    return [x for g in queue[:i] for x in g], queue[i:]
+
+
+_states: dict[Path, _LogState] = {}
+_states_lock = threading.Lock()
+
+
+def _sync_index(log_path: Path, idx_path: Path, base: int = 1) -> _LogState:
+    """
+    Bring a segment's .idx up to date with its .log and return the writer state.
+    - drops a torn (unterminated) last line from the log and a partial last idx record
+    - indexes lines appended after the last idx record (crash between the two writes,
+      or a log written before the index existed: legacy lines get seq = line ordinal)
+    Only the tail is inspected, so the cost does not grow with the segment's history.
+    """
+    size = log_path.stat().st_size if log_path.exists() else 0
+
+    if size:
+        with log_path.open("rb+") as f:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                # torn tail: find the last complete line and cut there
+                pos = size
+                while pos > 0:
+                    step = min(4096, pos)
+                    f.seek(pos - step)
+                    chunk = f.read(step)
+                    nl = chunk.rfind(b"\n")
+                    if nl != -1:
+                        pos = pos - step + nl + 1
+                        break
+                    pos -= step
+                f.truncate(pos)
+                size = pos
+
+    last_seq, start = base - 1, 0
+    with idx_path.open("ab+") as idx:
+        idx_size = idx.tell()
+        n = idx_size // _IDX_RECORD.size
+        if idx_size % _IDX_RECORD.size:
+            idx.truncate(n * _IDX_RECORD.size)
+        # discard records that point past the (possibly truncated) log
+        while n:
+            idx.seek((n - 1) * _IDX_RECORD.size)
+            seq, off = _IDX_RECORD.unpack(idx.read(_IDX_RECORD.size))
+            if off < size:
+                last_seq, start = seq, off
+                break
+            n -= 1
+        idx.truncate(n * _IDX_RECORD.size)
+        idx.seek(0, os.SEEK_END)
+
+        if size:
+            with log_path.open("rb") as f:
+                f.seek(start)
+                if n:
+                    f.readline()  # already indexed
+                pos = f.tell()
+                for line in f:
+                    if line.strip():
+                        last_seq += 1
+                        idx.write(_IDX_RECORD.pack(last_seq, pos))
+                    pos += len(line)
+        idx.flush()
+
+    return _LogState(last_seq=last_seq, end=size, base=base)
+
+
+def _segment_header(log_path: Path, idx_path: Path, first_seq: int) -> Optional[dict[str, Any]]:
+    st = _sync_index(log_path, idx_path, base=first_seq)
+    if st.last_seq < first_seq:
+        return None
+    with idx_path.open("rb") as idx:
+        idx.seek((st.last_seq - first_seq) * _IDX_RECORD.size)
+        _, last_off = _IDX_RECORD.unpack(idx.read(_IDX_RECORD.size))
+    return {
+        "first_seq": first_seq,
+        "last_seq": st.last_seq,
+        "first_ts": _line_ts(log_path, 0),
+        "last_ts": _line_ts(log_path, last_off),
+        "bytes": st.end,
+    }
+
+
+def _load_segments(events_dir: Path) -> tuple[int, list[dict[str, Any]]]:
+    """
+    Read segments.json and reconcile it with segments/ after a crash: a segment whose
+    files were moved but not yet recorded is added (header rebuilt from its own tail),
+    files left behind by an interrupted retention or seal are removed.
+    """
+    manifest = events_dir / "segments.json"
+    floor, segs = 0, []
+    if manifest.exists():
+        raw = json.loads(manifest.read_text(encoding="utf-8"))
+        floor, segs = int(raw.get("floor", 0)), list(raw.get("segments", []))
+
+    seg_dir = events_dir / "segments"
+    changed = False
+    if seg_dir.exists():
+        known = {s["first_seq"] for s in segs}
+        for p in sorted(seg_dir.glob("*.log")):
+            first = int(p.stem)
+            if first in known:
+                continue
+            if first <= floor:
+                p.unlink(missing_ok=True)
+                p.with_suffix(".idx").unlink(missing_ok=True)
+                continue
+            header = _segment_header(p, p.with_suffix(".idx"), first)
+            if header is not None:
+                segs.append(header)
+                changed = True
+        for p in seg_dir.glob("*.idx"):
+            if not p.with_suffix(".log").exists():
+                p.unlink(missing_ok=True)
+    segs.sort(key=lambda s: s["first_seq"])
+    if changed:
+        _atomic_write_json(manifest, {"floor": floor, "segments": segs})
+    return floor, segs
+
+
+def _parse_line(line: bytes, seq: int) -> Optional[dict[str, Any]]:
+    try:
+        e = json.loads(line)
+    except Exception:
+        return None
+    if not isinstance(e, dict):
+        return None
+    # legacy lines (written before seq existed) get their ordinal
+    e.setdefault("seq", seq)
+    return e
+
+
 class EventLog:
-    def __init__(self, base_dir: Path):
+    """
+    Per-user append-only event log, split into segments (see the note at the top).
+
+    mode="strict": every event is written and fsynced on its own (the original behavior).
+    mode="group":  concurrent emitters are batched; one flusher writes up to `max_batch`
+                   lines, collected for at most `window_ms`, and fsyncs them together.
+    In both modes emit() returns once the event is durable unless wait=False is passed,
+    in which case the returned EventCommit can be waited on later.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        mode: Optional[str] = None,
+        window_ms: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        segment_bytes: Optional[int] = None,
+        segment_seconds: Optional[float] = None,
+        retention_seconds: Optional[float] = None,
+    ):
         self.base_dir = base_dir
+        # defaults come from env (EVENT_LOG_MODE, EVENT_LOG_GROUP_WINDOW_MS, EVENT_LOG_GROUP_MAX_BATCH)
+        self.mode = mode or os.getenv("EVENT_LOG_MODE", "strict")
+        if self.mode not in ("strict", "group"):
+            raise ValueError("Invalid event log mode")
+        if window_ms is None:
+            window_ms = float(os.getenv("EVENT_LOG_GROUP_WINDOW_MS", "2"))
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch or int(os.getenv("EVENT_LOG_GROUP_MAX_BATCH", "64"))
+        # segments + retention (EVENT_LOG_SEGMENT_BYTES, EVENT_LOG_SEGMENT_SECONDS, EVENT_LOG_RETENTION_SECONDS)
+        if segment_bytes is None:
+            segment_bytes = int(os.getenv("EVENT_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+        if segment_seconds is None:
+            segment_seconds = float(os.getenv("EVENT_LOG_SEGMENT_SECONDS", "0"))
+        if retention_seconds is None:
+            retention_seconds = float(os.getenv("EVENT_LOG_RETENTION_SECONDS", "0"))
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_seconds = retention_seconds
+
+    def _state(self, user_id: str) -> _LogState:
+        path = _events_path(self.base_dir, user_id)
+        with _states_lock:
+            st = _states.get(path)
+            if st is None:
+                floor, segs = _load_segments(path.parent)
+                base = max([floor] + [s["last_seq"] for s in segs]) + 1
+                st = _sync_index(path, _events_index_path(self.base_dir, user_id), base=base)
+                st.floor, st.segments = floor, segs
+                if st.end:
+                    st.active_since = _ts_epoch(_line_ts(path, 0)) or time.time()
+                _states[path] = st
+            return st
 
-    def emit(self, event: Event) -> None:
-        path = _events_path(self.base_dir, event.user_id)
+    def emit(self, event: Event, wait: bool = True) -> EventCommit:
+        return self.emit_many([event], wait=wait)[0]
+
+    def emit_many(self, events: list[Event], wait: bool = True) -> list[EventCommit]:
+        """
+        Append several events of one user in a single write + fsync (in either mode),
+        with consecutive seqs.
+        """
+        if not events:
+            return []
+        user_id = events[0].user_id
+        if any(e.user_id != user_id for e in events):
+            raise ValueError("emit_many takes events of a single user")
+        path = _events_path(self.base_dir, user_id)
         path.parent.mkdir(parents=True, exist_ok=True)
+        st = self._state(user_id)
+
+        group = [(e, EventCommit()) for e in events]
+        with st.cond:
+            st.queue.append(group)
+            lead = not st.flushing
+            if lead:
+                st.flushing = True
+            elif _queued(st.queue) >= self.max_batch:
+                st.cond.notify_all()
+
+        if lead:
+            self._flush(st, user_id)
+        if wait:
+            for _, c in group:
+                c.wait()
+        return [c for _, c in group]
+
+    def _flush(self, st: _LogState, user_id: str) -> None:
+        group = self.mode == "group"
+        batch_size = self.max_batch if group else 1
+
+        if group and self.window_s > 0:
+            deadline = time.monotonic() + self.window_s
+            with st.cond:
+                while _queued(st.queue) < batch_size:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    st.cond.wait(left)
+
+        while True:
+            with st.cond:
+                if not st.queue:
+                    st.flushing = False
+                    return
+                batch, st.queue = _take(st.queue, batch_size)
+
+            try:
+                self._write_batch(st, user_id, batch)
+            except BaseException as exc:
+                for _, c in batch:
+                    c._resolve(exc)
+                continue
+            for _, c in batch:
+                c._resolve()
+
+            try:
+                if self._should_seal(st):
+                    self._seal(st, user_id)
+            except OSError:
+                pass  # the events are durable; sealing is retried after the next write
+
+    def _write_batch(self, st: _LogState, user_id: str, batch: list[tuple[Event, EventCommit]]) -> None:
+        seq, end = st.last_seq, st.end
+        lines, records = [], []
+        for event, commit in batch:
+            seq += 1
+            data = (event.to_json_line(seq=seq) + "\n").encode("utf-8")
+            records.append(_IDX_RECORD.pack(seq, end))
+            lines.append(data)
+            end += len(data)
+            commit.seq = seq
+
+        # append-only, durable write: one fsync for the whole batch
+        path = _events_path(self.base_dir, user_id)
+        with path.open("ab", buffering=0) as f:
+            try:
+                f.write(b"".join(lines))
+                os.fsync(f.fileno())
+            except BaseException:
+                # drop a partial append so the next batch starts on a line boundary
+                f.truncate(st.end)
+                raise
+
+        with st.cond:
+            st.last_seq = seq
+            st.end = end
+            if st.active_since is None:
+                st.active_since = time.time()
+
+        # the index is rebuilt from the log tail on restart, so no fsync here
+        idx_path = _events_index_path(self.base_dir, user_id)
+        try:
+            with idx_path.open("ab") as idx:
+                idx.write(b"".join(records))
+        except OSError:
+            # the events are already durable; re-derive the index tail from the log
+            fresh = _sync_index(path, idx_path, base=st.base)
+            with st.cond:
+                st.last_seq, st.end = fresh.last_seq, fresh.end
+
+    # ---------------- segments ----------------
+
+    def _should_seal(self, st: _LogState) -> bool:
+        with st.cond:
+            if st.last_seq < st.base:
+                return False
+            if self.segment_bytes > 0 and st.end >= self.segment_bytes:
+                return True
+            return (
+                self.segment_seconds > 0
+                and st.active_since is not None
+                and time.time() - st.active_since >= self.segment_seconds
+            )
+
+    def _seal(self, st: _LogState, user_id: str) -> None:
+        """Move the active segment to segments/ (called by the flusher only)."""
+        events_dir = _events_dir(self.base_dir, user_id)
+        log_path, idx_path = _events_path(self.base_dir, user_id), _events_index_path(self.base_dir, user_id)
+        (events_dir / "segments").mkdir(exist_ok=True)
+        with st.cond:
+            first = st.base
+            # sealed segments are never re-scanned, so their index must be complete + durable
+            fresh = _sync_index(log_path, idx_path, base=first)
+            with idx_path.open("ab") as idx:
+                os.fsync(idx.fileno())
+            header = _segment_header(log_path, idx_path, first)
+            if header is None:
+                return
+            # idx first: a crash in between leaves an orphan .idx, which recovery drops
+            os.replace(idx_path, _segment_path(events_dir, first, ".idx"))
+            os.replace(log_path, _segment_path(events_dir, first, ".log"))
+            _fsync_dir(events_dir / "segments")
+            _fsync_dir(events_dir)
+
+            st.segments.append(header)
+            st.base = fresh.last_seq + 1
+            st.last_seq, st.end = fresh.last_seq, 0
+            st.active_since = None
+            _atomic_write_json(events_dir / "segments.json", {"floor": st.floor, "segments": st.segments})
+        self.apply_retention(user_id)
+
+    def _open_segment(self, st: _LogState, user_id: str, first_seq: int, suffix: str):
+        # resolved under the lock: a concurrent seal moves the active files, but a segment
+        # keeps its content and offsets, so whichever path is current is the right file
+        with st.cond:
+            if first_seq == st.base:
+                p = _events_dir(self.base_dir, user_id) / f"events{suffix}"
+            else:
+                p = _segment_path(_events_dir(self.base_dir, user_id), first_seq, suffix)
+            try:
+                return p.open("rb")
+            except FileNotFoundError:
+                return None  # removed by retention
+
+    def _snapshot(self, st: _LogState) -> tuple[int, int, int, list[tuple[int, int, int]]]:
+        """(last_seq, floor, active base, [(first_seq, last_seq, bytes) per segment incl. active])."""
+        with st.cond:
+            segs = [(s["first_seq"], s["last_seq"], s["bytes"]) for s in st.segments]
+            segs.append((st.base, st.last_seq, st.end))
+            return st.last_seq, st.floor, st.base, segs
+
+    def ack(self, user_id: str, peer: str, seq: int) -> int:
+        """Record that `peer` has consumed this user's events up to `seq` (drives retention); returns the seq kept."""
+        events_dir = _events_dir(self.base_dir, user_id)
+        events_dir.mkdir(parents=True, exist_ok=True)  # a peer may subscribe before the first event
+        st = self._state(user_id)
+        peers_path = events_dir / "peers.json"
+        with st.cond:
+            seq = min(seq, st.last_seq)  # nobody can have consumed events that don't exist yet
+            peers = json.loads(peers_path.read_text(encoding="utf-8")) if peers_path.exists() else {}
+            if peers.get(peer, -1) >= seq:
+                return peers[peer]
+            peers[peer] = seq
+            _atomic_write_json(peers_path, peers)
+        self.apply_retention(user_id)
+        return seq
+
+    def apply_retention(self, user_id: str) -> int:
+        """Delete sealed segments past retention that every known peer has consumed."""
+        if self.retention_seconds <= 0:
+            return 0
+        events_dir = _events_dir(self.base_dir, user_id)
+        st = self._state(user_id)
+        peers_path = events_dir / "peers.json"
+        cutoff = time.time() - self.retention_seconds
+        with st.cond:
+            try:
+                peers = json.loads(peers_path.read_text(encoding="utf-8")) if peers_path.exists() else {}
+            except (OSError, ValueError):
+                return 0  # unknown consumption: keep everything
+            if not peers:
+                return 0  # nobody has acknowledged anything: keep everything
+            consumed = min(peers.values())
+            drop = 0
+            for seg in st.segments:
+                if seg["last_seq"] > consumed:
+                    break
+                if _ts_epoch(seg["last_ts"]) > cutoff:
+                    break
+                drop += 1
+            if not drop:
+                return 0
+            gone, st.segments = st.segments[:drop], st.segments[drop:]
+            st.floor = gone[-1]["last_seq"]
+            _atomic_write_json(events_dir / "segments.json", {"floor": st.floor, "segments": st.segments})
+        for seg in gone:
+            _segment_path(events_dir, seg["first_seq"], ".log").unlink(missing_ok=True)
+            _segment_path(events_dir, seg["first_seq"], ".idx").unlink(missing_ok=True)
+        return drop
+
+    # ---------------- reads ----------------
+
+    def last_seq(self, user_id: str) -> int:
+        if not _events_dir(self.base_dir, user_id).exists():
+            return 0
+        return self._state(user_id).last_seq
+
+    def first_seq(self, user_id: str) -> int:
+        """Oldest seq still served; cursors below first_seq - 1 were removed by retention."""
+        if not _events_dir(self.base_dir, user_id).exists():
+            return 1
+        return self._state(user_id).floor + 1
+
+    def iter_events(self, user_id: str, since_seq: int = 0, limit: Optional[int] = None) -> Iterator[dict[str, Any]]:
+        """
+        Yield events with seq > since_seq, in order, reading only the requested lines:
+        the segment is found from the headers, the start offset from its .idx, then
+        lines are streamed from there (continuing into newer segments).
+        """
+        if not _events_dir(self.base_dir, user_id).exists():
+            return
+        st = self._state(user_id)
+        last_seq, floor, base, segs = self._snapshot(st)
+
+        seq = max(since_seq, floor, 0) + 1
+        if seq > last_seq or limit == 0:
+            return
+
+        count = 0
+        i = max(0, bisect.bisect_right([s[0] for s in segs], seq) - 1)
+        for first, seg_last, seg_end in segs[i:]:
+            if seg_last < seq:
+                continue
+            idx = self._open_segment(st, user_id, first, ".idx")
+            if idx is None:
+                return
+            with idx:
+                idx.seek((seq - first) * _IDX_RECORD.size)
+                rec = idx.read(_IDX_RECORD.size)
+            if len(rec) < _IDX_RECORD.size:
+                return
+            f = self._open_segment(st, user_id, first, ".log")
+            if f is None:
+                return
+            with f:
+                f.seek(_IDX_RECORD.unpack(rec)[1])
+                while f.tell() < seg_end:
+                    line = f.readline()
+                    if not line.strip():
+                        continue
+                    e = _parse_line(line, seq)
+                    seq += 1
+                    if e is None:
+                        continue
+                    yield e
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+            seq = seg_last + 1
+
+    def read_events(self, user_id: str, since_seq: int = 0, limit: int = 100) -> list[dict[str, Any]]:
+        return list(self.iter_events(user_id, since_seq=since_seq, limit=limit))
 
-        # append-only, durable write
-        with path.open("a", encoding="utf-8") as f:
-            f.write(event.to_json_line() + "\n")
-            f.flush()
-            os.fsync(f.fileno())
+    def seq_for_event_id(self, user_id: str, event_id: str) -> Optional[int]:
+        """
+        Map a legacy UUID cursor to its seq. Streams the log line by line
+        (constant memory), so prefer since_seq for incremental pulls.
+        """
+        if not _events_dir(self.base_dir, user_id).exists():
+            return None
+        needle = event_id.encode("utf-8")
+        st = self._state(user_id)
+        _, _, _, segs = self._snapshot(st)
+        for first, _, seg_end in segs:
+            f = self._open_segment(st, user_id, first, ".log")
+            if f is None:
+                continue
+            seq = first - 1
+            with f:
+                while f.tell() < seg_end:
+                    line = f.readline()
+                    if not line.strip():
+                        continue
+                    seq += 1
+                    if needle not in line:
+                        continue
+                    e = _parse_line(line, seq)
+                    if e is not None and e.get("event_id") == event_id:
+                        return int(e["seq"])
+        return None
@@ -1,12 +1,15 @@
-import json
+import heapq
 import os
+import threading
+import time
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
 from uuid import UUID
 
+from app.storage import record_codec, user_layout
 from app.storage.notes_store import _safe_user_dir, _note_path
 
 
@@ -14,14 +17,8 @@ def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _atomic_write_json(path: Path, data: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
-    with tmp_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    tmp_path.replace(path)
+def _atomic_write_json(path: Path, data: dict[str, Any], fmt: str) -> None:
+    record_codec.write_atomic(path, data, fmt)
 
 
 def _locks_dir(base_dir: Path, user_id: str) -> Path:
@@ -58,105 +55,237 @@ class Lock:
         }
 
 
+LockKey = tuple[str, uuid.UUID]  # (owner_user_id, note_id)
+
+
+class _LockTable:
+    """
+    Resident lock table for one data dir, shared by every LocksStore over it.
+
+    Reads never touch disk: active locks live in `locks`, and a min-heap of expiry times
+    drives a background sweeper that drops locks on time and emits LOCK_EXPIRED.
+    The per-lock JSON files are only a journal: written on acquire, removed on
+    release/expiry, and replayed when the table is first loaded (crash recovery).
+    """
+
+    def __init__(self, base_dir: Path, sweeper: bool):
+        self.base_dir = base_dir
+        self.fmt = record_codec.format_for(base_dir)
+        self.cond = threading.Condition()
+        self.locks: dict[LockKey, dict[str, Any]] = {}
+        self.heap: list[tuple[float, str, str, str]] = []  # (expires_ts, owner, note_id, lock_id)
+        self.writing: set[LockKey] = set()  # keys whose new lock file is being written
+        self.event_log = None
+        self.sweeper_enabled = sweeper
+        self._sweeper: Optional[threading.Thread] = None
+        self._recover()
+
+    def _recover(self) -> None:
+        with self.cond:
+            for _, user_dir in user_layout.iter_user_dirs(self.base_dir):
+                for p in user_dir.glob("locks/*.json"):
+                    try:
+                        raw = record_codec.load(p)
+                        key = (raw["owner_user_id"], uuid.UUID(raw["note_id"]))
+                        _parse_dt(raw["expires_at"])
+                    except (OSError, ValueError, KeyError, TypeError):
+                        continue  # unreadable lock file: skipped, as before
+                    self._insert(key, raw)
+        if self.heap:
+            self._ensure_sweeper()
+
+    # ---------------- table ops (call with self.cond held) ----------------
+
+    def _insert(self, key: LockKey, raw: dict[str, Any]) -> None:
+        self.locks[key] = raw
+        exp = _parse_dt(raw["expires_at"]).timestamp()
+        heapq.heappush(self.heap, (exp, key[0], str(key[1]), raw["lock_id"]))
+        self.cond.notify_all()
+
+    def _remove(self, key: LockKey) -> Optional[dict[str, Any]]:
+        raw = self.locks.pop(key, None)
+        if raw is not None:
+            try:
+                _lock_path(self.base_dir, key[0], key[1]).unlink()
+            except OSError:
+                pass
+        return raw
+
+    def get_active(self, key: LockKey) -> tuple[Optional[dict[str, Any]], Optional[dict[str, Any]]]:
+        """(active lock or None, lock that was found expired and removed now or None)."""
+        while key in self.writing:
+            self.cond.wait()  # a lock on this key is being acquired: wait for its outcome
+        raw = self.locks.get(key)
+        if raw is None:
+            return None, None
+        if _utc_now() >= _parse_dt(raw["expires_at"]):
+            return None, self._remove(key)
+        return raw, None
+
+    # ---------------- acquire (call without self.cond) ----------------
+
+    def acquire(
+        self, key: LockKey, new_raw: Callable[[], dict[str, Any]]
+    ) -> tuple[dict[str, Any], Optional[dict[str, Any]]]:
+        """
+        (active lock, expired lock removed now or None). An existing active lock is
+        returned as is; otherwise a new one is journaled and inserted. The key is reserved
+        while its file is written and fsynced, outside the table lock, so other keys
+        (and the sweeper) are not held up by the disk.
+        """
+        with self.cond:
+            raw, expired = self.get_active(key)
+            if raw is not None:
+                return raw, expired
+            raw = new_raw()
+            self.writing.add(key)
+        try:
+            _atomic_write_json(_lock_path(self.base_dir, key[0], key[1]), raw, self.fmt)
+        except BaseException:
+            with self.cond:
+                self.writing.discard(key)
+                self.cond.notify_all()
+            raise
+        with self.cond:
+            self.writing.discard(key)
+            self._insert(key, raw)
+        self._ensure_sweeper()
+        return raw, expired
+
+    # ---------------- sweeper ----------------
+
+    def _ensure_sweeper(self) -> None:
+        if self.sweeper_enabled and self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="lock-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _next_expired(self) -> tuple[LockKey, dict[str, Any]]:
+        with self.cond:
+            while True:
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+                exp, owner, note_id, lock_id = self.heap[0]
+                left = exp - time.time()
+                if left > 0:
+                    self.cond.wait(left)
+                    continue
+                heapq.heappop(self.heap)
+                key = (owner, uuid.UUID(note_id))
+                cur = self.locks.get(key)
+                if cur is None or cur.get("lock_id") != lock_id:
+                    continue  # released or replaced since it was scheduled
+                return key, self._remove(key)
+
+    def _sweep_forever(self) -> None:
+        while True:
+            key, raw = self._next_expired()
+            try:
+                self.emit_expired(key[0], key[1], raw)
+            except Exception:
+                # keep sweeping; in production log + alert
+                pass
+
+    def emit_expired(self, user_id: str, note_id: uuid.UUID, raw: Optional[dict[str, Any]]) -> None:
+        if raw is None or self.event_log is None:
+            return
+        from app.storage.event_log import Event
+        self.event_log.emit(
+            Event(
+                event_type="LOCK_EXPIRED",
+                user_id=user_id,
+                note_id=str(note_id),
+                lock_id=raw.get("lock_id"),
+                meta={"expires_at": raw.get("expires_at")},
+            )
+        )
+
+
+_tables: dict[Path, _LockTable] = {}
+_tables_lock = threading.Lock()
+
+
+def _table_for(base_dir: Path, sweeper: bool) -> _LockTable:
+    with _tables_lock:
+        t = _tables.get(base_dir)
+        if t is None:
+            t = _LockTable(base_dir, sweeper=sweeper)
+            _tables[base_dir] = t
+        return t
+
+
+def _lock_from_raw(raw: dict[str, Any]) -> Lock:
+    return Lock(
+        lock_id=record_codec.as_uuid(raw["lock_id"]),
+        note_id=record_codec.as_uuid(raw["note_id"]),
+        owner_user_id=raw["owner_user_id"],
+        holder_id=raw.get("holder_id") or raw.get("owner_user_id"),  # legacy fallback
+        created_at=raw["created_at"],
+        expires_at=raw["expires_at"],
+    )
+
+
 class LocksStore:
-    def __init__(self, base_dir: Path, default_ttl_seconds: int = 300, event_log=None):
+    def __init__(
+        self,
+        base_dir: Path,
+        default_ttl_seconds: int = 300,
+        event_log=None,
+        sweeper: Optional[bool] = None,
+        note_exists: Optional[Callable[[str, uuid.UUID], bool]] = None,
+    ):
         self.base_dir = base_dir
+        # how to check that a note exists (the pack engine has no per-note files)
+        self._note_exists = note_exists or (lambda u, n: _note_path(base_dir, u, n).exists())
         self.default_ttl_seconds = default_ttl_seconds
         self.event_log = event_log
+        if sweeper is None:
+            sweeper = os.getenv("LOCK_SWEEPER", "1") not in ("0", "false", "False")
+        self.table = _table_for(base_dir, sweeper=sweeper)
+        if event_log is not None and self.table.event_log is None:
+            self.table.event_log = event_log
 
-    def _is_expired(self, raw: dict[str, Any]) -> bool:
-        return _utc_now() >= _parse_dt(raw["expires_at"])
+    def _new_lock_raw(self, owner_user_id: str, note_id: uuid.UUID, holder_id: str) -> dict[str, Any]:
+        now = _utc_now()
+        return {
+            "lock_id": str(uuid.uuid4()),
+            "note_id": str(note_id),
+            "owner_user_id": owner_user_id,
+            "holder_id": holder_id,
+            "created_at": now.isoformat(),
+            "expires_at": (now + timedelta(seconds=self.default_ttl_seconds)).isoformat(),
+        }
 
     def acquire_lock(self, user_id: str, note_id: uuid.UUID) -> Lock | None:
         # no leak: lock only if note exists for this user
-        if not _note_path(self.base_dir, user_id, note_id).exists():
+        if not self._note_exists(user_id, note_id):
             return None
 
-        p = _lock_path(self.base_dir, user_id, note_id)
-        if p.exists():
-            raw = json.loads(p.read_text(encoding="utf-8"))
-            if not self._is_expired(raw):
-                # idempotent: return existing active lock
-                return Lock(
-                    lock_id=uuid.UUID(raw["lock_id"]),
-                    note_id=uuid.UUID(raw["note_id"]),
-                    owner_user_id=raw["owner_user_id"],
-                    holder_id=raw.get("holder_id") or raw.get("owner_user_id"),  # legacy fallback
-                    created_at=raw["created_at"],
-                    expires_at=raw["expires_at"],
-                )
-            # expired -> overwrite below
-
-        now = _utc_now()
-        lock = Lock(
-            lock_id=uuid.uuid4(),
-            note_id=note_id,
-            owner_user_id=user_id,
-            holder_id=user_id,
-            created_at=now.isoformat(),
-            expires_at=(now + timedelta(seconds=self.default_ttl_seconds)).isoformat(),
+        # idempotent: an existing active lock is returned as is
+        raw, expired = self.table.acquire(
+            (user_id, note_id), lambda: self._new_lock_raw(user_id, note_id, holder_id=user_id)
         )
-        _atomic_write_json(p, lock.to_dict())
-        return lock
+        self.table.emit_expired(user_id, note_id, expired)
+        return _lock_from_raw(raw)
 
     def release_lock(self, user_id: str, note_id: uuid.UUID) -> bool:
         # no leak: require note exists for this user
-        if not _note_path(self.base_dir, user_id, note_id).exists():
+        if not self._note_exists(user_id, note_id):
             return False
 
-        p = _lock_path(self.base_dir, user_id, note_id)
-        if not p.exists():
-            return False
-
-        raw = json.loads(p.read_text(encoding="utf-8"))
-        if self._is_expired(raw):
-            try:
-                p.unlink()
-            except OSError:
-                pass
-
-            if self.event_log:
-                from app.storage.event_log import Event
-                self.event_log.emit(
-                    Event(
-                        event_type="LOCK_EXPIRED",
-                        user_id=user_id,
-                        note_id=str(note_id),
-                        lock_id=raw.get("lock_id"),
-                        meta={"expires_at": raw.get("expires_at")},
-                    )
-                )
-            return False
-
-        try:
-            p.unlink()
-        except OSError:
-            pass
-        return True
+        key = (user_id, note_id)
+        with self.table.cond:
+            raw, expired = self.table.get_active(key)
+            if raw is not None:
+                self.table._remove(key)
+        self.table.emit_expired(user_id, note_id, expired)
+        return raw is not None
 
     def require_valid_lock(self, user_id: str, note_id: uuid.UUID, lock_id: uuid.UUID) -> bool:
-        p = _lock_path(self.base_dir, user_id, note_id)
-        if not p.exists():
-            return False
-
-        raw = json.loads(p.read_text(encoding="utf-8"))
-        if self._is_expired(raw):
-            try:
-                p.unlink()
-            except OSError:
-                pass
-
-            if self.event_log:
-                from app.storage.event_log import Event
-                self.event_log.emit(
-                    Event(
-                        event_type="LOCK_EXPIRED",
-                        user_id=user_id,
-                        note_id=str(note_id),
-                        lock_id=raw.get("lock_id"),
-                        meta={"expires_at": raw.get("expires_at")},
-                    )
-                )
+        with self.table.cond:
+            raw, expired = self.table.get_active((user_id, note_id))
+        self.table.emit_expired(user_id, note_id, expired)
+        if raw is None:
             return False
 
         holder = raw.get("holder_id") or raw.get("owner_user_id")  # legacy fallback
@@ -171,29 +300,15 @@ class LocksStore:
         Acquire a lock on an OWNER's note, but held by a share token (share:<share_id>).
         Stored under the owner's locks directory (same as normal locks).
         """
-        if not _note_path(self.base_dir, note_owner_user_id, note_id).exists():
+        if not self._note_exists(note_owner_user_id, note_id):
             return None
 
-        p = _lock_path(self.base_dir, note_owner_user_id, note_id)
-        if p.exists():
-            try:
-                raw = json.loads(p.read_text(encoding="utf-8"))
-                if not self._is_expired(raw):
-                    return raw
-            except Exception:
-                pass
-
-        now = _utc_now()
-        data = {
-            "lock_id": str(uuid.uuid4()),
-            "note_id": str(note_id),
-            "owner_user_id": note_owner_user_id,
-            "holder_id": f"share:{share_id}",
-            "created_at": now.isoformat(),
-            "expires_at": (now + timedelta(seconds=self.default_ttl_seconds)).isoformat(),
-        }
-        _atomic_write_json(p, data)
-        return data
+        raw, expired = self.table.acquire(
+            (note_owner_user_id, note_id),
+            lambda: self._new_lock_raw(note_owner_user_id, note_id, holder_id=f"share:{share_id}"),
+        )
+        self.table.emit_expired(note_owner_user_id, note_id, expired)
+        return dict(raw)
 
     def require_valid_lock_for_share(
         self,
@@ -205,20 +320,10 @@ class LocksStore:
         """
         Validate that a lock exists for the OWNER's note and is held by this share.
         """
-        p = _lock_path(self.base_dir, note_owner_user_id, note_id)
-        if not p.exists():
-            return False
-
-        try:
-            raw = json.loads(p.read_text(encoding="utf-8"))
-        except Exception:
-            return False
-
-        if self._is_expired(raw):
-            try:
-                p.unlink()
-            except OSError:
-                pass
+        with self.table.cond:
+            raw, expired = self.table.get_active((note_owner_user_id, note_id))
+        self.table.emit_expired(note_owner_user_id, note_id, expired)
+        if raw is None:
             return False
 
         if raw.get("lock_id") != str(lock_id):
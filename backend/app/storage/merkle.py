@@ -0,0 +1,136 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from app.utils.text_delta import content_hash
+
+# Per-user hash tree over (note_id, version, content hash), for anti-entropy between
+# replicas. The tree has a fixed shape: level i branches on the i-th hex digit of the note
+# id (ids are random uuid4s, so buckets fill evenly), leaves sit at NOTES_MERKLE_DEPTH and
+# hold the notes whose id starts with the leaf prefix.
+#
+#   leaf hash  = sha256 of "id:version:content_hash" lines, sorted by id
+#   inner hash = sha256 of "<digit><child hash>" over the non-empty children
+#   empty      = ""  (empty subtrees are left out of `children`)
+#
+# Two replicas compare root hashes, then only the children that differ, level by level,
+# so finding d divergent notes costs O(d * depth) node reads instead of a full scan.
+# Trees are built from the store on first use and kept current by the stores' write paths.
+
+DEPTH = int(os.getenv("NOTES_MERKLE_DEPTH", "3"))
+MAX_RESIDENT_TREES = int(os.getenv("NOTES_MERKLE_MAX_USERS", "1024"))
+
+_HEX = "0123456789abcdef"
+_PREFIX = re.compile(r"^[0-9a-f]*$")
+
+Digest = tuple[int, str]  # (version, content hash)
+
+
+def wins(incoming: Digest, existing: Optional[Digest]) -> bool:
+    """
+    Whether a replica holding `existing` should take `incoming`: higher version wins, and
+    equal versions with different content (concurrent edits) resolve to the larger hash so
+    every replica settles on the same note.
+    """
+    if existing is None:
+        return True
+    return tuple(incoming) > tuple(existing)
+
+
+class MerkleTree:
+    def __init__(self, depth: int = DEPTH):
+        self.depth = depth
+        self.leaves: dict[str, dict[str, Digest]] = {}
+        self._hashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _put(self, note_id: str, digest: Digest) -> None:
+        prefix = note_id[: self.depth]
+        self.leaves.setdefault(prefix, {})[note_id] = digest
+        for i in range(self.depth + 1):
+            self._hashes.pop(prefix[:i], None)
+
+    def put(self, note_id: str, version: int, chash: str) -> None:
+        with self._lock:
+            if self._built:
+                self._put(note_id, (version, chash))
+
+    def build(self, notes: Callable[[], Iterable[Any]]) -> None:
+        with self._lock:
+            if self._built:
+                return
+            for n in notes():
+                self._put(str(n.id), (n.version, content_hash(n.content)))
+            self._built = True
+
+    def _hash(self, prefix: str) -> str:
+        h = self._hashes.get(prefix)
+        if h is not None:
+            return h
+        if len(prefix) == self.depth:
+            items = sorted(self.leaves.get(prefix, {}).items())
+            body = "\n".join(f"{i}:{v}:{c}" for i, (v, c) in items)
+        else:
+            body = "".join(f"{d}{ch}" for d, ch in self._children(prefix).items())
+        h = hashlib.sha256(body.encode("utf-8")).hexdigest() if body else ""
+        self._hashes[prefix] = h
+        return h
+
+    def _children(self, prefix: str) -> dict[str, str]:
+        out = {}
+        for d in _HEX:
+            h = self._hash(prefix + d)
+            if h:
+                out[d] = h
+        return out
+
+    def node(self, prefix: str) -> dict[str, Any]:
+        if len(prefix) > self.depth or not _PREFIX.match(prefix):
+            raise ValueError("Invalid tree prefix")
+        with self._lock:
+            out: dict[str, Any] = {"prefix": prefix, "hash": self._hash(prefix)}
+            if len(prefix) == self.depth:
+                out["notes"] = {i: list(d) for i, d in sorted(self.leaves.get(prefix, {}).items())}
+            else:
+                out["children"] = self._children(prefix)
+            return out
+
+
+_trees: "OrderedDict[tuple[str, str], MerkleTree]" = OrderedDict()
+_trees_lock = threading.Lock()
+
+
+def _tree(root: str, user_id: str, create: bool) -> Optional[MerkleTree]:
+    with _trees_lock:
+        t = _trees.get((root, user_id))
+        if t is None and create:
+            t = MerkleTree()
+            _trees[(root, user_id)] = t
+        if t is not None:
+            _trees.move_to_end((root, user_id))
+        while len(_trees) > MAX_RESIDENT_TREES:
+            _trees.popitem(last=False)
+        return t
+
+
+def tree_for(root: str, user_id: str, notes: Callable[[], Iterable[Any]]) -> MerkleTree:
+    """Shared tree of one user's notes in the store at `root`; built from `notes()` on first use."""
+    t = _tree(root, user_id, create=True)
+    t.build(notes)
+    return t
+
+
+def note_written(root: str, note: Any) -> None:
+    """Called by the stores after every note write (no-op unless the tree is resident)."""
+    t = _tree(root, note.owner_user_id, create=False)
+    if t is not None:
+        t.put(str(note.id), note.version, content_hash(note.content))
+
+
+def nodes(root: str, user_id: str, notes: Callable[[], Iterable[Any]], prefixes: list[str]) -> list[dict[str, Any]]:
+    t = tree_for(root, user_id, notes)
+    return [t.node(p) for p in prefixes]
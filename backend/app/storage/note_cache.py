@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional
+
+# Stamp of the note file a cached value was read from / written to. Notes are replaced
+# atomically (tmp + rename), so any write - ours or external - changes the inode and
+# almost always mtime/size as well.
+Stamp = tuple[int, int, int]  # (st_mtime_ns, st_size, st_ino)
+
+
+def file_stamp(st: os.stat_result) -> Stamp:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class NoteCache:
+    """
+    Size-bounded (in bytes) LRU of parsed notes, keyed by (user_id, note_id).
+    A lookup only hits when the caller's fresh file stamp matches the cached one.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Hashable, tuple[Any, Stamp, int, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _cost(note: Any) -> int:
+        # rough footprint: the two free-text fields dominate
+        return len(note.title) + len(note.content) + 256
+
+    def get(self, key: Hashable, stamp: Stamp) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            note, cached_stamp, _, _ = item
+            if cached_stamp != stamp:
+                # changed on disk behind our back (other process, restore, hand edit)
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return note
+
+    def put(self, key: Hashable, note: Any, stamp: Stamp) -> None:
+        cost = self._cost(note)
+        if cost > self.max_bytes:
+            self.discard(key)
+            return
+        with self._lock:
+            old = self._items.get(key)
+            if old is not None and old[3] > note.version:
+                # version check: a concurrent writer already cached a newer version (our stat
+                # may even have seen its file); keep it, a stale stamp is caught on get()
+                return
+            if old is not None:
+                self._drop(key)
+            self._items[key] = (note, stamp, cost, note.version)
+            self._bytes += cost
+            while self._bytes > self.max_bytes and self._items:
+                k = next(iter(self._items))
+                self._drop(k)
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, cost, _ = self._items.pop(key)
+        self._bytes -= cost
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_caches: dict[Path, NoteCache] = {}
+_caches_lock = threading.Lock()
+
+
+def shared_cache(base_dir: Path, max_bytes: int) -> NoteCache:
+    """One cache per data dir, shared by every NotesStore over it (notes, shares, replication)."""
+    with _caches_lock:
+        c = _caches.get(base_dir)
+        if c is None or c.max_bytes != max_bytes:
+            c = NoteCache(max_bytes)
+            _caches[base_dir] = c
+        return c
@@ -0,0 +1,150 @@
+import base64
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Optional
+
+from app.storage import record_codec
+
+try:  # optional dependency
+    import zstandard as _zstd
+except ImportError:  # pragma: no cover - depends on the environment
+    _zstd = None
+
+# On-disk format of note content (file engine); the record itself is encoded in the data
+# dir's record format (app.storage.record_codec).
+#
+#   plain (no "format" key):  {"id": ..., "title": ..., "content": "<text>", ...}
+#   compressed:               {"format": "zlib" | "zstd", "id": ..., "title": ...,
+#                              "content": "<base64 of the compressed utf-8 content>", ...}
+#
+# Only `content` is compressed; every other field stays readable, so the manifest and
+# tools that only need metadata never decompress. Content is compressed when it is at
+# least NOTES_COMPRESS_MIN_BYTES long and compression actually saves space; readers
+# accept both formats, so NOTES_COMPRESS can be switched at any time and a
+# FormatRewriter converts existing files in the background.
+#
+# NOTES_COMPRESS: "off" (default), "zlib", "zstd" (needs `zstandard`), or "auto"
+# (zstd when installed, else zlib).
+
+MIN_BYTES = int(os.getenv("NOTES_COMPRESS_MIN_BYTES", "1024"))
+CODECS = ("zlib", "zstd")
+
+
+def available_codecs() -> tuple[str, ...]:
+    return CODECS if _zstd is not None else ("zlib",)
+
+
+def codec_from_env() -> Optional[str]:
+    name = os.getenv("NOTES_COMPRESS", "off").strip().lower()
+    if name in ("", "off", "0", "false", "none"):
+        return None
+    if name == "auto":
+        return "zstd" if _zstd is not None else "zlib"
+    if name not in available_codecs():
+        raise ValueError(f"Unsupported NOTES_COMPRESS codec: {name}")
+    return name
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    return _zstd.ZstdCompressor(level=3).compress(data)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if _zstd is None:
+            raise ValueError("Note is zstd-compressed but zstandard is not installed")
+        return _zstd.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown note format: {codec}")
+
+
+def encode(raw: dict[str, Any], codec: Optional[str], min_bytes: int = MIN_BYTES) -> dict[str, Any]:
+    """The dict to store for a plain note dict: tagged and compressed, or `raw` itself."""
+    if codec is None:
+        return raw
+    content = raw["content"].encode("utf-8")
+    if len(content) < min_bytes:
+        return raw
+    packed = base64.b64encode(_compress(codec, content)).decode("ascii")
+    if len(packed) >= len(content):
+        return raw  # incompressible (already packed data, random text)
+    return {"format": codec, **raw, "content": packed}
+
+
+def decode(stored: dict[str, Any]) -> dict[str, Any]:
+    """Plain note dict from a stored one, in either format."""
+    codec = stored.get("format")
+    if codec is None:
+        return stored
+    out = {k: v for k, v in stored.items() if k != "format"}
+    out["content"] = _decompress(codec, base64.b64decode(stored["content"])).decode("utf-8")
+    return out
+
+
+def read(path: Path, typed: bool = False) -> dict[str, Any]:
+    return decode(record_codec.load(path, typed))
+
+
+class FormatRewriter:
+    """
+    Background thread that converts existing note files to the configured format
+    (NOTES_COMPRESS), `rate` notes per second at most (NOTES_REWRITE_RATE, default 200),
+    then stops. The store does the per-note work (NotesStore.rewrite_note), under the
+    same lock as its regular writes.
+    """
+
+    def __init__(self, store: Any, codec: Optional[str], rate: Optional[float] = None):
+        self.store = store
+        self.codec = codec
+        if rate is None:
+            rate = float(os.getenv("NOTES_REWRITE_RATE", "200"))
+        self.rate = rate
+        self.scanned = 0
+        self.rewritten = 0
+        self.errors = 0
+        self.done = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="note-format-rewriter", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self) -> None:
+        pause = 1.0 / self.rate if self.rate > 0 else 0.0
+        try:
+            for user_id, note_id in self.store.iter_note_ids():
+                if self._stop.is_set():
+                    return
+                self.scanned += 1
+                try:
+                    if self.store.rewrite_note(user_id, note_id, self.codec):
+                        self.rewritten += 1
+                        if pause:
+                            time.sleep(pause)
+                except Exception:
+                    # corrupted or concurrently deleted files are left as they are
+                    self.errors += 1
+        finally:
+            self.done.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "codec": self.codec or "off",
+            "scanned": self.scanned,
+            "rewritten": self.rewritten,
+            "errors": self.errors,
+            "done": self.done.is_set(),
+        }
@@ -0,0 +1,290 @@
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from app.storage import record_codec
+
+# Per-user note manifest: users/<user_id>/notes_manifest.log
+# Append-only JSON lines, last record per id wins:
+#   {"op": "put", "id": ..., "title": ..., "created_at": ..., "updated_at": ..., "version": ..., "mtime_ns": ...}
+#   {"op": "del", "id": ...}
+# mtime_ns is the note file's mtime when the record was written; on load, any note file whose
+# mtime differs (or that the manifest does not know) is re-read, so a crash between the note
+# write and the manifest append heals itself. The journal is rewritten once it holds more
+# than twice as many records as live entries.
+#
+# In memory, the manifest also keeps (timestamp_us, id) lists sorted by updated_at and by
+# created_at, which back cursor pagination and updated_since filtering for GET /notes.
+
+MAX_RESIDENT_MANIFESTS = int(os.getenv("NOTES_MANIFEST_MAX_USERS", "1024"))
+
+SORT_FIELDS = ("updated_at", "created_at")
+
+PageKey = tuple[int, str]  # (timestamp in epoch microseconds, note id)
+
+
+def ts_us(s: str | datetime) -> int:
+    dt = s if isinstance(s, datetime) else datetime.fromisoformat(s)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _key_us(s: str) -> int:
+    # malformed timestamps (e.g. from a replicated payload) sort first instead of failing
+    try:
+        return ts_us(s)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    id: str
+    title: str
+    created_at: str
+    updated_at: str
+    version: int
+    mtime_ns: int = 0
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "op": "put",
+            "id": self.id,
+            "title": self.title,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "version": self.version,
+            "mtime_ns": self.mtime_ns,
+        }
+
+
+def _entry_from_raw(raw: dict[str, Any], mtime_ns: int) -> ManifestEntry:
+    return ManifestEntry(
+        id=str(raw["id"]),
+        title=raw["title"],
+        created_at=raw["created_at"],
+        updated_at=raw["updated_at"],
+        version=int(raw["version"]),
+        mtime_ns=mtime_ns,
+    )
+
+
+class NotesManifest:
+    def __init__(self, notes_dir: Path):
+        self.notes_dir = notes_dir
+        self.path = notes_dir.parent / "notes_manifest.log"
+        self.lock = threading.RLock()
+        self.entries: dict[str, ManifestEntry] = {}
+        self._sorted: dict[str, list[PageKey]] = {f: [] for f in SORT_FIELDS}
+        self._records = 0
+        self._offset = 0  # bytes of the journal already applied
+        self._ino = 0  # a compaction (tmp + replace) changes the inode
+        self._load()
+
+    # ---------------- journal ----------------
+
+    def _apply(self, rec: dict[str, Any]) -> None:
+        self._records += 1
+        old = self.entries.get(rec.get("id"))
+        if old is not None:
+            for f in SORT_FIELDS:
+                keys = self._sorted[f]
+                i = bisect.bisect_left(keys, (_key_us(getattr(old, f)), old.id))
+                if i < len(keys) and keys[i][1] == old.id:
+                    del keys[i]
+        if rec.get("op") == "del":
+            self.entries.pop(rec.get("id"), None)
+            return
+        e = _entry_from_raw(rec, int(rec.get("mtime_ns", 0)))
+        self.entries[e.id] = e
+        for f in SORT_FIELDS:
+            bisect.insort(self._sorted[f], (_key_us(getattr(e, f)), e.id))
+
+    def _read_tail(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn / in-progress append
+                self._offset += len(line)
+                try:
+                    self._apply(json.loads(line))
+                except Exception:
+                    continue
+
+    def _append(self, records: list[dict[str, Any]]) -> None:
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        # no fsync: the manifest is derived data and heals from the note files on load
+        with self.path.open("ab") as f:
+            f.write(data)
+            if not self._ino:
+                self._ino = os.fstat(f.fileno()).st_ino
+        self._offset += len(data)
+        for r in records:
+            self._apply(r)
+        if self._records > 2 * len(self.entries) + 64:
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp = self.path.with_suffix(".log.tmp")
+        data = "".join(json.dumps(e.to_record(), ensure_ascii=False) + "\n" for e in self.entries.values())
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+        self._records = len(self.entries)
+        self._offset = len(data.encode("utf-8"))
+        self._ino = self.path.stat().st_ino
+
+    def _reset(self) -> None:
+        self.entries = {}
+        self._sorted = {f: [] for f in SORT_FIELDS}
+        self._records = 0
+
+    def _load(self) -> None:
+        self._reset()
+        self._offset = 0
+        self._ino = 0
+        if self.path.exists():
+            self._ino = self.path.stat().st_ino
+            self._read_tail()
+            if self.path.stat().st_size > self._offset:
+                # torn last append (crash): cut it so new records start on a line boundary
+                with self.path.open("rb+") as f:
+                    f.truncate(self._offset)
+        self._heal()
+
+    def _heal(self) -> None:
+        """Reconcile with the note files using directory metadata only; bodies are read only for drifted notes."""
+        on_disk: dict[str, int] = {}
+        if self.notes_dir.exists():
+            with os.scandir(self.notes_dir) as it:
+                for de in it:
+                    if de.name.endswith(".json") and de.is_file():
+                        try:
+                            on_disk[de.name[:-5]] = de.stat().st_mtime_ns
+                        except OSError:
+                            continue
+
+        fixes: list[dict[str, Any]] = []
+        for note_id, mtime_ns in on_disk.items():
+            e = self.entries.get(note_id)
+            if e is not None and e.mtime_ns == mtime_ns:
+                continue
+            try:
+                raw = record_codec.load(self.notes_dir / f"{note_id}.json")
+                fixes.append(_entry_from_raw(raw, mtime_ns).to_record())
+            except Exception:
+                # In MVP, ignore corrupted files (later: log + audit)
+                continue
+        for note_id in list(self.entries):
+            if note_id not in on_disk:
+                fixes.append({"op": "del", "id": note_id})
+        self._append(fixes)
+
+    # ---------------- public ----------------
+
+    def refresh(self) -> None:
+        """Pick up appends made by other processes (or a rewrite, which forces a reload)."""
+        try:
+            st = self.path.stat()
+            size, ino = st.st_size, st.st_ino
+        except OSError:
+            size, ino = 0, 0
+        if size < self._offset or (self._ino and ino != self._ino):
+            self._load()
+        elif size > self._offset:
+            self._read_tail()
+
+    def put(self, entry: ManifestEntry) -> None:
+        with self.lock:
+            self.refresh()
+            self._append([entry.to_record()])
+
+    def rebuild(self) -> int:
+        with self.lock:
+            self._reset()
+            self._heal()
+            self._compact()
+            return len(self.entries)
+
+    def snapshot(self) -> list[ManifestEntry]:
+        with self.lock:
+            self.refresh()
+            return list(self.entries.values())
+
+    def page(
+        self,
+        sort: str = "updated_at",
+        descending: bool = False,
+        after: Optional[PageKey] = None,
+        updated_since_us: Optional[int] = None,
+        limit: int = 100,
+    ) -> tuple[list[ManifestEntry], Optional[PageKey]]:
+        """
+        One page of entries ordered by `sort`, strictly after the `after` key (in the
+        requested direction), optionally restricted to updated_at >= updated_since_us.
+        Returns (entries, key to resume from or None when there is nothing left).
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError("Invalid sort field")
+        with self.lock:
+            self.refresh()
+            keys = self._sorted[sort]
+            lo = 0
+            if updated_since_us is not None:
+                if sort == "updated_at":
+                    lo = bisect.bisect_left(keys, (updated_since_us, ""))
+                else:
+                    # narrow via the updated_at index, then order the (usually few) hits
+                    upd = self._sorted["updated_at"]
+                    hits = upd[bisect.bisect_left(upd, (updated_since_us, "")) :]
+                    keys = sorted((_key_us(self.entries[i].created_at), i) for _, i in hits)
+
+            if not descending:
+                start = lo if after is None else max(lo, bisect.bisect_right(keys, after))
+                chunk = keys[start : start + limit]
+                more = start + limit < len(keys)
+            else:
+                end = len(keys) if after is None else bisect.bisect_left(keys, after)
+                start = max(lo, end - limit)
+                chunk = keys[start:end][::-1]
+                more = start > lo
+
+            out = [self.entries[i] for _, i in chunk]
+            return out, (chunk[-1] if chunk and more else None)
+
+
+_manifests: "OrderedDict[Path, NotesManifest]" = OrderedDict()
+_manifests_lock = threading.Lock()
+
+
+def manifest_for(notes_dir: Path) -> NotesManifest:
+    """
+    Shared, resident manifest per notes dir (every NotesStore instance in the process
+    sees the same one, so writes through any of them are visible to all).
+    """
+    with _manifests_lock:
+        m = _manifests.get(notes_dir)
+        if m is None:
+            m = NotesManifest(notes_dir)
+            _manifests[notes_dir] = m
+        else:
+            _manifests.move_to_end(notes_dir)
+        while len(_manifests) > MAX_RESIDENT_MANIFESTS:
+            _manifests.popitem(last=False)
+        return m
@@ -1,36 +1,70 @@
-import json
 import os
+import threading
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Optional
+
+from app.storage import merkle, note_format, record_codec, search_index, user_layout
+from app.storage.note_cache import NoteCache, file_stamp, shared_cache
+from app.storage.notes_manifest import ManifestEntry, PageKey, manifest_for, ts_us
 
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _safe_user_dir(base_dir: Path, user_id: str) -> Path:
+def _check_user_id(user_id: str) -> None:
     # user_id is currently from header; keep it strict-ish to avoid path issues.
     # (Auth team will later provide a trusted user id.)
     if not user_id or any(ch in user_id for ch in "/\\.."):
         raise ValueError("Invalid user_id")
-    return base_dir / "users" / user_id / "notes"
+
+
+def _safe_user_dir(base_dir: Path, user_id: str) -> Path:
+    # data/users/<user_id>/notes, or users/ab/cd/<user_id>/notes (see app.storage.user_layout)
+    _check_user_id(user_id)
+    return user_layout.user_dir(base_dir, user_id) / "notes"
 
 
 def _note_path(base_dir: Path, user_id: str, note_id: uuid.UUID) -> Path:
     return _safe_user_dir(base_dir, user_id) / f"{note_id}.json"
 
 
-def _atomic_write_json(path: Path, data: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
-    with tmp_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    tmp_path.replace(path)
+def _prev_path(base_dir: Path, user_id: str, note_id: uuid.UUID) -> Path:
+    # data/users/<user>/notes_prev/<note_id>.json: the version before the current one,
+    # kept so replication can ship deltas (see NotesStore.get_previous)
+    return _safe_user_dir(base_dir, user_id).parent / "notes_prev" / f"{note_id}.json"
+
+
+def _keep_previous(path: Path, prev_path: Path) -> None:
+    """Retain the current file as the previous version before it is replaced."""
+    prev_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = prev_path.with_suffix(".json.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        # hard link: no copy, the old inode simply survives the atomic replace
+        os.link(path, tmp)
+    except FileNotFoundError:
+        return
+    except OSError:
+        tmp.write_bytes(path.read_bytes())
+    tmp.replace(prev_path)
+
+
+def _atomic_write_json(path: Path, data: dict[str, Any], fmt: str) -> None:
+    # `data` comes from note_format.encode; compressed notes are not meant for reading,
+    # so their JSON is written without indentation
+    record_codec.write_atomic(path, data, fmt, compact="format" in data)
+
+
+# note file writes (and format rewrites) serialize per note, striped by path
+_write_locks = [threading.Lock() for _ in range(64)]
+
+
+def _write_lock(path: Path) -> threading.Lock:
+    return _write_locks[hash(path.name) % len(_write_locks)]
 
 
 @dataclass(frozen=True)
@@ -55,9 +89,86 @@ class Note:
         }
 
 
+@dataclass(frozen=True)
+class NoteSummary:
+    id: uuid.UUID
+    title: str
+    created_at: str
+    updated_at: str
+    version: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": str(self.id),
+            "title": self.title,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "version": self.version,
+        }
+
+
+def _summary_from_entry(e: ManifestEntry) -> NoteSummary:
+    return NoteSummary(
+        id=uuid.UUID(e.id),
+        title=e.title,
+        created_at=e.created_at,
+        updated_at=e.updated_at,
+        version=e.version,
+    )
+
+
+def _note_from_raw(raw: dict[str, Any]) -> Note:
+    return Note(
+        id=record_codec.as_uuid(raw["id"]),
+        owner_user_id=raw["owner_user_id"],
+        title=raw["title"],
+        content=raw["content"],
+        created_at=raw["created_at"],
+        updated_at=raw["updated_at"],
+        version=int(raw["version"]),
+    )
+
+
 class NotesStore:
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, cache_bytes: Optional[int] = None, codec: Optional[str] = None):
         self.base_dir = base_dir
+        # content compression for new writes (NOTES_COMPRESS), see app.storage.note_format
+        self.codec = codec if codec is not None else note_format.codec_from_env()
+        # record encoding of the data dir (json or bin1), see app.storage.record_codec
+        self.fmt = record_codec.format_for(base_dir)
+        # optional read cache, shared per data dir (NOTES_CACHE_BYTES, 0 = off)
+        if cache_bytes is None:
+            cache_bytes = int(os.getenv("NOTES_CACHE_BYTES", "0"))
+        self.cache: Optional[NoteCache] = shared_cache(base_dir, cache_bytes) if cache_bytes > 0 else None
+
+    def _write(self, path: Path, note: Note, keep_previous: bool) -> None:
+        # the stamp is taken under the same lock, so a concurrent writer (FormatRewriter)
+        # can't pair this file's mtime with another version's manifest entry
+        with _write_lock(path):
+            if keep_previous:
+                _keep_previous(path, _prev_path(self.base_dir, note.owner_user_id, note.id))
+            _atomic_write_json(path, note_format.encode(note.to_dict(), self.codec), self.fmt)
+            self._stamp(path, note)
+
+    def _after_write(self, path: Path, note: Note) -> None:
+        merkle.note_written(str(self.base_dir), note)
+        search_index.note_written(path.parent.parent / "search_index.log", note)
+
+    def _stamp(self, path: Path, note: Note) -> None:
+        st = path.stat()
+        if self.cache is not None:
+            self.cache.put((note.owner_user_id, note.id), note, file_stamp(st))
+        # record the file's mtime so the manifest can later tell if it drifted from the note
+        manifest_for(path.parent).put(
+            ManifestEntry(
+                id=str(note.id),
+                title=note.title,
+                created_at=note.created_at,
+                updated_at=note.updated_at,
+                version=note.version,
+                mtime_ns=st.st_mtime_ns,
+            )
+        )
 
     def create_note(self, user_id: str, title: str, content: str) -> Note:
         note_id = uuid.uuid4()
@@ -72,7 +183,8 @@ class NotesStore:
             version=1,
         )
         path = _note_path(self.base_dir, user_id, note_id)
-        _atomic_write_json(path, note.to_dict())
+        self._write(path, note, keep_previous=False)
+        self._after_write(path, note)
         return note
 
     def list_notes(self, user_id: str) -> list[Note]:
@@ -82,62 +194,114 @@ class NotesStore:
         out: list[Note] = []
         for p in sorted(notes_dir.glob("*.json")):
             try:
-                raw = json.loads(p.read_text(encoding="utf-8"))
-                out.append(
-                    Note(
-                        id=uuid.UUID(raw["id"]),
-                        owner_user_id=raw["owner_user_id"],
-                        title=raw["title"],
-                        content=raw["content"],
-                        created_at=raw["created_at"],
-                        updated_at=raw["updated_at"],
-                        version=int(raw["version"]),
-                    )
-                )
+                out.append(_note_from_raw(note_format.read(p, typed=True)))
             except Exception:
                 # In MVP, ignore corrupted files (later: log + audit)
                 continue
         return out
 
+    def list_summaries(self, user_id: str) -> list[NoteSummary]:
+        """
+        List a user's notes from the manifest (id, title, timestamps, version),
+        without opening any note file.
+        """
+        notes_dir = _safe_user_dir(self.base_dir, user_id)
+        if not notes_dir.exists():
+            return []
+        entries = manifest_for(notes_dir).snapshot()
+        return [_summary_from_entry(e) for e in sorted(entries, key=lambda e: e.id)]
+
+    def page_summaries(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[PageKey] = None,
+        sort: str = "updated_at",
+        descending: bool = False,
+        updated_since: Optional[datetime] = None,
+    ) -> tuple[list[NoteSummary], Optional[PageKey]]:
+        """
+        One page of summaries, served from the manifest's sorted indexes.
+        Returns (summaries, key to pass as `after` for the next page, or None).
+        """
+        notes_dir = _safe_user_dir(self.base_dir, user_id)
+        if not notes_dir.exists():
+            return [], None
+        entries, next_key = manifest_for(notes_dir).page(
+            sort=sort,
+            descending=descending,
+            after=after,
+            updated_since_us=ts_us(updated_since) if updated_since is not None else None,
+            limit=limit,
+        )
+        return [_summary_from_entry(e) for e in entries], next_key
+
+    def rebuild_manifest(self, user_id: str) -> int:
+        return manifest_for(_safe_user_dir(self.base_dir, user_id)).rebuild()
+
+    def _search_index(self, user_id: str) -> search_index.SearchIndex:
+        return search_index.index_for(_safe_user_dir(self.base_dir, user_id).parent / "search_index.log")
+
+    def search(
+        self, user_id: str, q: str, limit: int = 20, after: Optional[search_index.SearchKey] = None
+    ) -> tuple[list[search_index.SearchHit], Optional[search_index.SearchKey]]:
+        """Ranked full-text search over the user's notes (see app.storage.search_index)."""
+        idx = self._search_index(user_id)
+        idx.ensure_loaded(self, user_id)
+        return idx.search(q, limit=limit, after=after)
+
+    def rebuild_search_index(self, user_id: str) -> int:
+        return self._search_index(user_id).rebuild(self.list_notes(user_id))
+
+    def merkle_nodes(self, user_id: str, prefixes: list[str]) -> list[dict[str, Any]]:
+        """Nodes of the user's (note_id, version, content hash) tree; see app.storage.merkle."""
+        _safe_user_dir(self.base_dir, user_id)
+        return merkle.nodes(str(self.base_dir), user_id, lambda: self.list_notes(user_id), prefixes)
+
     def get_note(self, user_id: str, note_id: uuid.UUID) -> Note | None:
         path = _note_path(self.base_dir, user_id, note_id)
-        if not path.exists():
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            if self.cache is not None:
+                self.cache.discard((user_id, note_id))
             return None
-        raw = json.loads(path.read_text(encoding="utf-8"))
-        return Note(
-            id=uuid.UUID(raw["id"]),
-            owner_user_id=raw["owner_user_id"],
-            title=raw["title"],
-            content=raw["content"],
-            created_at=raw["created_at"],
-            updated_at=raw["updated_at"],
-            version=int(raw["version"]),
-        )
+
+        if self.cache is not None:
+            cached = self.cache.get((user_id, note_id), file_stamp(st))
+            if cached is not None:
+                return cached
+
+        note = _note_from_raw(note_format.read(path, typed=True))
+        if self.cache is not None:
+            self.cache.put((user_id, note_id), note, file_stamp(st))
+        return note
 
     def update_note(self, user_id: str, note_id: uuid.UUID, title: str, content: str) -> Note | None:
-        path = _note_path(self.base_dir, user_id, note_id)
-        if not path.exists():
+        existing = self.get_note(user_id, note_id)
+        if existing is None:
             return None
 
-        raw = json.loads(path.read_text(encoding="utf-8"))
+        raw = existing.to_dict()
         now = _utc_now_iso()
 
         raw["title"] = title
         raw["content"] = content
         raw["updated_at"] = now
-        raw["version"] = int(raw.get("version", 1)) + 1
-
-        _atomic_write_json(path, raw)
-
-        return Note(
-            id=uuid.UUID(raw["id"]),
-            owner_user_id=raw["owner_user_id"],
-            title=raw["title"],
-            content=raw["content"],
-            created_at=raw["created_at"],
-            updated_at=raw["updated_at"],
-            version=int(raw["version"]),
-        )
+        raw["version"] = existing.version + 1
+
+        path = _note_path(self.base_dir, user_id, note_id)
+        note = _note_from_raw(raw)
+        self._write(path, note, keep_previous=True)
+        self._after_write(path, note)
+        return note
+
+    def get_previous(self, user_id: str, note_id: uuid.UUID) -> Note | None:
+        """The version the current one replaced, if still retained (best effort)."""
+        try:
+            return _note_from_raw(note_format.read(_prev_path(self.base_dir, user_id, note_id), typed=True))
+        except (OSError, ValueError, KeyError):
+            return None
 
     def apply_note_raw(self, raw: dict[str, Any]) -> Note:
         """
@@ -165,14 +329,42 @@ class NotesStore:
             "version": int(raw.get("version", 1)),
         }
 
-        _atomic_write_json(path, to_write)
+        note = _note_from_raw(to_write)
+        self._write(path, note, keep_previous=True)
+        self._after_write(path, note)
+        return note
 
-        return Note(
-            id=note_id,
-            owner_user_id=user_id,
-            title=to_write["title"],
-            content=to_write["content"],
-            created_at=to_write["created_at"],
-            updated_at=to_write["updated_at"],
-            version=int(to_write["version"]),
-        )
+    # ---------------- format rewrite ----------------
+
+    def iter_note_ids(self) -> Iterator[tuple[str, uuid.UUID]]:
+        """(user_id, note_id) of every note file in the data dir."""
+        for user_id, user_dir in user_layout.iter_user_dirs(self.base_dir):
+            notes_dir = user_dir / "notes"
+            if not notes_dir.is_dir():
+                continue
+            for p in sorted(notes_dir.glob("*.json")):
+                try:
+                    yield user_id, uuid.UUID(p.stem)
+                except ValueError:
+                    continue
+
+    def rewrite_note(self, user_id: str, note_id: uuid.UUID, codec: Optional[str]) -> bool:
+        """
+        Re-store one note file in `codec`'s format (None = plain) if it is not already;
+        the note itself is unchanged. Returns whether the file was rewritten.
+        """
+        path = _note_path(self.base_dir, user_id, note_id)
+        with _write_lock(path):
+            try:
+                stored = record_codec.load(path)
+            except FileNotFoundError:
+                return False
+            raw = note_format.decode(stored)
+            target = note_format.encode(raw, codec)
+            if target.get("format") == stored.get("format"):
+                return False
+            _atomic_write_json(path, target, self.fmt)
+            # new mtime: keep the manifest and cache stamps current (no content change to
+            # index), still under the lock so a racing update's entry can't be overwritten
+            self._stamp(path, _note_from_raw(raw))
+        return True
@@ -0,0 +1,539 @@
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, ContextManager, Iterator, Optional
+
+from app.storage import merkle, note_format, record_codec, search_index
+from app.storage.notes_manifest import SORT_FIELDS, NotesManifest, PageKey, ts_us
+from app.storage.notes_store import (
+    Note,
+    NoteSummary,
+    _note_from_raw,
+    _safe_user_dir,
+    _summary_from_entry,
+    _utc_now_iso,
+)
+
+# Pack-file notes backend (STORAGE_ENGINE=pack): one append-only data file per user,
+# users/<user_id>/notes.pack, instead of one file per note. Every write appends a record
+#
+#   header  "NP", version, flags, payload length (u32), crc32 of id + payload (u32),
+#           note id (16 bytes)
+#   payload the note dict, as note_format.encode + record_codec (data dir's format)
+#
+# and fsyncs. The pack is mapped with mmap; a resident per-user index maps each note id
+# to its current record and the one before it (get_previous, for replication deltas),
+# plus the summaries that back list_summaries / page_summaries.
+#
+# Opening a pack scans the record headers and checks every crc. Records are appended and
+# fsynced in order, so only the last record can be torn by a crash: a header or length
+# running past EOF, or a crc mismatch on the final record, is cut off. Anything bad before
+# that is damage, not a crash: a record whose crc fails is copied to notes.pack.bad and
+# skipped (the notes after it stay readable), and an unreadable header with valid records
+# after it makes the open fail rather than dropping them.
+#
+# Superseded versions are dropped by compaction, which rewrites the current and previous
+# record of every note to a new file. It runs on a background thread once a pack is at
+# least NOTES_PACK_COMPACT_MIN_BYTES and more than half garbage; writes continue while the
+# live records are copied, and the records appended meanwhile are carried over before
+# the new file replaces the old one.
+#
+# At most NOTES_PACK_MAX_USERS packs stay resident: the least recently used ones are
+# dropped with their index and file descriptor, and rebuilt by a scan when next used.
+# A pack is never dropped while in use (pinned_pack) or while it is queued for or under
+# compaction, so there is only ever one Pack object appending to a file.
+
+_HEADER = struct.Struct("<2sBBII16s")
+MAGIC = b"NP"
+VERSION = 1
+COMPACT_MIN_BYTES = int(os.getenv("NOTES_PACK_COMPACT_MIN_BYTES", str(1 << 20)))
+MAX_OPEN_PACKS = int(os.getenv("NOTES_PACK_MAX_OPEN", "256"))
+MAX_RESIDENT_PACKS = int(os.getenv("NOTES_PACK_MAX_USERS", "4096"))
+
+Span = tuple[int, int]  # (offset, length) of a whole record
+
+log = logging.getLogger(__name__)
+
+
+class _Summaries(NotesManifest):
+    """The manifest's sorted summary indexes, without its journal: the pack is the source of truth."""
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._reset()
+
+    def refresh(self) -> None:
+        pass
+
+    def set(self, raw: dict[str, Any]) -> None:
+        self._apply({"op": "put", **{k: raw[k] for k in ("id", "title", "created_at", "updated_at", "version")}})
+
+
+def _payload(raw: dict[str, Any], codec: Optional[str], fmt: str) -> bytes:
+    stored = note_format.encode(raw, codec)
+    return record_codec.dumps(stored, fmt, compact=True)
+
+
+def _frame(note_id: str, payload: bytes) -> bytes:
+    nid = uuid.UUID(note_id).bytes
+    crc = zlib.crc32(payload, zlib.crc32(nid))
+    return _HEADER.pack(MAGIC, VERSION, 0, len(payload), crc, nid) + payload
+
+
+class Pack:
+    """One user's pack file and its resident index."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.fd: Optional[int] = None
+        self.mm: Optional[mmap.mmap] = None
+        self.size = 0
+        self.current: dict[str, Span] = {}
+        self.previous: dict[str, Span] = {}
+        self.live = 0  # bytes of current + previous records; the rest is garbage
+        self.summaries = _Summaries()
+        self.truncated = 0  # bytes cut off as a torn tail when the pack was opened
+        self.damaged = 0  # records skipped for a crc mismatch (copied to notes.pack.bad)
+        self.compacting = False
+        self.queued = False
+        self.loaded = False
+        self.pins = 0  # pinned_pack() holders; guarded by _packs_lock
+
+    # ---------------- file ----------------
+
+    def _open(self) -> None:
+        if self.fd is not None:
+            _touch(self)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.size = os.fstat(self.fd).st_size
+        self.mm = None
+        if not self.loaded:
+            self._scan()
+        _touch(self)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def _view(self, end: int) -> mmap.mmap:
+        if self.mm is None or len(self.mm) < end:
+            if self.mm is not None:
+                self.mm.close()
+            self.mm = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+        return self.mm
+
+    def _header_at(self, mm: mmap.mmap, off: int) -> Optional[tuple[int, int, bytes]]:
+        """(end, crc, note id bytes) of a well-formed header at `off` within the file."""
+        if off + _HEADER.size > self.size:
+            return None
+        magic, version, _flags, n, crc, nid = _HEADER.unpack_from(mm, off)
+        end = off + _HEADER.size + n
+        if magic != MAGIC or version != VERSION or end > self.size:
+            return None
+        return end, crc, nid
+
+    def _crc_ok(self, mm: mmap.mmap, off: int, end: int, crc: int, nid: bytes) -> bool:
+        return zlib.crc32(mm[off + _HEADER.size : end], zlib.crc32(nid)) == crc
+
+    def _valid_record_after(self, mm: mmap.mmap, off: int) -> bool:
+        pos = mm.find(MAGIC, off + 1)
+        while pos != -1:
+            h = self._header_at(mm, pos)
+            if h is not None and self._crc_ok(mm, pos, *h):
+                return True
+            pos = mm.find(MAGIC, pos + 1)
+        return False
+
+    def _quarantine(self, mm: mmap.mmap, off: int, end: int) -> None:
+        with self.path.with_suffix(".pack.bad").open("ab") as f:
+            f.write(mm[off:end])
+            f.flush()
+            os.fsync(f.fileno())
+        self.damaged += 1
+        log.warning("%s: crc mismatch in record at offset %d, moved to %s.bad", self.path, off, self.path.name)
+
+    def _scan(self) -> None:
+        self.current, self.previous = {}, {}
+        self.live = 0
+        self.summaries = _Summaries()
+        off = 0
+        if self.size:
+            mm = self._view(self.size)
+            while off < self.size:
+                h = self._header_at(mm, off)
+                if h is None:
+                    if self._valid_record_after(mm, off):
+                        log.error("%s: unreadable record header at offset %d before valid records", self.path, off)
+                        self.close()
+                        raise ValueError(f"Damaged note pack {self.path} at offset {off}")
+                    break  # torn tail
+                end, crc, nid = h
+                if not self._crc_ok(mm, off, end, crc, nid):
+                    if end == self.size:
+                        break  # torn tail
+                    self._quarantine(mm, off, end)
+                else:
+                    self._index(str(uuid.UUID(bytes=nid)), (off, end - off))
+                off = end
+        if off < self.size:
+            self.truncated = self.size - off
+            if self.mm is not None:
+                self.mm.close()
+                self.mm = None
+            os.ftruncate(self.fd, off)
+            os.fsync(self.fd)
+            self.size = off
+        for note_id in self.current:
+            self.summaries.set(self._read(self.current[note_id]))
+        self.loaded = True
+        if self.damaged:
+            _schedule_compaction(self)  # drops the damaged records from the pack
+
+    def _index(self, note_id: str, span: Span) -> None:
+        old = self.current.get(note_id)
+        if old is not None:
+            dropped = self.previous.get(note_id)
+            if dropped is not None:
+                self.live -= dropped[1]
+            self.previous[note_id] = old
+        self.current[note_id] = span
+        self.live += span[1]
+
+    def _read(self, span: Span, typed: bool = False) -> dict[str, Any]:
+        off, length = span
+        mm = self._view(off + length)
+        return note_format.decode(record_codec.loads(mm[off + _HEADER.size : off + length], typed))
+
+    # ---------------- public ----------------
+
+    def get(self, note_id: str, previous: bool = False, typed: bool = False) -> Optional[dict[str, Any]]:
+        with self.lock:
+            self._open()
+            span = (self.previous if previous else self.current).get(note_id)
+            return self._read(span, typed) if span is not None else None
+
+    def put(self, raw: dict[str, Any], payload: bytes) -> None:
+        rec = _frame(raw["id"], payload)
+        with self.lock:
+            self._open()
+            off = self.size
+            written = 0
+            while written < len(rec):
+                written += os.pwrite(self.fd, rec[written:], off + written)
+            os.fsync(self.fd)
+            self.size += len(rec)
+            self._index(raw["id"], (off, len(rec)))
+            self.summaries.set(raw)
+            if self.size >= COMPACT_MIN_BYTES and 2 * self.live < self.size:
+                _schedule_compaction(self)
+
+    def ids(self) -> list[str]:
+        with self.lock:
+            self._open()
+            return sorted(self.current)
+
+    def compact(self) -> int:
+        """Rewrite the pack with only the current and previous record of each note; returns bytes saved."""
+        with self.lock:
+            self._open()
+            self.queued = False
+            if self.compacting:
+                return 0
+            self.compacting = True
+            end = self.size
+            keep = sorted([*self.current.values(), *self.previous.values()])
+            fd = os.dup(self.fd)
+        tmp = self.path.with_suffix(".pack.tmp")
+        try:
+            with tmp.open("wb") as out:
+                # copy live records (in file order, so the last one per note stays current)
+                for off, length in keep:
+                    out.write(os.pread(fd, length, off))
+                with self.lock:
+                    # carry over what was appended while copying, then swap files
+                    before = self.size
+                    if before > end:
+                        out.write(os.pread(fd, before - end, end))
+                    out.flush()
+                    os.fsync(out.fileno())
+                    tmp.replace(self.path)
+                    self.close()
+                    self.loaded = False
+                    self._open()
+                    return before - self.size
+        finally:
+            os.close(fd)
+            self.compacting = False
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            self._open()
+            return {
+                "notes": len(self.current),
+                "bytes": self.size,
+                "live_bytes": self.live,
+                "damaged": self.damaged,
+            }
+
+
+# ---------------- registry ----------------
+
+_packs: "OrderedDict[Path, Pack]" = OrderedDict()
+_packs_lock = threading.Lock()
+_open_packs: "OrderedDict[Path, Pack]" = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def _get(path: Path) -> Pack:
+    p = _packs.get(path)
+    if p is None:
+        p = _packs[path] = Pack(path)
+    else:
+        _packs.move_to_end(path)
+    return p
+
+
+def _evict() -> None:
+    over = len(_packs) - MAX_RESIDENT_PACKS
+    for p in list(_packs.values()):
+        if over <= 0:
+            break
+        if p.pins or p.queued or p.compacting or not p.lock.acquire(blocking=False):
+            continue  # in use: stays resident, the registry runs over for now
+        try:
+            p.close()
+            del _packs[p.path]
+            over -= 1
+        finally:
+            p.lock.release()
+        with _open_lock:
+            _open_packs.pop(p.path, None)
+
+
+def pack_for(path: Path) -> Pack:
+    """
+    The resident Pack object for a file (unpinned: callers that may run concurrently with
+    other users' requests go through pinned_pack). Only the NOTES_PACK_MAX_OPEN most
+    recently used packs keep their file descriptor and mapping open.
+    """
+    with _packs_lock:
+        p = _get(path)
+        _evict()
+        return p
+
+
+@contextmanager
+def pinned_pack(path: Path, locked: bool = True) -> Iterator[Pack]:
+    """The file's pack, kept resident until the block exits (and opened and locked, if `locked`)."""
+    with _packs_lock:
+        p = _get(path)
+        p.pins += 1
+        _evict()
+    try:
+        if not locked:
+            yield p
+            return
+        with p.lock:
+            p._open()
+            yield p
+    finally:
+        with _packs_lock:
+            p.pins -= 1
+
+
+def _touch(pack: Pack) -> None:
+    with _open_lock:
+        _open_packs[pack.path] = pack
+        _open_packs.move_to_end(pack.path)
+        cold = []
+        while len(_open_packs) > MAX_OPEN_PACKS:
+            cold.append(_open_packs.popitem(last=False)[1])
+    for p in cold:
+        # never wait on another pack's lock here (its holder may be waiting on ours)
+        if p.lock.acquire(blocking=False):
+            try:
+                p.close()
+            finally:
+                p.lock.release()
+
+
+_compactions: "queue.SimpleQueue[Pack]" = queue.SimpleQueue()
+_compactor: Optional[threading.Thread] = None
+_compactor_lock = threading.Lock()
+
+
+def _compact_forever() -> None:
+    while True:
+        pack = _compactions.get()
+        try:
+            pack.compact()
+        except Exception:
+            # the old pack stays in place; retried after the next write
+            pass
+
+
+def _schedule_compaction(pack: Pack) -> None:
+    global _compactor
+    if pack.compacting or pack.queued:
+        return
+    pack.queued = True
+    with _compactor_lock:
+        if _compactor is None:
+            _compactor = threading.Thread(target=_compact_forever, name="pack-compactor", daemon=True)
+            _compactor.start()
+    _compactions.put(pack)
+
+
+# ---------------- store ----------------
+
+
+class PackNotesStore:
+    cache = None  # point reads are served from the mapped pack
+
+    def __init__(self, base_dir: Path, codec: Optional[str] = None):
+        self.base_dir = base_dir
+        self.codec = codec if codec is not None else note_format.codec_from_env()
+        self.fmt = record_codec.format_for(base_dir)
+
+    def _user_dir(self, user_id: str) -> Path:
+        return _safe_user_dir(self.base_dir, user_id).parent
+
+    def _pack(self, user_id: str) -> Pack:
+        return pack_for(self._user_dir(user_id) / "notes.pack")
+
+    def _pinned(self, user_id: str, locked: bool = True) -> ContextManager[Pack]:
+        return pinned_pack(self._user_dir(user_id) / "notes.pack", locked)
+
+    def _write(self, raw: dict[str, Any]) -> Note:
+        payload = _payload(raw, self.codec, self.fmt)
+        with self._pinned(raw["owner_user_id"]) as pack:
+            pack.put(raw, payload)
+        note = _note_from_raw(raw)
+        merkle.note_written(str(self.base_dir), note)
+        search_index.note_written(self._user_dir(note.owner_user_id) / "search_index.log", note)
+        return note
+
+    def note_exists(self, user_id: str, note_id: uuid.UUID) -> bool:
+        with self._pinned(user_id) as pack:
+            return str(note_id) in pack.current
+
+    def create_note(self, user_id: str, title: str, content: str) -> Note:
+        now = _utc_now_iso()
+        return self._write(
+            {
+                "id": str(uuid.uuid4()),
+                "owner_user_id": user_id,
+                "title": title,
+                "content": content,
+                "created_at": now,
+                "updated_at": now,
+                "version": 1,
+            }
+        )
+
+    def list_notes(self, user_id: str) -> list[Note]:
+        with self._pinned(user_id) as pack:
+            return [_note_from_raw(pack._read(pack.current[i], typed=True)) for i in sorted(pack.current)]
+
+    def list_summaries(self, user_id: str) -> list[NoteSummary]:
+        with self._pinned(user_id) as pack:
+            entries = list(pack.summaries.entries.values())
+        return [_summary_from_entry(e) for e in sorted(entries, key=lambda e: e.id)]
+
+    def page_summaries(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[PageKey] = None,
+        sort: str = "updated_at",
+        descending: bool = False,
+        updated_since=None,
+    ) -> tuple[list[NoteSummary], Optional[PageKey]]:
+        if sort not in SORT_FIELDS:
+            raise ValueError("Invalid sort field")
+        with self._pinned(user_id) as pack:
+            entries, next_key = pack.summaries.page(
+                sort=sort,
+                descending=descending,
+                after=after,
+                updated_since_us=ts_us(updated_since) if updated_since is not None else None,
+                limit=limit,
+            )
+        return [_summary_from_entry(e) for e in entries], next_key
+
+    def rebuild_manifest(self, user_id: str) -> int:
+        # the pack index is the manifest, rebuilt on every open
+        with self._pinned(user_id) as pack:
+            return len(pack.current)
+
+    def _search_index(self, user_id: str) -> search_index.SearchIndex:
+        return search_index.index_for(self._user_dir(user_id) / "search_index.log")
+
+    def search(
+        self, user_id: str, q: str, limit: int = 20, after: Optional[search_index.SearchKey] = None
+    ) -> tuple[list[search_index.SearchHit], Optional[search_index.SearchKey]]:
+        idx = self._search_index(user_id)
+        idx.ensure_loaded(self, user_id)
+        return idx.search(q, limit=limit, after=after)
+
+    def rebuild_search_index(self, user_id: str) -> int:
+        return self._search_index(user_id).rebuild(self.list_notes(user_id))
+
+    def merkle_nodes(self, user_id: str, prefixes: list[str]) -> list[dict[str, Any]]:
+        _safe_user_dir(self.base_dir, user_id)
+        return merkle.nodes(str(self.base_dir), user_id, lambda: self.list_notes(user_id), prefixes)
+
+    def get_note(self, user_id: str, note_id: uuid.UUID) -> Note | None:
+        with self._pinned(user_id) as pack:
+            raw = pack.get(str(note_id), typed=True)
+        return _note_from_raw(raw) if raw is not None else None
+
+    def update_note(self, user_id: str, note_id: uuid.UUID, title: str, content: str) -> Note | None:
+        with self._pinned(user_id) as pack:
+            raw = pack.get(str(note_id))
+            if raw is None:
+                return None
+            raw.update(title=title, content=content, updated_at=_utc_now_iso(), version=int(raw["version"]) + 1)
+            return self._write(raw)
+
+    def get_previous(self, user_id: str, note_id: uuid.UUID) -> Note | None:
+        with self._pinned(user_id) as pack:
+            raw = pack.get(str(note_id), previous=True, typed=True)
+        return _note_from_raw(raw) if raw is not None else None
+
+    def apply_note_raw(self, raw: dict[str, Any]) -> Note:
+        """Apply a replicated note payload (same contract as NotesStore.apply_note_raw)."""
+        if "id" not in raw or "owner_user_id" not in raw:
+            raise ValueError("Invalid note payload: missing id/owner_user_id")
+        return self._write(
+            {
+                "id": str(uuid.UUID(raw["id"])),
+                "owner_user_id": raw["owner_user_id"],
+                "title": raw.get("title", ""),
+                "content": raw.get("content", ""),
+                "created_at": raw.get("created_at", _utc_now_iso()),
+                "updated_at": raw.get("updated_at", _utc_now_iso()),
+                "version": int(raw.get("version", 1)),
+            }
+        )
+
+    def compact(self, user_id: str) -> int:
+        # not locked: writes go on while the live records are copied
+        with self._pinned(user_id, locked=False) as pack:
+            return pack.compact()
@@ -0,0 +1,260 @@
+import json
+import os
+import struct
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+# Encoding of the small per-record files of the file engine (notes, previous note
+# versions, shares, share index entries, locks, users). Two formats:
+#
+#   "json"  indented JSON, as the stores have always written
+#   "bin1"  compact binary: MAGIC, a format version byte, then one tagged value
+#
+# bin1 values are a tag byte followed by the payload:
+#   NONE FALSE TRUE                  -
+#   INT                              zigzag varint
+#   FLOAT                            8 bytes, little-endian double
+#   STR                              varint byte length + utf-8
+#   UUID                             16 bytes (canonical lowercase uuid strings only)
+#   TS                               zigzag varint of microseconds since the epoch
+#                                    (read only: no longer written, see below)
+#   LIST                             varint count + values
+#   MAP                              varint count + (varint length + utf-8 key, value)
+#
+# Decoding gives back exactly the dict that was encoded (uuids as the same strings), so
+# the stores do not change above this layer. Read paths that turn the record straight
+# into a model (the stores' *_from_raw) ask for `typed` values instead: the id fields
+# (ID_FIELDS) then come back as uuid.UUID, built from the 16 bytes rather than formatted
+# and parsed again; any other uuid-shaped string (a title, a user id) stays a string.
+# Timestamps are written as STR: the models hold ISO strings, and formatting a TS back
+# to one cost more on every read than bin1 saved over JSON. Readers accept both
+# formats, told apart by the first byte (JSON records start with "{"), so a data dir
+# can switch formats without downtime for reads; file names keep their .json suffix.
+#
+# The format used for writes is chosen per data dir by its `record_format` file (absent:
+# RECORD_FORMAT, default "json"); scripts/migrate_record_format switches a data dir and
+# rewrites its existing records.
+
+FORMATS = ("json", "bin1")
+MAGIC = b"\x93"
+VERSION = 1
+_HEADER = MAGIC + bytes([VERSION])
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _UUID, _TS, _LIST, _MAP = range(10)
+_DOUBLE = struct.Struct("<d")
+# record fields decoded to uuid.UUID by typed reads
+ID_FIELDS = frozenset({"id", "note_id", "share_id", "lock_id"})
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+
+# ---------------- bin1 ----------------
+
+
+def _varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _as_uuid(s: str) -> bytes | None:
+    if len(s) != 36 or s[8] != "-" or s[23] != "-":
+        return None
+    try:
+        u = uuid.UUID(s)
+    except ValueError:
+        return None
+    return u.bytes if str(u) == s else None
+
+
+def _pack(out: bytearray, v: Any) -> None:
+    if isinstance(v, str):
+        b = _as_uuid(v)
+        if b is not None:
+            out.append(_UUID)
+            out += b
+            return
+        raw = v.encode("utf-8")
+        out.append(_STR)
+        _varint(out, len(raw))
+        out += raw
+    elif v is None:
+        out.append(_NONE)
+    elif v is True:
+        out.append(_TRUE)
+    elif v is False:
+        out.append(_FALSE)
+    elif isinstance(v, int):
+        if not -(1 << 63) <= v < (1 << 63):
+            raise TypeError("Integer out of int64 range")
+        out.append(_INT)
+        _varint(out, (v << 1) ^ (v >> 63))
+    elif isinstance(v, float):
+        out.append(_FLOAT)
+        out += _DOUBLE.pack(v)
+    elif isinstance(v, dict):
+        out.append(_MAP)
+        _varint(out, len(v))
+        for k, item in v.items():
+            key = k.encode("utf-8")
+            _varint(out, len(key))
+            out += key
+            _pack(out, item)
+    elif isinstance(v, (list, tuple)):
+        out.append(_LIST)
+        _varint(out, len(v))
+        for item in v:
+            _pack(out, item)
+    else:
+        raise TypeError(f"Cannot encode {type(v).__name__}")
+
+
+def _uuid_str(b: bytes) -> str:
+    h = b.hex()  # same string as str(uuid.UUID(bytes=...)), cheaper
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def as_uuid(v: Any) -> uuid.UUID:
+    """A uuid field of a decoded record: a uuid.UUID (typed reads) or its string."""
+    return v if isinstance(v, uuid.UUID) else uuid.UUID(v)
+
+
+def _read_varint(data: bytes, i: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _unpack(data: bytes, i: int, typed: bool) -> tuple[Any, int]:
+    tag = data[i]
+    if tag == _UUID:
+        return _uuid_str(data[i + 1 : i + 17]), i + 17
+    if tag < _INT:
+        return (None, False, True)[tag], i + 1
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, i + 1)[0], i + 9
+    n = data[i + 1]
+    if n < 0x80:
+        i += 2  # one-byte varint: the common case for lengths, counts and small ints
+    else:
+        n, i = _read_varint(data, i + 1)
+    if tag == _STR:
+        return data[i : i + n].decode("utf-8"), i + n
+    if tag == _MAP:
+        out = {}
+        for _ in range(n):
+            k = data[i]
+            if k < 0x80:
+                i += 1
+            else:
+                k, i = _read_varint(data, i)
+            key = data[i : i + k].decode("utf-8")
+            i += k
+            # short strings and uuids (most record fields) without another call
+            tag = data[i]
+            if tag == _STR and data[i + 1] < 0x80:
+                end = i + 2 + data[i + 1]
+                out[key] = data[i + 2 : end].decode("utf-8")
+                i = end
+            elif tag == _UUID:
+                b = data[i + 1 : i + 17]
+                out[key] = uuid.UUID(bytes=b) if typed and key in ID_FIELDS else _uuid_str(b)
+                i += 17
+            else:
+                out[key], i = _unpack(data, i, typed)
+        return out, i
+    if tag == _TS or tag == _INT:
+        n = (n >> 1) ^ -(n & 1)
+        return ((_EPOCH + n * _US).isoformat() if tag == _TS else n), i
+    if tag == _LIST:
+        items = []
+        for _ in range(n):
+            item, i = _unpack(data, i, typed)
+            items.append(item)
+        return items, i
+    raise ValueError(f"Unknown record tag {tag}")
+
+
+# ---------------- public ----------------
+
+
+def dumps(obj: Any, fmt: str, compact: bool = False) -> bytes:
+    if fmt == "bin1":
+        out = bytearray(_HEADER)
+        _pack(out, obj)
+        return bytes(out)
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def loads(data: bytes, typed: bool = False) -> Any:
+    """Decode a record in either format (ValueError if it is not one); `typed`: ID_FIELDS as uuid.UUID."""
+    if data[:1] == MAGIC:
+        if len(data) < 3 or data[1] != VERSION:
+            raise ValueError("Unsupported record format version")
+        try:
+            obj, end = _unpack(data, 2, typed)
+        except (IndexError, UnicodeDecodeError, struct.error) as e:
+            raise ValueError("Truncated record") from e
+        if end != len(data):
+            raise ValueError("Trailing bytes after record")
+        return obj
+    return json.loads(data)
+
+
+def load(path: Path, typed: bool = False) -> Any:
+    return loads(path.read_bytes(), typed)
+
+
+def write_atomic(path: Path, obj: Any, fmt: str, compact: bool = False) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(dumps(obj, fmt, compact))
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+_formats: dict[Path, str] = {}
+_formats_lock = threading.Lock()
+
+
+def _marker(base_dir: Path) -> Path:
+    return base_dir / "record_format"
+
+
+def format_for(base_dir: Path) -> str:
+    """Write format of a data dir: its `record_format` file, else RECORD_FORMAT (read once)."""
+    with _formats_lock:
+        fmt = _formats.get(base_dir)
+        if fmt is None:
+            try:
+                fmt = _marker(base_dir).read_text(encoding="utf-8").strip()
+            except FileNotFoundError:
+                fmt = os.getenv("RECORD_FORMAT", "json")
+            if fmt not in FORMATS:
+                raise ValueError(f"Unknown record format: {fmt}")
+            _formats[base_dir] = fmt
+        return fmt
+
+
+def set_format(base_dir: Path, fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown record format: {fmt}")
+    base_dir.mkdir(parents=True, exist_ok=True)
+    tmp = _marker(base_dir).with_suffix(".tmp")
+    tmp.write_text(fmt + "\n", encoding="utf-8")
+    tmp.replace(_marker(base_dir))
+    with _formats_lock:
+        _formats[base_dir] = fmt
@@ -0,0 +1,433 @@
+import gc
+import heapq
+import json
+import marshal
+import math
+import os
+import re
+import threading
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+# Per-user full-text index over note titles and contents, journaled next to the notes
+# (users/<user_id>/search_index.log for the file engine). Same scheme as the manifest:
+# append-only JSON lines, last record per id wins:
+#   {"op": "put", "id": ..., "title": ..., "created_at": ..., "updated_at": ..., "version": ...,
+#    "tl": <title token count>, "tokens": "<title tokens> <content tokens>"}
+#   {"op": "del", "id": ...}
+# Applying a record derives the postings (term -> {note id: title and content term
+# frequency}) from the token stream, and the note keeps its title and content token
+# streams, which hold the positions: a quoted phrase is checked against them, per field.
+# Records are written by the stores' note writes while the index is resident; on load,
+# notes whose (version, updated_at) differ from the store's summaries are re-indexed, so
+# writes made while the index was not loaded heal themselves.
+# The journal is rewritten once it holds more than twice as many records as notes.
+#
+# search_index.snap is a snapshot of the resident index (marshal: documents and postings
+# as they are in memory), taken when the journal is rewritten and whenever more than
+# SNAPSHOT_TAIL records (or an eighth of the notes) were appended since the last one. It
+# names the journal position it covers and the crc of all journal bytes before it, so a
+# load reads the snapshot, crc-checks that prefix (no parsing) and replays only the
+# journal after it; a snapshot that does not match the journal (an interrupted rewrite,
+# an edited journal, another Python version) is ignored and the whole journal is
+# replayed. The crc is extended from the last checked position, so taking a snapshot
+# reads only what was appended since.
+# Loading runs off the index lock: writes meanwhile are queued and applied at the swap.
+#
+# Queries: words and "quoted phrases", all of which must match (AND). Hits are ranked by
+# BM25, with title occurrences counting TITLE_BOOST times.
+
+MAX_RESIDENT_INDEXES = int(os.getenv("NOTES_SEARCH_MAX_USERS", "256"))
+SNAPSHOT_TAIL = int(os.getenv("NOTES_SEARCH_SNAPSHOT_TAIL", "256"))
+_SNAP_MAGIC = b"NSX1"
+_CHECK_CHUNK = 1 << 20
+TITLE_BOOST = 2.0
+_K1 = 1.2
+_B = 0.75
+_TOKEN = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+SearchKey = tuple[float, str]  # (score, note id): resume point for the next page
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def parse_query(q: str) -> list[list[str]]:
+    """Query -> list of phrases (a plain word is a one-token phrase)."""
+    groups = []
+    for phrase, word in _QUERY.findall(q):
+        tokens = tokenize(phrase or word)
+        if tokens:
+            groups.append(tokens)
+    return groups
+
+
+def _record(note: Any) -> dict[str, Any]:
+    title = tokenize(note.title)
+    return {
+        "op": "put",
+        "id": str(note.id),
+        "title": note.title,
+        "created_at": note.created_at,
+        "updated_at": note.updated_at,
+        "version": note.version,
+        "tl": len(title),
+        "tokens": " ".join(title + tokenize(note.content)),
+    }
+
+
+@contextmanager
+def _bulk() -> Iterator[None]:
+    # loading allocates millions of small posting entries; cyclic GC passes over them
+    # would otherwise take most of the load time (none of them can form cycles)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    id: str
+    title: str
+    created_at: str
+    updated_at: str
+    version: int
+    score: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "version": self.version,
+            "score": self.score,
+        }
+
+
+def _journal_check(f: Any, end: int, since: tuple[int, int] = (0, 0)) -> int:
+    """crc32 of the journal's first `end` bytes, continuing from a known (position, crc)."""
+    pos, crc = since if since[0] <= end else (0, 0)
+    f.seek(pos)
+    while pos < end:
+        chunk = f.read(min(_CHECK_CHUNK, end - pos))
+        if not chunk:
+            break
+        crc = zlib.crc32(chunk, crc)
+        pos += len(chunk)
+    return crc
+
+
+class SearchIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        self.snap_path = path.with_suffix(".snap")
+        self.lock = threading.RLock()
+        self.loaded = False
+        self._load_lock = threading.Lock()  # one loader at a time; writers never wait on it
+        self._pending: Optional[list[Any]] = None  # notes written while a load runs
+        self._reset()
+
+    def _reset(self) -> None:
+        self.docs: dict[str, dict[str, Any]] = {}
+        # term -> {note id: title_tf << 16 | content_tf}; one small int per (term, note)
+        self.postings: dict[str, dict[str, int]] = {}
+        self._lens: dict[str, int] = {}  # note id -> token count
+        self._total = 0  # sum of token counts, for avgdl
+        self._records = 0
+        self._since_snapshot = 0
+        self._checked = (0, 0)  # journal position and crc32 of the bytes before it
+
+    # ---------------- journal ----------------
+
+    def _remove(self, note_id: str) -> None:
+        old = self.docs.pop(note_id, None)
+        if old is None:
+            return
+        self._total -= self._lens.pop(note_id)
+        for t in set(old["tt"].split()) | set(old["bt"].split()):
+            plist = self.postings.get(t)
+            if plist is not None:
+                plist.pop(note_id, None)
+                if not plist:
+                    del self.postings[t]
+
+    def _apply(self, rec: dict[str, Any]) -> None:
+        self._records += 1
+        self._since_snapshot += 1
+        note_id = rec["id"]
+        self._remove(note_id)
+        if rec.get("op") == "del":
+            return
+        tokens = rec["tokens"].split()
+        tl = int(rec["tl"])
+        title, body = tokens[:tl], tokens[tl:]
+        tf = Counter(body)
+        for t, n in Counter(title).items():
+            tf[t] += n << 16
+        postings = self.postings
+        for t, packed in tf.items():
+            plist = postings.get(t)
+            if plist is None:
+                postings[t] = {note_id: packed}
+            else:
+                plist[note_id] = packed
+        self.docs[note_id] = {
+            "title": rec["title"],
+            "created_at": rec["created_at"],
+            "updated_at": rec["updated_at"],
+            "version": int(rec["version"]),
+            "tt": " ".join(title),
+            "bt": " ".join(body),
+        }
+        self._lens[note_id] = len(tokens)
+        self._total += len(tokens)
+
+    def _append(self, records: list[dict[str, Any]]) -> None:
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        # no fsync: derived data, reconciled with the store on load
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(data)
+        for r in records:
+            self._apply(r)
+        if self._records > 2 * len(self.docs) + 64:
+            self._compact()
+        elif self._since_snapshot > max(SNAPSHOT_TAIL, len(self.docs) // 8):
+            self._snapshot()
+
+    def _doc_record(self, note_id: str) -> dict[str, Any]:
+        d = self.docs[note_id]
+        return {
+            "op": "put",
+            "id": note_id,
+            **{k: d[k] for k in ("title", "created_at", "updated_at", "version")},
+            "tl": len(d["tt"].split()),
+            "tokens": f"{d['tt']} {d['bt']}".strip(),
+        }
+
+    def _compact(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".log.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for note_id in self.docs:
+                f.write(json.dumps(self._doc_record(note_id), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+        self._records = len(self.docs)
+        self._checked = (0, 0)
+        self._snapshot()
+
+    def _snapshot(self) -> None:
+        # no fsync: a snapshot lost or torn in a crash is ignored on load
+        with self.path.open("rb") as f:
+            end = os.fstat(f.fileno()).st_size
+            check = _journal_check(f, end, self._checked)
+            state = (
+                marshal.version,
+                os.fstat(f.fileno()).st_ino,
+                end,
+                check,
+                self._records,
+                self._total,
+                self.docs,
+                self.postings,
+                self._lens,
+            )
+        tmp = self.snap_path.with_suffix(".snap.tmp")
+        tmp.write_bytes(_SNAP_MAGIC + marshal.dumps(state))
+        tmp.replace(self.snap_path)
+        self._checked = (end, check)
+        self._since_snapshot = 0
+
+    def _read_snapshot(self, f: Any) -> int:
+        """Restore the snapshot if it covers a prefix of the open journal; returns where to resume."""
+        try:
+            data = self.snap_path.read_bytes()
+            if not data.startswith(_SNAP_MAGIC):
+                return 0
+            # loads on the whole file: marshal.load on a file object reads it in small chunks
+            state = marshal.loads(memoryview(data)[len(_SNAP_MAGIC) :])
+            version, ino, end, check, records, total, docs, postings, lens = state
+        except (OSError, EOFError, ValueError, TypeError):
+            return 0
+        st = os.fstat(f.fileno())
+        if version != marshal.version or ino != st.st_ino or end > st.st_size or _journal_check(f, end) != check:
+            return 0
+        self.docs, self.postings, self._lens = docs, postings, lens
+        self._total, self._records = total, records
+        self._checked = (end, check)
+        return end
+
+    def _read(self) -> None:
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as f:
+            f.seek(self._read_snapshot(f))
+            self._since_snapshot = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last append; the heal pass re-indexes that note
+                try:
+                    self._apply(json.loads(line))
+                except Exception:
+                    continue
+
+    # ---------------- public ----------------
+
+    def ensure_loaded(self, store: Any, user_id: str) -> None:
+        """Load the index and reconcile it with the store's summaries (once per residency)."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            with self.lock:
+                if self.loaded:
+                    return
+                self._pending = []
+            fresh = SearchIndex(self.path)
+            try:
+                fresh._load(store, user_id)
+            finally:
+                with self.lock:
+                    pending, self._pending = self._pending, None
+                    if not self.loaded and fresh.loaded:  # (unless rebuilt meanwhile)
+                        self.docs, self.postings, self._lens = fresh.docs, fresh.postings, fresh._lens
+                        self._total, self._records = fresh._total, fresh._records
+                        self._since_snapshot, self._checked = fresh._since_snapshot, fresh._checked
+                        self.loaded = True
+                        self._append([_record(n) for n in pending])
+
+    def _load(self, store: Any, user_id: str) -> None:
+        with _bulk():
+            self._read()
+        fixes: list[dict[str, Any]] = []
+        live = set()
+        for s in store.list_summaries(user_id):
+            sid = str(s.id)
+            live.add(sid)
+            d = self.docs.get(sid)
+            if d is not None and (d["version"], d["updated_at"]) == (s.version, s.updated_at):
+                continue
+            note = store.get_note(user_id, uuid.UUID(sid))
+            if note is not None:
+                fixes.append(_record(note))
+        fixes += [{"op": "del", "id": i} for i in self.docs if i not in live]
+        self._append(fixes)
+        if self._since_snapshot > SNAPSHOT_TAIL:
+            self._snapshot()  # so the next load starts from here
+        self.loaded = True
+
+    def put(self, note: Any) -> None:
+        with self.lock:
+            if self.loaded:
+                self._append([_record(note)])
+            elif self._pending is not None:
+                self._pending.append(note)
+
+    def rebuild(self, notes: Iterable[Any]) -> int:
+        with self._load_lock, self.lock:
+            self._reset()
+            with _bulk():
+                for n in notes:
+                    self._apply(_record(n))
+            self._compact()
+            self.loaded = True
+            return len(self.docs)
+
+    def _matches(self, phrase: list[str]) -> dict[str, float]:
+        """note id -> occurrence count of the phrase, title hits counting TITLE_BOOST times."""
+        if len(phrase) == 1:
+            plist = self.postings.get(phrase[0], {})
+            return {i: (v >> 16) * TITLE_BOOST + (v & 0xFFFF) for i, v in plist.items()}
+        lists = [self.postings.get(t) for t in phrase]
+        if any(p is None for p in lists):
+            return {}
+        lists.sort(key=len)
+        ids = set(lists[0])
+        for p in lists[1:]:
+            ids.intersection_update(p)
+        # the notes' token streams keep the positions: verify adjacency per field
+        needle = f" {' '.join(phrase)} "
+        out = {}
+        for note_id in ids:
+            d = self.docs[note_id]
+            n = f" {d['tt']} ".count(needle) * TITLE_BOOST + f" {d['bt']} ".count(needle)
+            if n:
+                out[note_id] = n
+        return out
+
+    def search(
+        self, q: str, limit: int = 20, after: Optional[SearchKey] = None
+    ) -> tuple[list[SearchHit], Optional[SearchKey]]:
+        groups = parse_query(q)
+        if not groups:
+            return [], None
+        with self.lock:
+            n_docs = len(self.docs)
+            avgdl = self._total / n_docs if n_docs else 1.0
+            lens = self._lens
+            scores: Optional[dict[str, float]] = None
+            # rarest first, so later (longer) postings are only probed for surviving notes
+            for tf in sorted((self._matches(p) for p in groups), key=len):
+                idf = math.log(1 + (n_docs - len(tf) + 0.5) / (len(tf) + 0.5))
+                a, c = _K1 * (1 - _B), _K1 * _B / avgdl
+                if scores is None:
+                    scores = {i: idf * f * (_K1 + 1) / (f + a + c * lens[i]) for i, f in tf.items()}
+                else:
+                    scores = {
+                        i: s + idf * tf[i] * (_K1 + 1) / (tf[i] + a + c * lens[i]) for i, s in scores.items() if i in tf
+                    }
+                if not scores:
+                    return [], None
+
+            keys: Iterable[tuple[float, str]] = ((-round(s, 6), i) for i, s in scores.items())
+            if after is not None:
+                resume = (-after[0], after[1])
+                keys = (k for k in keys if k > resume)
+            ranked = heapq.nsmallest(limit + 1, keys)
+            page, more = ranked[:limit], len(ranked) > limit
+            hits = []
+            for neg, note_id in page:
+                d = self.docs[note_id]
+                hits.append(SearchHit(note_id, d["title"], d["created_at"], d["updated_at"], d["version"], -neg))
+            return hits, ((-page[-1][0], page[-1][1]) if page and more else None)
+
+
+_indexes: "OrderedDict[Path, SearchIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def index_for(path: Path) -> SearchIndex:
+    """Shared, resident index per journal path (LRU, NOTES_SEARCH_MAX_USERS)."""
+    with _indexes_lock:
+        idx = _indexes.get(path)
+        if idx is None:
+            idx = SearchIndex(path)
+            _indexes[path] = idx
+        else:
+            _indexes.move_to_end(path)
+        while len(_indexes) > MAX_RESIDENT_INDEXES:
+            _indexes.popitem(last=False)
+        return idx
+
+
+def note_written(path: Path, note: Any) -> None:
+    """Called by the stores after every note write (no-op unless the index is loaded)."""
+    with _indexes_lock:
+        idx = _indexes.get(path)
+    if idx is not None:
+        idx.put(note)
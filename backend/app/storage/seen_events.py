@@ -0,0 +1,270 @@
+import bisect
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from app.storage.notes_store import _check_user_id
+
+# Replication dedup state per user, under data/replication/<user_id>/:
+# - seen_events.txt : append-only journal of recently seen event ids (legacy format, one per line)
+# - seen_events.bin : sorted, fixed-size digests of every compacted event id (binary-searched via mmap)
+# The journal is folded into the sorted file once it grows past `compact_every` entries.
+_DIGEST_SIZE = 16
+
+DEFAULT_COMPACT_EVERY = int(os.getenv("REPL_SEEN_COMPACT_EVERY", "10000"))
+DEFAULT_BLOOM = os.getenv("REPL_SEEN_BLOOM", "1") not in ("0", "false", "False")
+DEFAULT_MAX_RESIDENT_USERS = int(os.getenv("REPL_SEEN_MAX_USERS", "1024"))
+
+
+def _replication_dir(base_dir: Path, user_id: str) -> Path:
+    _check_user_id(user_id)  # same user_id validation as the rest of storage
+    return base_dir / "replication" / user_id
+
+
+def _digest(event_id: str) -> bytes:
+    return hashlib.blake2b(event_id.encode("utf-8"), digest_size=_DIGEST_SIZE).digest()
+
+
+class _Bloom:
+    """
+    Small Bloom filter over event-id digests. The digests are already uniform,
+    so the k bit positions are just slices of the digest.
+    """
+
+    K = 4
+
+    def __init__(self, capacity: int):
+        self.m = max(8192, capacity * 10)  # ~1% false positives at capacity
+        self.bits = bytearray(self.m // 8 + 1)
+
+    def _positions(self, d: bytes) -> Iterator[int]:
+        for i in range(self.K):
+            yield int.from_bytes(d[i * 4 : i * 4 + 4], "little") % self.m
+
+    def add(self, d: bytes) -> None:
+        for pos in self._positions(d):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, d: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(d))
+
+
+class _SortedDigests:
+    """Read-only sequence view over seen_events.bin so `bisect` can search it in place."""
+
+    def __init__(self, path: Path):
+        self._f = None
+        self._mm = None
+        self._n = 0
+        if path.exists() and path.stat().st_size >= _DIGEST_SIZE:
+            self._f = path.open("rb")
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._n = len(self._mm) // _DIGEST_SIZE
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._mm[i * _DIGEST_SIZE : (i + 1) * _DIGEST_SIZE]
+
+    def __contains__(self, d: bytes) -> bool:
+        i = bisect.bisect_left(self, d)
+        return i < self._n and self[i] == d
+
+    def __iter__(self) -> Iterator[bytes]:
+        for i in range(self._n):
+            yield self[i]
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._f.close()
+        self._mm = self._f = None
+        self._n = 0
+
+
+class UserSeenEvents:
+    """Resident dedup set for one user: mmap'd sorted digests + in-memory journal (+ Bloom front)."""
+
+    def __init__(self, rep_dir: Path, compact_every: int, bloom: bool):
+        self.rep_dir = rep_dir
+        self.journal_path = rep_dir / "seen_events.txt"
+        self.sorted_path = rep_dir / "seen_events.bin"
+        self.compact_every = compact_every
+        self.use_bloom = bloom
+        self.lock = threading.RLock()
+        self.pins = 0  # SeenEventsStore.pinned() holders; guarded by the store's lock
+        self.closed = False
+        self._load()
+
+    def _load(self) -> None:
+        self._sorted = _SortedDigests(self.sorted_path)
+        self._journal: set[bytes] = set()
+        if self.journal_path.exists():
+            with self.journal_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    x = line.strip()
+                    if x:
+                        self._journal.add(_digest(x))
+        self._bloom = None
+        if self.use_bloom:
+            self._bloom = _Bloom(len(self._sorted) + len(self._journal) + self.compact_every)
+            for d in self._sorted:
+                self._bloom.add(d)
+            for d in self._journal:
+                self._bloom.add(d)
+        if len(self._journal) >= self.compact_every:
+            self.compact()
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._journal)
+
+    def _reopen(self) -> None:
+        # evicted and closed while a caller still held it: reload from disk rather than
+        # answer from an empty view
+        if self.closed:
+            self.closed = False
+            self._load()
+
+    def contains(self, event_id: str) -> bool:
+        d = _digest(event_id)
+        with self.lock:
+            self._reopen()
+            if self._bloom is not None and d not in self._bloom:
+                return False
+            return d in self._journal or d in self._sorted
+
+    def add_many(self, event_ids: Iterable[str]) -> None:
+        """Mark ids as seen: one journal append + one fsync for the whole batch."""
+        lines = [x + "\n" for x in event_ids]
+        if not lines:
+            return
+        with self.lock:
+            self._reopen()
+            for x in lines:
+                d = _digest(x[:-1])
+                self._journal.add(d)
+                if self._bloom is not None:
+                    self._bloom.add(d)
+            self.rep_dir.mkdir(parents=True, exist_ok=True)
+            with self.journal_path.open("a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            if len(self._journal) >= self.compact_every:
+                self.compact()
+
+    def compact(self) -> None:
+        """
+        Merge the journal into seen_events.bin (sorted, deduplicated), then truncate the journal.
+        A crash in between only leaves ids in both places, which the next merge dedups.
+        """
+        with self.lock:
+            self._reopen()
+            self._compact()
+
+    def _compact(self) -> None:
+        self.rep_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.sorted_path.with_suffix(".bin.tmp")
+        pending = sorted(self._journal)
+        with tmp.open("wb") as out:
+            last = None
+            old = iter(self._sorted)
+            a = next(old, None)
+            j = 0
+            while a is not None or j < len(pending):
+                if a is not None and (j >= len(pending) or a <= pending[j]):
+                    d, a = a, next(old, None)
+                else:
+                    d, j = pending[j], j + 1
+                if d != last:
+                    out.write(d)
+                    last = d
+            out.flush()
+            os.fsync(out.fileno())
+        self._sorted.close()
+        tmp.replace(self.sorted_path)
+
+        with self.journal_path.open("w", encoding="utf-8") as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._sorted = _SortedDigests(self.sorted_path)
+        self._journal = set()
+
+        if self._bloom is not None and (len(self._sorted) + self.compact_every) * 10 > self._bloom.m:
+            # history outgrew the filter: resize so the false-positive rate stays low
+            self._bloom = _Bloom(len(self._sorted) + self.compact_every)
+            for d in self._sorted:
+                self._bloom.add(d)
+
+    def close(self) -> None:
+        with self.lock:
+            self._sorted.close()
+            self.closed = True
+
+
+class SeenEventsStore:
+    """
+    Cache of per-user dedup sets kept resident across requests, so a replication
+    batch loads each user's history at most once (and usually not at all).
+
+    Least recently used sets are closed past `max_resident_users`, except pinned ones:
+    a set in use through pinned() stays resident (the cache may briefly run over), so
+    there is never a second instance of a user's set appending to the same files.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        compact_every: int = DEFAULT_COMPACT_EVERY,
+        bloom: bool = DEFAULT_BLOOM,
+        max_resident_users: int = DEFAULT_MAX_RESIDENT_USERS,
+    ):
+        self.base_dir = base_dir
+        self.compact_every = compact_every
+        self.bloom = bloom
+        self.max_resident_users = max_resident_users
+        self._users: OrderedDict[str, UserSeenEvents] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id: str) -> UserSeenEvents:
+        s = self._users.get(user_id)
+        if s is not None:
+            self._users.move_to_end(user_id)
+            return s
+        s = UserSeenEvents(_replication_dir(self.base_dir, user_id), self.compact_every, self.bloom)
+        self._users[user_id] = s
+        return s
+
+    def _evict(self) -> None:
+        over = len(self._users) - self.max_resident_users
+        if over <= 0:
+            return
+        for user_id in [u for u, s in self._users.items() if not s.pins][:over]:
+            self._users.pop(user_id).close()
+
+    def for_user(self, user_id: str) -> UserSeenEvents:
+        with self._lock:
+            s = self._get(user_id)
+            self._evict()
+            return s
+
+    @contextmanager
+    def pinned(self, user_id: str) -> Iterator[UserSeenEvents]:
+        """The user's dedup set, kept resident (not evicted) until the block exits."""
+        with self._lock:
+            s = self._get(user_id)
+            s.pins += 1
+            self._evict()
+        try:
+            yield s
+        finally:
+            with self._lock:
+                s.pins -= 1
+                self._evict()
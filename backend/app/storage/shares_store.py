@@ -1,11 +1,10 @@
-import json
-import os
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
+from app.storage import record_codec, user_layout
 from app.storage.notes_store import _safe_user_dir, _note_path
 
 
@@ -23,14 +22,22 @@ def _share_path(base_dir: Path, owner_user_id: str, share_id: uuid.UUID) -> Path
     return _shares_dir(base_dir, owner_user_id) / f"{share_id}.json"
 
 
-def _atomic_write_json(path: Path, data: dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    with tmp.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    tmp.replace(path)
+def _share_index_dir(base_dir: Path) -> Path:
+    # data/share_index/<share_id>.json -> {"owner_user_id": ..., "shared_with_user_id": ...}
+    return base_dir / "share_index"
+
+
+def _share_index_path(base_dir: Path, share_id: uuid.UUID) -> Path:
+    return _share_index_dir(base_dir) / f"{share_id}.json"
+
+
+def _share_index_marker(base_dir: Path) -> Path:
+    # present once the index has been (re)built from the per-owner share files
+    return _share_index_dir(base_dir) / ".built"
+
+
+def _atomic_write_json(path: Path, data: dict[str, Any], fmt: str) -> None:
+    record_codec.write_atomic(path, data, fmt)
 
 
 @dataclass(frozen=True)
@@ -62,9 +69,104 @@ class Share:
         }
 
 
+def _share_from_raw(raw: dict[str, Any]) -> Share:
+    return Share(
+        share_id=record_codec.as_uuid(raw["share_id"]),
+        owner_user_id=raw["owner_user_id"],
+        shared_with_user_id=raw["shared_with_user_id"],
+        note_id=record_codec.as_uuid(raw["note_id"]),
+        mode=raw["mode"],
+        created_at=raw["created_at"],
+        expires_at=raw.get("expires_at"),
+        revoked=bool(raw.get("revoked", False)),
+    )
+
+
 class SharesStore:
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, note_exists: Optional[Callable[[str, uuid.UUID], bool]] = None):
         self.base_dir = base_dir
+        self.fmt = record_codec.format_for(base_dir)
+        # how to check that a note exists (the pack engine has no per-note files)
+        self._note_exists = note_exists or (lambda u, n: _note_path(base_dir, u, n).exists())
+
+    # ==========================================================
+    # share_id -> owner index (data/share_index/<share_id>.json)
+    # ==========================================================
+
+    def _index_put(self, share: Share) -> None:
+        _atomic_write_json(
+            _share_index_path(self.base_dir, share.share_id),
+            {
+                "share_id": str(share.share_id),
+                "owner_user_id": share.owner_user_id,
+                "shared_with_user_id": share.shared_with_user_id,
+            },
+            self.fmt,
+        )
+
+    def _index_drop(self, share_id: uuid.UUID) -> None:
+        try:
+            _share_index_path(self.base_dir, share_id).unlink()
+        except OSError:
+            pass
+
+    def _index_get(self, share_id: uuid.UUID) -> Optional[dict[str, Any]]:
+        p = _share_index_path(self.base_dir, share_id)
+        try:
+            return record_codec.load(p)
+        except (OSError, ValueError):
+            return None
+
+    def _iter_share_files(self):
+        for _, owner_dir in user_layout.iter_user_dirs(self.base_dir):
+            shares_dir = owner_dir / "shares"
+            if not shares_dir.is_dir():
+                continue
+            yield from shares_dir.glob("*.json")
+
+    def rebuild_index(self) -> int:
+        """
+        Rebuild the share index from the per-owner share files (users/*/shares/*.json).
+        Revoked shares are left out since they can never be resolved again.
+        Returns the number of indexed shares.
+        """
+        index_dir = _share_index_dir(self.base_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        live: set[str] = set()
+        for p in self._iter_share_files():
+            try:
+                s = _share_from_raw(record_codec.load(p, typed=True))
+            except Exception:
+                continue
+            if s.revoked:
+                continue
+            self._index_put(s)
+            live.add(f"{s.share_id}.json")
+
+        # drop stale entries (e.g. share files removed by hand); re-check the share file
+        # so an entry written by a concurrent create_share is not lost
+        for p in index_dir.glob("*.json"):
+            if p.name in live:
+                continue
+            try:
+                entry = record_codec.load(p)
+                s = self.get_share(entry["owner_user_id"], uuid.UUID(entry["share_id"]))
+            except Exception:
+                s = None
+            if s is None or s.revoked:
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+
+        _share_index_marker(self.base_dir).touch()
+        return len(live)
+
+    def _ensure_index(self) -> None:
+        # data dirs created before the index existed get a one-time rebuild
+        if not _share_index_marker(self.base_dir).exists():
+            self.rebuild_index()
 
     def create_share(
         self,
@@ -75,12 +177,14 @@ class SharesStore:
         ttl_minutes: Optional[int] = None,
     ) -> Share:
         # note must exist for owner (no leakage)
-        if not _note_path(self.base_dir, owner_user_id, note_id).exists():
+        if not self._note_exists(owner_user_id, note_id):
             raise FileNotFoundError("Note not found")
 
         if mode not in ("ro", "rw"):
             raise ValueError("Invalid share mode")
 
+        self._ensure_index()
+
         share_id = uuid.uuid4()
         now = _utc_now_iso()
         expires_at = None
@@ -97,24 +201,16 @@ class SharesStore:
             expires_at=expires_at,
             revoked=False,
         )
-        _atomic_write_json(_share_path(self.base_dir, owner_user_id, share_id), share.to_dict())
+        _atomic_write_json(_share_path(self.base_dir, owner_user_id, share_id), share.to_dict(), self.fmt)
+        self._index_put(share)
         return share
 
     def get_share(self, owner_user_id: str, share_id: uuid.UUID) -> Optional[Share]:
         p = _share_path(self.base_dir, owner_user_id, share_id)
         if not p.exists():
             return None
-        raw = json.loads(p.read_text(encoding="utf-8"))
-        return Share(
-            share_id=uuid.UUID(raw["share_id"]),
-            owner_user_id=raw["owner_user_id"],
-            shared_with_user_id=raw["shared_with_user_id"],
-            note_id=uuid.UUID(raw["note_id"]),
-            mode=raw["mode"],
-            created_at=raw["created_at"],
-            expires_at=raw.get("expires_at"),
-            revoked=bool(raw.get("revoked", False)),
-        )
+        raw = record_codec.load(p, typed=True)
+        return _share_from_raw(raw)
 
     def revoke_share(self, owner_user_id: str, share_id: uuid.UUID) -> bool:
         s = self.get_share(owner_user_id, share_id)
@@ -122,37 +218,49 @@ class SharesStore:
             return False
         raw = s.to_dict()
         raw["revoked"] = True
-        _atomic_write_json(_share_path(self.base_dir, owner_user_id, share_id), raw)
+        _atomic_write_json(_share_path(self.base_dir, owner_user_id, share_id), raw, self.fmt)
+        self._index_drop(share_id)
         return True
 
     def find_share_for_user(self, share_id: uuid.UUID, user_id: str) -> Optional[Share]:
         """
-        Since shares are stored under owners, we search all users/*/shares for a matching share_id.
-        This is ok for MVP. (Later: index file)
+        Resolve a share for the user it was granted to, via the share_id -> owner index.
+        One index read + one share file read, independent of the number of users.
         """
-        users_dir = self.base_dir / "users"
-        if not users_dir.exists():
+        self._ensure_index()
+
+        entry = self._index_get(share_id)
+        if entry is None or entry.get("shared_with_user_id") != user_id:
             return None
 
-        for owner_dir in users_dir.iterdir():
-            if not owner_dir.is_dir():
-                continue
+        try:
+            s = self.get_share(entry["owner_user_id"], share_id)
+        except (KeyError, ValueError):
+            s = None
+        if s is None:
+            # share file is gone -> index entry is stale
+            self._index_drop(share_id)
+            return None
+
+        if s.shared_with_user_id != user_id:
+            return None
+        if s.revoked or s.is_expired():
+            return None
+        return s
+
+    def scan_share_for_user(self, share_id: uuid.UUID, user_id: str) -> Optional[Share]:
+        """
+        Legacy lookup: search all users/*/shares for a matching share_id.
+        O(number of users); kept for benchmarks and as a reference for the index.
+        """
+        for _, owner_dir in user_layout.iter_user_dirs(self.base_dir):
             p = owner_dir / "shares" / f"{share_id}.json"
             if not p.exists():
                 continue
-            raw = json.loads(p.read_text(encoding="utf-8"))
+            raw = record_codec.load(p)
             if raw.get("shared_with_user_id") != user_id:
                 continue
-            s = Share(
-                share_id=uuid.UUID(raw["share_id"]),
-                owner_user_id=raw["owner_user_id"],
-                shared_with_user_id=raw["shared_with_user_id"],
-                note_id=uuid.UUID(raw["note_id"]),
-                mode=raw["mode"],
-                created_at=raw["created_at"],
-                expires_at=raw.get("expires_at"),
-                revoked=bool(raw.get("revoked", False)),
-            )
+            s = _share_from_raw(raw)
             if s.revoked or s.is_expired():
                 return None
             return s
@@ -0,0 +1,685 @@
+"""SQLite storage engine (STORAGE_ENGINE=sqlite).
+
+All stores live in one database file (APP_DATA_DIR/notes.db, or SQLITE_PATH) in WAL mode:
+readers never block the single writer, there is one file instead of one per object, and a
+write costs one WAL append (fsynced according to SQLITE_SYNCHRONOUS, default FULL).
+Each thread gets its own connection.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from app.storage import merkle, search_index
+from app.storage.event_log import Event, EventCommit
+from app.storage.locks_store import Lock
+from app.storage.notes_manifest import SORT_FIELDS, PageKey, _key_us, ts_us
+from app.storage.notes_store import Note, NoteSummary, _check_user_id
+from app.storage.shares_store import Share
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    owner_user_id TEXT NOT NULL,
+    id            TEXT NOT NULL,
+    title         TEXT NOT NULL,
+    content       TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    version       INTEGER NOT NULL,
+    created_us    INTEGER NOT NULL,
+    updated_us    INTEGER NOT NULL,
+    PRIMARY KEY (owner_user_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS notes_by_updated ON notes (owner_user_id, updated_us, id);
+CREATE INDEX IF NOT EXISTS notes_by_created ON notes (owner_user_id, created_us, id);
+
+-- the version each note's current row replaced (replication deltas)
+CREATE TABLE IF NOT EXISTS notes_prev (
+    owner_user_id TEXT NOT NULL,
+    id            TEXT NOT NULL,
+    title         TEXT NOT NULL,
+    content       TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    version       INTEGER NOT NULL,
+    PRIMARY KEY (owner_user_id, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS shares (
+    share_id            TEXT PRIMARY KEY,
+    owner_user_id       TEXT NOT NULL,
+    shared_with_user_id TEXT NOT NULL,
+    note_id             TEXT NOT NULL,
+    mode                TEXT NOT NULL,
+    created_at          TEXT NOT NULL,
+    expires_at          TEXT,
+    revoked             INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS shares_by_owner ON shares (owner_user_id);
+
+CREATE TABLE IF NOT EXISTS locks (
+    owner_user_id TEXT NOT NULL,
+    note_id       TEXT NOT NULL,
+    lock_id       TEXT NOT NULL,
+    holder_id     TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    expires_at    TEXT NOT NULL,
+    expires_us    INTEGER NOT NULL,
+    PRIMARY KEY (owner_user_id, note_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS locks_by_expiry ON locks (expires_us);
+
+CREATE TABLE IF NOT EXISTS events (
+    user_id  TEXT NOT NULL,
+    seq      INTEGER NOT NULL,
+    event_id TEXT NOT NULL,
+    body     TEXT NOT NULL,
+    PRIMARY KEY (user_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_by_id ON events (user_id, event_id);
+
+CREATE TABLE IF NOT EXISTS peer_cursors (
+    user_id TEXT NOT NULL,
+    peer    TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    PRIMARY KEY (user_id, peer)
+) WITHOUT ROWID;
+"""
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _note_from_row(r: sqlite3.Row) -> Note:
+    return Note(
+        id=uuid.UUID(r["id"]),
+        owner_user_id=r["owner_user_id"],
+        title=r["title"],
+        content=r["content"],
+        created_at=r["created_at"],
+        updated_at=r["updated_at"],
+        version=int(r["version"]),
+    )
+
+
+def _summary_from_row(r: sqlite3.Row) -> NoteSummary:
+    return NoteSummary(
+        id=uuid.UUID(r["id"]),
+        title=r["title"],
+        created_at=r["created_at"],
+        updated_at=r["updated_at"],
+        version=int(r["version"]),
+    )
+
+
+def _share_from_row(r: sqlite3.Row) -> Share:
+    return Share(
+        share_id=uuid.UUID(r["share_id"]),
+        owner_user_id=r["owner_user_id"],
+        shared_with_user_id=r["shared_with_user_id"],
+        note_id=uuid.UUID(r["note_id"]),
+        mode=r["mode"],
+        created_at=r["created_at"],
+        expires_at=r["expires_at"],
+        revoked=bool(r["revoked"]),
+    )
+
+
+class SqliteEngine:
+    name = "sqlite"
+
+    _engines: dict[Path, "SqliteEngine"] = {}
+    _engines_lock = threading.Lock()
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_data_dir(cls, base_dir: Path) -> "SqliteEngine":
+        db_path = Path(os.getenv("SQLITE_PATH", str(base_dir / "notes.db")))
+        with cls._engines_lock:
+            e = cls._engines.get(db_path)
+            if e is None:
+                e = cls(db_path)
+                cls._engines[db_path] = e
+            return e
+
+    def conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            c.row_factory = sqlite3.Row
+            c.execute(f"PRAGMA synchronous={os.getenv('SQLITE_SYNCHRONOUS', 'FULL')}")
+            c.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = c
+        return c
+
+    @contextmanager
+    def tx(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; BEGIN IMMEDIATE takes the write lock up front (no upgrade deadlocks)."""
+        c = self.conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
+
+    def notes(self) -> "SqliteNotesStore":
+        return SqliteNotesStore(self)
+
+    def shares(self) -> "SqliteSharesStore":
+        return SqliteSharesStore(self)
+
+    def locks(self, default_ttl_seconds: int = 300, event_log=None) -> "SqliteLocksStore":
+        return SqliteLocksStore(self, default_ttl_seconds=default_ttl_seconds, event_log=event_log)
+
+    def event_log(self) -> "SqliteEventLog":
+        return SqliteEventLog(self)
+
+
+# ==========================================================
+# Notes
+# ==========================================================
+
+
+class SqliteNotesStore:
+    cache = None  # rows are served by SQLite's page cache
+
+    def __init__(self, engine: SqliteEngine):
+        self.engine = engine
+        self._root = f"sqlite:{engine.db_path}"
+
+    def _note_exists(self, user_id: str, note_id: uuid.UUID) -> bool:
+        r = self.engine.conn().execute(
+            "SELECT 1 FROM notes WHERE owner_user_id = ? AND id = ?", (user_id, str(note_id))
+        ).fetchone()
+        return r is not None
+
+    def _written(self, note: Note) -> None:
+        # derived indexes, updated once the transaction has committed
+        merkle.note_written(self._root, note)
+        search_index.note_written(self._search_path(note.owner_user_id), note)
+
+    def _search_path(self, user_id: str) -> Path:
+        return self.engine.db_path.parent / "search" / f"{user_id}.log"
+
+    def _put(self, c: sqlite3.Connection, note: Note) -> None:
+        c.execute(
+            "INSERT OR REPLACE INTO notes_prev "
+            "SELECT owner_user_id, id, title, content, created_at, updated_at, version FROM notes "
+            "WHERE owner_user_id = ? AND id = ?",
+            (note.owner_user_id, str(note.id)),
+        )
+        c.execute(
+            "INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                note.owner_user_id,
+                str(note.id),
+                note.title,
+                note.content,
+                note.created_at,
+                note.updated_at,
+                note.version,
+                _key_us(note.created_at),
+                _key_us(note.updated_at),
+            ),
+        )
+
+    def create_note(self, user_id: str, title: str, content: str) -> Note:
+        _check_user_id(user_id)
+        now = _utc_now().isoformat()
+        note = Note(
+            id=uuid.uuid4(),
+            owner_user_id=user_id,
+            title=title,
+            content=content,
+            created_at=now,
+            updated_at=now,
+            version=1,
+        )
+        with self.engine.tx() as c:
+            self._put(c, note)
+        self._written(note)
+        return note
+
+    def list_notes(self, user_id: str) -> list[Note]:
+        rows = self.engine.conn().execute(
+            "SELECT * FROM notes WHERE owner_user_id = ? ORDER BY id", (user_id,)
+        )
+        return [_note_from_row(r) for r in rows]
+
+    def list_summaries(self, user_id: str) -> list[NoteSummary]:
+        rows = self.engine.conn().execute(
+            "SELECT id, title, created_at, updated_at, version FROM notes WHERE owner_user_id = ? ORDER BY id",
+            (user_id,),
+        )
+        return [_summary_from_row(r) for r in rows]
+
+    def page_summaries(
+        self,
+        user_id: str,
+        limit: int = 100,
+        after: Optional[PageKey] = None,
+        sort: str = "updated_at",
+        descending: bool = False,
+        updated_since: Optional[datetime] = None,
+    ) -> tuple[list[NoteSummary], Optional[PageKey]]:
+        if sort not in SORT_FIELDS:
+            raise ValueError("Invalid sort field")
+        col = "updated_us" if sort == "updated_at" else "created_us"
+        where, args = ["owner_user_id = ?"], [user_id]
+        if updated_since is not None:
+            where.append("updated_us >= ?")
+            args.append(ts_us(updated_since))
+        if after is not None:
+            where.append(f"({col}, id) {'<' if descending else '>'} (?, ?)")
+            args.extend([after[0], after[1]])
+        direction = "DESC" if descending else "ASC"
+        rows = self.engine.conn().execute(
+            f"SELECT id, title, created_at, updated_at, version, {col} AS k FROM notes "
+            f"WHERE {' AND '.join(where)} ORDER BY {col} {direction}, id {direction} LIMIT ?",
+            (*args, limit + 1),
+        ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_key = (int(rows[-1]["k"]), rows[-1]["id"]) if rows and more else None
+        return [_summary_from_row(r) for r in rows], next_key
+
+    def search(
+        self, user_id: str, q: str, limit: int = 20, after: Optional[search_index.SearchKey] = None
+    ) -> tuple[list[search_index.SearchHit], Optional[search_index.SearchKey]]:
+        _check_user_id(user_id)
+        idx = search_index.index_for(self._search_path(user_id))
+        idx.ensure_loaded(self, user_id)
+        return idx.search(q, limit=limit, after=after)
+
+    def rebuild_search_index(self, user_id: str) -> int:
+        _check_user_id(user_id)
+        return search_index.index_for(self._search_path(user_id)).rebuild(self.list_notes(user_id))
+
+    def rebuild_manifest(self, user_id: str) -> int:
+        # the notes table is its own manifest
+        r = self.engine.conn().execute("SELECT COUNT(*) FROM notes WHERE owner_user_id = ?", (user_id,)).fetchone()
+        return int(r[0])
+
+    def merkle_nodes(self, user_id: str, prefixes: list[str]) -> list[dict[str, Any]]:
+        _check_user_id(user_id)
+        return merkle.nodes(self._root, user_id, lambda: self.list_notes(user_id), prefixes)
+
+    def get_note(self, user_id: str, note_id: uuid.UUID) -> Note | None:
+        r = self.engine.conn().execute(
+            "SELECT * FROM notes WHERE owner_user_id = ? AND id = ?", (user_id, str(note_id))
+        ).fetchone()
+        return _note_from_row(r) if r is not None else None
+
+    def get_previous(self, user_id: str, note_id: uuid.UUID) -> Note | None:
+        r = self.engine.conn().execute(
+            "SELECT * FROM notes_prev WHERE owner_user_id = ? AND id = ?", (user_id, str(note_id))
+        ).fetchone()
+        return _note_from_row(r) if r is not None else None
+
+    def update_note(self, user_id: str, note_id: uuid.UUID, title: str, content: str) -> Note | None:
+        with self.engine.tx() as c:
+            r = c.execute(
+                "SELECT * FROM notes WHERE owner_user_id = ? AND id = ?", (user_id, str(note_id))
+            ).fetchone()
+            if r is None:
+                return None
+            old = _note_from_row(r)
+            note = Note(
+                id=old.id,
+                owner_user_id=old.owner_user_id,
+                title=title,
+                content=content,
+                created_at=old.created_at,
+                updated_at=_utc_now().isoformat(),
+                version=old.version + 1,
+            )
+            self._put(c, note)
+        self._written(note)
+        return note
+
+    def apply_note_raw(self, raw: dict[str, Any]) -> Note:
+        """
+        Apply a note payload received from replication (same contract as NotesStore.apply_note_raw).
+        """
+        if "id" not in raw or "owner_user_id" not in raw:
+            raise ValueError("Invalid note payload: missing id/owner_user_id")
+        _check_user_id(raw["owner_user_id"])
+        now = _utc_now().isoformat()
+        note = Note(
+            id=uuid.UUID(raw["id"]),
+            owner_user_id=raw["owner_user_id"],
+            title=raw.get("title", ""),
+            content=raw.get("content", ""),
+            created_at=raw.get("created_at", now),
+            updated_at=raw.get("updated_at", now),
+            version=int(raw.get("version", 1)),
+        )
+        with self.engine.tx() as c:
+            self._put(c, note)
+        self._written(note)
+        return note
+
+
+# ==========================================================
+# Shares
+# ==========================================================
+
+
+class SqliteSharesStore:
+    def __init__(self, engine: SqliteEngine):
+        self.engine = engine
+
+    def create_share(
+        self,
+        owner_user_id: str,
+        note_id: uuid.UUID,
+        shared_with_user_id: str,
+        mode: str,
+        ttl_minutes: Optional[int] = None,
+    ) -> Share:
+        if not SqliteNotesStore(self.engine)._note_exists(owner_user_id, note_id):
+            raise FileNotFoundError("Note not found")
+        if mode not in ("ro", "rw"):
+            raise ValueError("Invalid share mode")
+
+        expires_at = None
+        if ttl_minutes is not None:
+            expires_at = (_utc_now() + timedelta(minutes=ttl_minutes)).isoformat()
+        share = Share(
+            share_id=uuid.uuid4(),
+            owner_user_id=owner_user_id,
+            shared_with_user_id=shared_with_user_id,
+            note_id=note_id,
+            mode=mode,
+            created_at=_utc_now().isoformat(),
+            expires_at=expires_at,
+            revoked=False,
+        )
+        with self.engine.tx() as c:
+            c.execute(
+                "INSERT INTO shares VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (
+                    str(share.share_id),
+                    owner_user_id,
+                    shared_with_user_id,
+                    str(note_id),
+                    mode,
+                    share.created_at,
+                    expires_at,
+                ),
+            )
+        return share
+
+    def get_share(self, owner_user_id: str, share_id: uuid.UUID) -> Optional[Share]:
+        r = self.engine.conn().execute(
+            "SELECT * FROM shares WHERE share_id = ? AND owner_user_id = ?", (str(share_id), owner_user_id)
+        ).fetchone()
+        return _share_from_row(r) if r is not None else None
+
+    def revoke_share(self, owner_user_id: str, share_id: uuid.UUID) -> bool:
+        with self.engine.tx() as c:
+            cur = c.execute(
+                "UPDATE shares SET revoked = 1 WHERE share_id = ? AND owner_user_id = ?",
+                (str(share_id), owner_user_id),
+            )
+        return cur.rowcount > 0
+
+    def find_share_for_user(self, share_id: uuid.UUID, user_id: str) -> Optional[Share]:
+        r = self.engine.conn().execute(
+            "SELECT * FROM shares WHERE share_id = ? AND shared_with_user_id = ?", (str(share_id), user_id)
+        ).fetchone()
+        if r is None:
+            return None
+        s = _share_from_row(r)
+        if s.revoked or s.is_expired():
+            return None
+        return s
+
+    def rebuild_index(self) -> int:
+        # share_id is the primary key; nothing to rebuild
+        r = self.engine.conn().execute("SELECT COUNT(*) FROM shares WHERE revoked = 0").fetchone()
+        return int(r[0])
+
+
+# ==========================================================
+# Locks
+# ==========================================================
+
+
+class SqliteLocksStore:
+    """
+    Same contract as LocksStore. Expiry is checked in SQL on every access, and a
+    sweeper thread (LOCK_SWEEPER, default on) deletes expired rows via the
+    locks_by_expiry index and emits LOCK_EXPIRED on time.
+    """
+
+    _sweepers: set[Path] = set()
+    _sweepers_lock = threading.Lock()
+
+    def __init__(self, engine: SqliteEngine, default_ttl_seconds: int = 300, event_log=None, sweeper: Optional[bool] = None):
+        self.engine = engine
+        self.default_ttl_seconds = default_ttl_seconds
+        self.event_log = event_log
+        if sweeper is None:
+            sweeper = os.getenv("LOCK_SWEEPER", "1") not in ("0", "false", "False")
+        if sweeper and event_log is not None:
+            self._ensure_sweeper()
+
+    def _ensure_sweeper(self) -> None:
+        with self._sweepers_lock:
+            if self.engine.db_path in self._sweepers:
+                return
+            self._sweepers.add(self.engine.db_path)
+        threading.Thread(target=self._sweep_forever, name="lock-sweeper", daemon=True).start()
+
+    def _sweep_forever(self) -> None:
+        while True:
+            try:
+                nxt = self.sweep_expired()
+            except Exception:
+                nxt = None
+            wait = 1.0 if nxt is None else min(1.0, max(0.0, (nxt - ts_us(_utc_now())) / 1e6))
+            time.sleep(wait)
+
+    def sweep_expired(self) -> Optional[int]:
+        """Expire due locks; returns the next expiry (epoch us) or None."""
+        now = ts_us(_utc_now())
+        with self.engine.tx() as c:
+            due = c.execute("SELECT * FROM locks WHERE expires_us <= ?", (now,)).fetchall()
+            c.execute("DELETE FROM locks WHERE expires_us <= ?", (now,))
+            r = c.execute("SELECT MIN(expires_us) FROM locks").fetchone()
+        for row in due:
+            self._emit_expired(row)
+        return r[0]
+
+    def _emit_expired(self, row: Optional[sqlite3.Row]) -> None:
+        if row is None or self.event_log is None:
+            return
+        self.event_log.emit(
+            Event(
+                event_type="LOCK_EXPIRED",
+                user_id=row["owner_user_id"],
+                note_id=row["note_id"],
+                lock_id=row["lock_id"],
+                meta={"expires_at": row["expires_at"]},
+            )
+        )
+
+    def _active(self, c: sqlite3.Connection, owner: str, note_id: uuid.UUID) -> tuple[Optional[sqlite3.Row], Optional[sqlite3.Row]]:
+        r = c.execute("SELECT * FROM locks WHERE owner_user_id = ? AND note_id = ?", (owner, str(note_id))).fetchone()
+        if r is None:
+            return None, None
+        if r["expires_us"] <= ts_us(_utc_now()):
+            c.execute("DELETE FROM locks WHERE owner_user_id = ? AND note_id = ?", (owner, str(note_id)))
+            return None, r
+        return r, None
+
+    def _acquire(self, owner: str, note_id: uuid.UUID, holder_id: str) -> Optional[dict[str, Any]]:
+        if not SqliteNotesStore(self.engine)._note_exists(owner, note_id):
+            return None
+        with self.engine.tx() as c:
+            r, expired = self._active(c, owner, note_id)
+            if r is not None:
+                raw = {k: r[k] for k in ("lock_id", "note_id", "owner_user_id", "holder_id", "created_at", "expires_at")}
+            else:
+                now = _utc_now()
+                exp = now + timedelta(seconds=self.default_ttl_seconds)
+                raw = {
+                    "lock_id": str(uuid.uuid4()),
+                    "note_id": str(note_id),
+                    "owner_user_id": owner,
+                    "holder_id": holder_id,
+                    "created_at": now.isoformat(),
+                    "expires_at": exp.isoformat(),
+                }
+                c.execute(
+                    "INSERT INTO locks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (owner, str(note_id), raw["lock_id"], holder_id, raw["created_at"], raw["expires_at"], ts_us(exp)),
+                )
+        self._emit_expired(expired)
+        return raw
+
+    def acquire_lock(self, user_id: str, note_id: uuid.UUID) -> Lock | None:
+        raw = self._acquire(user_id, note_id, holder_id=user_id)
+        if raw is None:
+            return None
+        return Lock(
+            lock_id=uuid.UUID(raw["lock_id"]),
+            note_id=uuid.UUID(raw["note_id"]),
+            owner_user_id=raw["owner_user_id"],
+            holder_id=raw["holder_id"],
+            created_at=raw["created_at"],
+            expires_at=raw["expires_at"],
+        )
+
+    def release_lock(self, user_id: str, note_id: uuid.UUID) -> bool:
+        if not SqliteNotesStore(self.engine)._note_exists(user_id, note_id):
+            return False
+        with self.engine.tx() as c:
+            r, expired = self._active(c, user_id, note_id)
+            if r is not None:
+                c.execute("DELETE FROM locks WHERE owner_user_id = ? AND note_id = ?", (user_id, str(note_id)))
+        self._emit_expired(expired)
+        return r is not None
+
+    def _valid(self, owner: str, note_id: uuid.UUID) -> Optional[sqlite3.Row]:
+        with self.engine.tx() as c:
+            r, expired = self._active(c, owner, note_id)
+        self._emit_expired(expired)
+        return r
+
+    def require_valid_lock(self, user_id: str, note_id: uuid.UUID, lock_id: uuid.UUID) -> bool:
+        r = self._valid(user_id, note_id)
+        return r is not None and r["holder_id"] == user_id and r["lock_id"] == str(lock_id)
+
+    def acquire_lock_for_share(self, note_owner_user_id: str, note_id: uuid.UUID, share_id: uuid.UUID) -> dict[str, Any] | None:
+        return self._acquire(note_owner_user_id, note_id, holder_id=f"share:{share_id}")
+
+    def require_valid_lock_for_share(
+        self,
+        note_owner_user_id: str,
+        note_id: uuid.UUID,
+        share_id: uuid.UUID,
+        lock_id: uuid.UUID,
+    ) -> bool:
+        r = self._valid(note_owner_user_id, note_id)
+        return r is not None and r["lock_id"] == str(lock_id) and r["holder_id"] == f"share:{share_id}"
+
+
+# ==========================================================
+# Event log
+# ==========================================================
+
+
+class SqliteEventLog:
+    """
+    Same contract as EventLog. Each emit is one small transaction (WAL append); seq is
+    allocated as MAX(seq) + 1 under the write lock, so it stays dense per user.
+    `mode` is accepted for parity with EventLog: WAL commits are already cheap.
+    """
+
+    def __init__(self, engine: SqliteEngine, mode: Optional[str] = None):
+        self.engine = engine
+        self.mode = mode or "strict"
+
+    def emit(self, event: Event, wait: bool = True) -> EventCommit:
+        return self.emit_many([event], wait=wait)[0]
+
+    def emit_many(self, events: list[Event], wait: bool = True) -> list[EventCommit]:
+        if not events:
+            return []
+        user_id = events[0].user_id
+        if any(e.user_id != user_id for e in events):
+            raise ValueError("emit_many takes events of a single user")
+        commits = [EventCommit() for _ in events]
+        with self.engine.tx() as c:
+            r = c.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE user_id = ?", (user_id,)).fetchone()
+            seq = int(r[0])
+            for event, commit in zip(events, commits):
+                seq += 1
+                body = event.to_json_line(seq=seq)
+                c.execute(
+                    "INSERT INTO events VALUES (?, ?, ?, ?)",
+                    (user_id, seq, json.loads(body)["event_id"], body),
+                )
+                commit.seq = seq
+        for commit in commits:
+            commit._resolve()
+        return commits
+
+    def last_seq(self, user_id: str) -> int:
+        r = self.engine.conn().execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE user_id = ?", (user_id,)).fetchone()
+        return int(r[0])
+
+    def first_seq(self, user_id: str) -> int:
+        # rows are never pruned here (segment retention is a file-engine feature)
+        return 1
+
+    def ack(self, user_id: str, peer: str, seq: int) -> int:
+        with self.engine.tx() as c:
+            last = c.execute("SELECT COALESCE(MAX(seq), 0) FROM events WHERE user_id = ?", (user_id,)).fetchone()[0]
+            c.execute(
+                "INSERT INTO peer_cursors VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, peer) DO UPDATE SET seq = MAX(seq, excluded.seq)",
+                (user_id, peer, min(seq, int(last))),
+            )
+            r = c.execute("SELECT seq FROM peer_cursors WHERE user_id = ? AND peer = ?", (user_id, peer)).fetchone()
+        return int(r[0])
+
+    def apply_retention(self, user_id: str) -> int:
+        return 0
+
+    def iter_events(self, user_id: str, since_seq: int = 0, limit: Optional[int] = None) -> Iterator[dict[str, Any]]:
+        rows = self.engine.conn().execute(
+            "SELECT body FROM events WHERE user_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (user_id, max(since_seq, 0), -1 if limit is None else limit),
+        )
+        for r in rows:
+            yield json.loads(r["body"])
+
+    def read_events(self, user_id: str, since_seq: int = 0, limit: int = 100) -> list[dict[str, Any]]:
+        return list(self.iter_events(user_id, since_seq=since_seq, limit=limit))
+
+    def seq_for_event_id(self, user_id: str, event_id: str) -> Optional[int]:
+        r = self.engine.conn().execute(
+            "SELECT seq FROM events WHERE user_id = ? AND event_id = ?", (user_id, event_id)
+        ).fetchone()
+        return int(r[0]) if r is not None else None
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Where each user's directory lives under data/users:
+#
+#   flat (default):  users/<user_id>
+#   sharded:         users/<h[0:2]>/<h[2:4]>/<user_id>, h = hex of a 2-byte blake2b of the id
+#
+# The sharded layout keeps data/users and every shard directory at most 256 entries wide,
+# so lookups, listings and backups stay fast with 100k+ users. The layout of a data dir
+# is its `users_layout` file, else USERS_LAYOUT (read once, default "flat").
+#
+# Switching to sharded is online: with the sharded layout, a user still in the flat place
+# is moved on first access, before any path inside it is handed out, and
+# scripts/shard_users moves the others meanwhile. A move first renames the directory to
+# users/<user_id>..moving (".." can't occur in a user id or a shard name): that frees the
+# name for a shard directory when a flat id looks like one ("ab"), and an interrupted
+# move is finished by whoever touches the user next.
+
+LAYOUTS = ("flat", "sharded")
+_MOVING = "..moving"
+_HEX = frozenset("0123456789abcdef")
+_MAX_KNOWN = 4096  # users remembered as in place while a switch to sharded is under way
+
+
+@dataclass
+class _Layout:
+    name: str
+    # sharded, not settled: user_id -> directory for users known to be in place (LRU,
+    # _MAX_KNOWN; a user dropped from it is just checked again)
+    dirs: "OrderedDict[str, Path]" = field(default_factory=OrderedDict)
+    # sharded: no flat or half-moved users left (checked once), so lookups skip the move check
+    settled: Optional[bool] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_layouts: dict[Path, _Layout] = {}
+_layouts_lock = threading.Lock()
+
+
+def _marker(base_dir: Path) -> Path:
+    return base_dir / "users_layout"
+
+
+def _state(base_dir: Path) -> _Layout:
+    st = _layouts.get(base_dir)
+    if st is not None:
+        return st
+    with _layouts_lock:
+        st = _layouts.get(base_dir)
+        if st is None:
+            try:
+                name = _marker(base_dir).read_text(encoding="utf-8").strip()
+            except FileNotFoundError:
+                name = os.getenv("USERS_LAYOUT", "flat")
+            if name not in LAYOUTS:
+                raise ValueError(f"Unknown users layout: {name}")
+            st = _layouts[base_dir] = _Layout(name)
+        return st
+
+
+def layout_for(base_dir: Path) -> str:
+    return _state(base_dir).name
+
+
+def set_layout(base_dir: Path, name: str) -> None:
+    if name not in LAYOUTS:
+        raise ValueError(f"Unknown users layout: {name}")
+    base_dir.mkdir(parents=True, exist_ok=True)
+    tmp = _marker(base_dir).with_suffix(".tmp")
+    tmp.write_text(name + "\n", encoding="utf-8")
+    tmp.replace(_marker(base_dir))
+    with _layouts_lock:
+        _layouts[base_dir] = _Layout(name)
+
+
+def shard_of(user_id: str) -> tuple[str, str]:
+    h = hashlib.blake2b(user_id.encode("utf-8"), digest_size=2).hexdigest()
+    return h[:2], h[2:]
+
+
+def _flat(users: Path, user_id: str) -> Path:
+    return users / user_id
+
+
+def _sharded(users: Path, user_id: str) -> Path:
+    a, b = shard_of(user_id)
+    return users / a / b / user_id
+
+
+def _is_shard_name(name: str) -> bool:
+    return len(name) == 2 and set(name) <= _HEX
+
+
+def _is_flat_user(p: Path) -> bool:
+    """A user directory directly under users/ (as opposed to a shard directory)."""
+    if not _is_shard_name(p.name):
+        return p.is_dir()
+    try:
+        # shard directories only ever hold shard directories
+        return any(not _is_shard_name(c.name) for c in p.iterdir())
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
+def _has_unsharded(users: Path) -> bool:
+    try:
+        return any(p.name.endswith(_MOVING) or _is_flat_user(p) for p in users.iterdir())
+    except FileNotFoundError:
+        return False
+
+
+def _move_in(users: Path, user_id: str) -> bool:
+    """Move a flat (or half-moved) user to its shard. Returns whether it moved anything."""
+    flat = _flat(users, user_id)
+    moving = users / (user_id + _MOVING)
+    if _is_flat_user(flat):
+        try:
+            os.rename(flat, moving)
+        except FileNotFoundError:
+            pass  # moved by someone else meanwhile
+    if not moving.exists():
+        return False
+    dst = _sharded(users, user_id)
+    top = users / dst.parts[-3]
+    if _is_flat_user(top):
+        _move_in(users, top.name)  # a flat user named like the shard
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.rename(moving, dst)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _known(st: _Layout, user_id: str, path: Path) -> None:
+    st.dirs[user_id] = path
+    st.dirs.move_to_end(user_id)
+    while len(st.dirs) > _MAX_KNOWN:
+        st.dirs.popitem(last=False)
+
+
+def user_dir(base_dir: Path, user_id: str) -> Path:
+    """
+    Directory of an (already validated) user id in the data dir's layout. With the
+    sharded layout, a user still in the flat place is moved on first access.
+    """
+    st = _state(base_dir)
+    users = base_dir / "users"
+    if st.name == "flat":
+        return users / user_id
+    if st.settled:
+        return _sharded(users, user_id)
+    with st.lock:
+        if st.settled is None:
+            st.settled = not _has_unsharded(users)
+        if st.settled:
+            return _sharded(users, user_id)
+        path = st.dirs.get(user_id)
+        if path is None:
+            _move_in(users, user_id)
+            path = _sharded(users, user_id)
+        _known(st, user_id, path)
+    return path
+
+
+def move_user(base_dir: Path, user_id: str) -> bool:
+    """Move one user to the sharded layout (scripts/shard_users); safe while the API runs sharded."""
+    st = _state(base_dir)
+    with st.lock:
+        moved = _move_in(base_dir / "users", user_id)
+        if st.name == "sharded" and not st.settled:
+            _known(st, user_id, _sharded(base_dir / "users", user_id))
+    return moved
+
+
+def iter_user_dirs(base_dir: Path) -> Iterator[tuple[str, Path]]:
+    """
+    (user_id, directory) of every user in the data dir, in either layout. A user being
+    moved meanwhile may be listed under its old place.
+    """
+    users = base_dir / "users"
+    if not users.is_dir():
+        return
+    for p in sorted(users.iterdir()):
+        if p.name.endswith(_MOVING):
+            yield p.name[: -len(_MOVING)], p
+        elif _is_flat_user(p):
+            yield p.name, p
+        elif p.is_dir():
+            for q in sorted(p.iterdir()):
+                if q.is_dir():
+                    for u in sorted(q.iterdir()):
+                        if u.is_dir():
+                            yield u.name, u
@@ -1,17 +1,18 @@
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from app.storage import record_codec, user_layout
+
 
 def _safe_user_dir(base_dir: Path, user_id: str) -> Path:
     # evitat path traversal
     if not user_id or any(ch in user_id for ch in ["/", "\\"]) or ".." in user_id:
         raise ValueError("Invalid user_id")
-    return base_dir / "users" / user_id
+    return user_layout.user_dir(base_dir, user_id)
 
 
 @dataclass(frozen=True)
@@ -32,7 +33,7 @@ class UsersStore:
         p = self._user_path(user_id)
         if not p.exists():
             return None
-        raw = json.loads(p.read_text(encoding="utf-8"))
+        raw = record_codec.load(p)
         return UserRecord(
             user_id=raw["user_id"],
             hashed_password=raw["hashed_password"],
@@ -52,6 +53,6 @@ class UsersStore:
         )
 
         tmp = p.with_suffix(".tmp")
-        tmp.write_text(json.dumps(rec.__dict__, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.write_bytes(record_codec.dumps(rec.__dict__, record_codec.format_for(self.base_dir)))
         tmp.replace(p)
         return rec
@@ -0,0 +1,67 @@
+"""Content-Encoding negotiation and incremental compressors for streamed responses.
+
+gzip is always available (zlib); zstd is used when the optional `zstandard`
+package is installed and the client lists it in Accept-Encoding.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Optional
+
+try:  # optional dependency
+    import zstandard as _zstd
+except ImportError:  # pragma: no cover - depends on the environment
+    _zstd = None
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("zstd", "gzip") if _zstd is not None else ("gzip",)
+
+
+def pick_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best encoding we support from an Accept-Encoding header (zstd > gzip), or None."""
+    if not accept_encoding:
+        return None
+    offered = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip().replace(" ", "")
+        if q in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        offered.add(name.strip().lower())
+    for enc in supported_encodings():
+        if enc in offered:
+            return enc
+    return None
+
+
+class StreamCompressor:
+    """
+    Compresses a response chunk by chunk. Each chunk is flushed so the client can
+    decode (and act on) everything received so far; memory stays at one chunk.
+    """
+
+    def __init__(self, encoding: Optional[str]):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._c = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+        elif encoding == "zstd":
+            if _zstd is None:
+                raise ValueError("zstd is not available")
+            self._c = _zstd.ZstdCompressor(level=3).compressobj()
+        elif encoding is None:
+            self._c = None
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self._c is None:
+            return data
+        if self.encoding == "gzip":
+            return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+        return self._c.compress(data) + self._c.flush(_zstd.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self._c is None:
+            return b""
+        return self._c.flush()
@@ -0,0 +1,130 @@
+"""Process pool for password hashing (bcrypt / pbkdf2 are CPU-bound).
+
+hash_password / verify_password hold a core for hundreds of milliseconds; run inline
+they hog request threads (and the GIL) and a login burst stalls note traffic. The pool
+runs them in worker processes, sized separately from the storage executor:
+
+- AUTH_HASH_WORKERS      worker processes (default: min(4, cpu count))
+- AUTH_HASH_QUEUE        requests allowed to wait for a worker (default 32)
+- AUTH_HASH_RETRY_AFTER  seconds advertised in Retry-After when the queue is full (default 1)
+
+Once workers + queue are all taken, `run` raises HashPoolBusy immediately instead of
+letting requests pile up; the API turns that into a 503.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+class HashPoolBusy(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> tuple[Any, float, float]:
+    # runs in the worker: report when the job actually started (wall clock, comparable
+    # across processes) and how long the hash itself took
+    started = time.time()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter() - t0
+
+
+class HashPool:
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._hash_total = 0.0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: the API process runs threads (storage executor, sweepers); forking
+                # it could copy a held lock into the worker
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HashPoolBusy(self.retry_after)
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+
+        submitted = time.time()
+        pool = self._executor()
+        try:
+            result, started, took = await asyncio.get_running_loop().run_in_executor(pool, _timed, fn, *args)
+        except BrokenProcessPool:
+            # a worker died (OOM kill, ...): start a fresh pool for the next request
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        with self._lock:
+            self._completed += 1
+            self._wait_total += max(0.0, started - submitted)
+            self._hash_total += took
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            done = self._completed or 1
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "peak_in_flight": self._peak_in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / done * 1000, 3),
+                "avg_hash_ms": round(self._hash_total / done * 1000, 3),
+            }
+
+
+_hash_pool: Optional[HashPool] = None
+_hash_pool_lock = threading.Lock()
+
+
+def get_hash_pool() -> HashPool:
+    """Process-wide hashing pool (see module docstring for the env knobs)."""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = HashPool(
+                max_workers=int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+                max_queue=int(os.getenv("AUTH_HASH_QUEUE", "32")),
+                retry_after=int(os.getenv("AUTH_HASH_RETRY_AFTER", "1")),
+            )
+        return _hash_pool
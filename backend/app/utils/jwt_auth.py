@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status, Header
@@ -10,17 +17,77 @@ from jose import JWTError, jwt
 
 bearer = HTTPBearer(auto_error=False)
 
+# Signing keys are loaded once (load_keys(), called at app startup) instead of on every
+# request. Two sources:
+# - JWT_KEYS_FILE: JSON {"active_kid": "k2", "keys": {"k1": "<secret>", "k2": "<secret>"}}.
+#   Tokens are signed with the active key and carry its `kid` header; verification picks
+#   the key by `kid`, so old tokens stay valid while a rotated file is rolled out. The
+#   file is re-read when its mtime changes (checked every JWT_KEYS_RELOAD_SECONDS, default 5).
+# - JWT_SECRET: a single key, no `kid` (previous behavior).
+
+
+@dataclass(frozen=True)
+class Keyring:
+    keys: dict[str, str]  # kid -> secret ("" is the kid-less JWT_SECRET key)
+    active_kid: str
+    algorithm: str
+    path: Optional[Path] = None
+    mtime_ns: int = 0
+
+
+def _keyring_from_env() -> Keyring:
+    algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+    keys_file = os.getenv("JWT_KEYS_FILE")
+    if keys_file:
+        path = Path(keys_file)
+        st = path.stat()
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        keys = {str(k): str(v) for k, v in raw.get("keys", {}).items() if v}
+        active = str(raw.get("active_kid", ""))
+        if active not in keys:
+            raise RuntimeError(f"JWT_KEYS_FILE: active_kid {active!r} has no key")
+        return Keyring(keys=keys, active_kid=active, algorithm=algorithm, path=path, mtime_ns=st.st_mtime_ns)
 
-def _secret() -> str:
     s = os.getenv("JWT_SECRET", "")
-    if not s:
-        # pentru teste/dev poți seta în env; în prod e obligatoriu
-        raise RuntimeError("JWT_SECRET is not set")
-    return s
+    return Keyring(keys={"": s} if s else {}, active_kid="", algorithm=algorithm)
+
+
+_keyring: Optional[Keyring] = None
+_keyring_checked = 0.0
+_keyring_lock = threading.Lock()
+
 
+def load_keys() -> Keyring:
+    """(Re)load signing keys from the environment and drop every cached verification."""
+    global _keyring, _keyring_checked
+    with _keyring_lock:
+        _keyring = _keyring_from_env()
+        _keyring_checked = time.monotonic()
+        token_cache.clear()
+        return _keyring
 
-def _algo() -> str:
-    return os.getenv("JWT_ALGORITHM", "HS256")
+
+def _keys() -> Keyring:
+    global _keyring_checked
+    kr = _keyring
+    if kr is None:
+        return load_keys()
+    if kr.path is not None and time.monotonic() - _keyring_checked > _reload_seconds():
+        _keyring_checked = time.monotonic()
+        try:
+            changed = kr.path.stat().st_mtime_ns != kr.mtime_ns
+        except OSError:
+            changed = False  # keep serving the keys we have
+        if changed:
+            try:
+                return load_keys()
+            except (OSError, ValueError, RuntimeError):
+                pass  # half-written / invalid file: keep the previous keys
+    return kr
+
+
+def _reload_seconds() -> float:
+    return float(os.getenv("JWT_KEYS_RELOAD_SECONDS", "5"))
 
 
 def _exp_minutes() -> int:
@@ -30,15 +97,85 @@ def _exp_minutes() -> int:
         return 15
 
 
+class TokenCache:
+    """
+    Bounded LRU of verified tokens: sha256(token) -> claims. An entry is served only
+    until the token's own `exp`; keys reload clears the cache.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[bytes, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[dict]:
+        with self._lock:
+            claims = self._items.get(digest)
+            if claims is None or claims.get("exp", 0) <= time.time():
+                if claims is not None:
+                    del self._items[digest]
+                self.misses += 1
+                return None
+            self._items.move_to_end(digest)
+            self.hits += 1
+            return claims
+
+    def put(self, digest: bytes, claims: dict) -> None:
+        if self.max_entries <= 0 or "exp" not in claims:
+            return  # never cache a token that does not expire
+        with self._lock:
+            self._items[digest] = claims
+            self._items.move_to_end(digest)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items), "max_entries": self.max_entries}
+
+
+token_cache = TokenCache(int(os.getenv("JWT_CACHE_SIZE", "10000")))
+
+
 def create_access_token(subject: str) -> str:
+    kr = _keys()
+    if kr.active_kid not in kr.keys:
+        # pentru teste/dev poți seta în env; în prod e obligatoriu
+        raise RuntimeError("JWT_SECRET is not set")
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=_exp_minutes())
     payload = {"sub": subject, "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
-    return jwt.encode(payload, _secret(), algorithm=_algo())
+    headers = {"kid": kr.active_kid} if kr.active_kid else None
+    return jwt.encode(payload, kr.keys[kr.active_kid], algorithm=kr.algorithm, headers=headers)
 
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, _secret(), algorithms=[_algo()])
+    """Full signature + claims verification (no cache)."""
+    kr = _keys()
+    if not kr.keys:
+        raise RuntimeError("JWT_SECRET is not set")
+    kid = jwt.get_unverified_header(token).get("kid") or ""
+    secret = kr.keys.get(kid)
+    if secret is None:
+        raise JWTError("Unknown signing key")
+    return jwt.decode(token, secret, algorithms=[kr.algorithm])
+
+
+def verify_token(token: str) -> dict:
+    """decode_token, memoized in token_cache until the token expires."""
+    _keys()  # picks up a rotated keys file (and clears the cache) first
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = token_cache.get(digest)
+    if claims is None:
+        claims = decode_token(token)
+        token_cache.put(digest, claims)
+    return claims
 
 
 def get_current_user(
@@ -52,7 +189,7 @@ def get_current_user(
     """
     if creds is not None and creds.scheme.lower() == "bearer":
         try:
-            payload = decode_token(creds.credentials)
+            payload = verify_token(creds.credentials)
             sub = payload.get("sub")
             if not sub:
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
@@ -0,0 +1,392 @@
+"""In-process pull replicator (replaces driving replication with scripts/demo_replicate.ps1).
+
+Pulls GET /replicate/events from every configured peer for every replicated user and
+applies the batches locally, with the same dedup/version rules as POST /replicate/events:
+
+- REPL_PEERS         comma list of name=base_url (empty: replicator off)
+- REPL_USERS         comma list of user ids to replicate
+- REPL_NODE_ID       this node's name; applied batches are acknowledged under it (POST
+                     /replicate/ack, signed with REPL_SECRET) so sources retain events for us
+- REPL_CONCURRENCY   users pulled at once per peer, also its connection pool size (default 8)
+- REPL_PULL_BATCH    events per GET (default 500)
+- REPL_POLL_SECONDS  wait after a user is caught up (default 2)
+- REPL_BACKOFF_MAX   cap in seconds of the per-user exponential backoff on errors (default 60)
+- REPL_REPAIR_SECONDS  interval of the hash-tree anti-entropy pass per user (default 0: off)
+
+Each peer gets one httpx.AsyncClient, so requests reuse keep-alive connections. Per user,
+the GET for the next batch is in flight while the current one is being applied. The last
+applied seq is stored per peer and user in <data>/replicator/<peer>.json. Batches are
+pulled with coalesce + delta; for events the local store cannot patch, the current notes
+are fetched (GET /replicate/notes) and the events applied again with them, and a 410 (cursor past the peer's retention) falls back to the snapshot.
+
+`repair` compares the user's hash tree with the peer's (GET /replicate/merkle) and pulls
+the notes that differ, which catches what event replay cannot (lost events, a wiped
+seen-events file).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+from app.storage import merkle
+from app.storage.aio import get_executor
+from app.utils.replication_auth import compute_replication_token
+
+NDJSON = "application/x-ndjson"
+_PEER_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class SnapshotIncomplete(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Peer:
+    name: str
+    base_url: str
+
+
+def parse_peers(spec: str) -> list[Peer]:
+    peers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, url = item.partition("=")
+        if not sep or not _PEER_NAME.match(name.strip()) or not url.strip():
+            raise ValueError(f"Invalid REPL_PEERS entry: {item!r}")
+        peers.append(Peer(name.strip(), url.strip().rstrip("/")))
+    return peers
+
+
+class CursorStore:
+    """Last applied seq per (peer, user); one small JSON file per peer."""
+
+    def __init__(self, base_dir: Path):
+        self.dir = Path(base_dir) / "replicator"
+        self._lock = threading.Lock()
+        self._cursors: dict[str, dict[str, int]] = {}
+
+    def _load(self, peer: str) -> dict[str, int]:
+        if peer not in self._cursors:
+            path = self.dir / f"{peer}.json"
+            try:
+                self._cursors[peer] = {str(k): int(v) for k, v in json.loads(path.read_text("utf-8")).items()}
+            except FileNotFoundError:
+                self._cursors[peer] = {}
+        return self._cursors[peer]
+
+    def get(self, peer: str, user_id: str) -> int:
+        with self._lock:
+            return self._load(peer).get(user_id, 0)
+
+    def set(self, peer: str, user_id: str, seq: int) -> None:
+        with self._lock:
+            cursors = self._load(peer)
+            cursors[user_id] = seq
+            self.dir.mkdir(parents=True, exist_ok=True)
+            path = self.dir / f"{peer}.json"
+            tmp = path.with_suffix(".json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cursors, f, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+
+
+class LocalSink:
+    """Applies pulled batches to this node's stores (the POST /replicate/* code paths)."""
+
+    async def apply_events(self, events: list[dict]) -> tuple[int, list[str]]:
+        from app.api import replication
+
+        return await get_executor().run(replication._apply_events, events)
+
+    async def apply_snapshot(self, lines: list[dict]) -> dict:
+        from app.api import replication
+
+        return await get_executor().run(replication._apply_snapshot, lines)
+
+    async def merkle(self, user_id: str, prefixes: list[str]) -> dict:
+        from app.api import replication
+
+        return await get_executor().run(replication._merkle_response, user_id, prefixes)
+
+    async def apply_notes(self, user_id: str, payloads: list[dict]) -> int:
+        from app.api import replication
+
+        return await get_executor().run(replication._apply_repair, user_id, payloads)
+
+
+class Replicator:
+    def __init__(
+        self,
+        base_dir: Path,
+        peers: list[Peer],
+        users: list[str],
+        node_id: Optional[str] = None,
+        concurrency: int = 8,
+        batch: int = 500,
+        poll_seconds: float = 2.0,
+        backoff_max: float = 60.0,
+        repair_seconds: float = 0.0,
+        sink: Any = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.peers = peers
+        self.users = users
+        self.node_id = node_id
+        self.concurrency = max(1, concurrency)
+        self.batch = max(1, batch)
+        self.poll_seconds = poll_seconds
+        self.backoff_max = backoff_max
+        self.repair_seconds = repair_seconds
+        self.cursors = CursorStore(base_dir)
+        self.sink = sink or LocalSink()
+        self._transport = transport
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._slots: dict[str, asyncio.Semaphore] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._stop: Optional[asyncio.Event] = None
+        self._batches = 0
+        self._events = 0
+        self._refetched = 0
+        self._snapshots = 0
+        self._errors = 0
+        self._repaired = 0
+
+    @classmethod
+    def from_env(cls, base_dir: Path) -> Optional["Replicator"]:
+        peers = parse_peers(os.getenv("REPL_PEERS", ""))
+        users = [u.strip() for u in os.getenv("REPL_USERS", "").split(",") if u.strip()]
+        if not peers or not users:
+            return None
+        return cls(
+            base_dir,
+            peers,
+            users,
+            node_id=os.getenv("REPL_NODE_ID") or None,
+            concurrency=int(os.getenv("REPL_CONCURRENCY", "8")),
+            batch=int(os.getenv("REPL_PULL_BATCH", "500")),
+            poll_seconds=float(os.getenv("REPL_POLL_SECONDS", "2")),
+            backoff_max=float(os.getenv("REPL_BACKOFF_MAX", "60")),
+            repair_seconds=float(os.getenv("REPL_REPAIR_SECONDS", "0")),
+        )
+
+    def _client(self, peer: Peer) -> httpx.AsyncClient:
+        client = self._clients.get(peer.name)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            client = httpx.AsyncClient(
+                base_url=peer.base_url, limits=limits, timeout=httpx.Timeout(30.0), transport=self._transport
+            )
+            self._clients[peer.name] = client
+            self._slots[peer.name] = asyncio.Semaphore(self.concurrency)
+        return client
+
+    # ---- lifecycle ----
+
+    def start(self) -> None:
+        self._stop = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(peer, user_id)) for peer in self.peers for user_id in self.users
+        ]
+
+    async def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, peer: Peer, user_id: str) -> None:
+        backoff = 0.0
+        loop = asyncio.get_running_loop()
+        next_repair = loop.time() + self.repair_seconds
+        while not self._stop.is_set():
+            try:
+                await self.sync(peer, user_id)
+                if self.repair_seconds and loop.time() >= next_repair:
+                    await self.repair(peer, user_id)
+                    next_repair = loop.time() + self.repair_seconds
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._errors += 1
+                backoff = min(self.backoff_max, max(0.5, backoff * 2))
+                await self._sleep(backoff * random.uniform(0.5, 1.0))
+                continue
+            backoff = 0.0
+            await self._sleep(self.poll_seconds)
+
+    async def sync_all(self) -> None:
+        """One catch-up pass over every peer and user (errors propagate)."""
+        await asyncio.gather(*(self.sync(peer, u) for peer in self.peers for u in self.users))
+
+    # ---- one catch-up pass ----
+
+    async def sync(self, peer: Peer, user_id: str) -> int:
+        """Pull and apply until caught up with `peer`; returns the cursor reached."""
+        client = self._client(peer)
+        async with self._slots[peer.name]:
+            cursor = await get_executor().run(self.cursors.get, peer.name, user_id)
+            fetch = asyncio.create_task(self._fetch(client, user_id, cursor, self.batch, delta=True))
+            while True:
+                events = await fetch
+                if events is None:
+                    return await self._bootstrap(client, peer, user_id)
+                if not events:
+                    return cursor
+                last = int(events[-1]["seq"])
+                more = len(events) >= self.batch
+                if more:
+                    fetch = asyncio.create_task(self._fetch(client, user_id, last, self.batch, delta=True))
+                try:
+                    await self._apply(client, user_id, events)
+                    await get_executor().run(self.cursors.set, peer.name, user_id, last)
+                    await self._ack(client, user_id, last)
+                except BaseException:
+                    if more:
+                        fetch.cancel()
+                    raise
+                cursor = last
+                if not more:
+                    return cursor
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, user_id: str, since_seq: int, limit: int, delta: bool
+    ) -> Optional[list[dict]]:
+        params: dict[str, Any] = {
+            "user_id": user_id,
+            "since_seq": since_seq,
+            "limit": limit,
+            "coalesce": "true",
+            "delta": "true" if delta else "false",
+        }
+        r = await client.get("/replicate/events", params=params, headers={"Accept": NDJSON})
+        if r.status_code == 410:
+            return None
+        r.raise_for_status()
+        return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+    async def _ack(self, client: httpx.AsyncClient, user_id: str, seq: int) -> None:
+        if not self.node_id:
+            return
+        body = json.dumps({"user_id": user_id, "peer": self.node_id, "seq": seq}).encode("utf-8")
+        r = await client.post(
+            "/replicate/ack",
+            content=body,
+            headers={"Content-Type": "application/json", "X-Replication-Token": compute_replication_token(body)},
+        )
+        r.raise_for_status()
+
+    async def _apply(self, client: httpx.AsyncClient, user_id: str, events: list[dict]) -> None:
+        _, need_full = await self.sink.apply_events(events)
+        self._batches += 1
+        self._events += len(events)
+        if need_full:
+            # the local note is not at the delta's base: only those notes, full payloads
+            self._refetched += len(need_full)
+            refused = set(need_full)
+            retry = [e for e in events if e.get("event_id") in refused]
+            ids = list(dict.fromkeys(str(e["note_id"]) for e in retry))
+            notes: dict[str, dict] = {}
+            for i in range(0, len(ids), 200):
+                r = await client.get("/replicate/notes", params={"user_id": user_id, "id": ids[i : i + 200]})
+                r.raise_for_status()
+                notes.update((n["id"], n) for n in r.json())
+            full = []
+            for e in retry:
+                e = {k: v for k, v in e.items() if k != "payload_delta"}
+                # a note gone from the peer goes without payload, as the peer itself would send it
+                if str(e["note_id"]) in notes:
+                    e["payload"] = notes[str(e["note_id"])]
+                full.append(e)
+            _, still = await self.sink.apply_events(full)
+            if still:
+                raise RuntimeError(f"{len(still)} event(s) could not be applied")
+
+    async def _bootstrap(self, client: httpx.AsyncClient, peer: Peer, user_id: str) -> int:
+        r = await client.get("/replicate/snapshot", params={"user_id": user_id})
+        r.raise_for_status()
+        lines = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+        if len(lines) < 2 or lines[0].get("type") != "snapshot" or lines[-1].get("type") != "end":
+            raise SnapshotIncomplete(f"Incomplete snapshot from {peer.name}")
+        result = await self.sink.apply_snapshot(lines)
+        self._snapshots += 1
+        cursor = int(result["cursor"])
+        await get_executor().run(self.cursors.set, peer.name, user_id, cursor)
+        await self._ack(client, user_id, cursor)
+        return cursor
+
+    # ---- anti-entropy ----
+
+    async def repair(self, peer: Peer, user_id: str) -> int:
+        """Pull the notes whose (version, content hash) differ from the peer's and win; returns how many."""
+        client = self._client(peer)
+        async with self._slots[peer.name]:
+            want: list[str] = []
+            frontier = [""]
+            while frontier:
+                level, frontier = frontier, []
+                for i in range(0, len(level), 256):
+                    part = level[i : i + 256]
+                    r = await client.get("/replicate/merkle", params={"user_id": user_id, "prefix": part})
+                    r.raise_for_status()
+                    theirs = r.json()
+                    mine = await self.sink.merkle(user_id, part)
+                    if theirs["depth"] != mine["depth"]:
+                        raise RuntimeError(f"Tree depth differs from {peer.name}")
+                    local = {n["prefix"]: n for n in mine["nodes"]}
+                    for node in theirs["nodes"]:
+                        own = local.get(node["prefix"], {})
+                        if node["hash"] == own.get("hash"):
+                            continue
+                        if "children" in node:
+                            kids = own.get("children", {})
+                            frontier += [node["prefix"] + d for d, h in node["children"].items() if kids.get(d) != h]
+                        else:
+                            notes = own.get("notes", {})
+                            want += [nid for nid, d in node["notes"].items() if merkle.wins(d, notes.get(nid))]
+
+            applied = 0
+            for i in range(0, len(want), 200):
+                r = await client.get("/replicate/notes", params={"user_id": user_id, "id": want[i : i + 200]})
+                r.raise_for_status()
+                applied += await self.sink.apply_notes(user_id, r.json())
+            self._repaired += applied
+            return applied
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "peers": [p.name for p in self.peers],
+            "users": len(self.users),
+            "batches": self._batches,
+            "events": self._events,
+            "refetched": self._refetched,
+            "snapshots": self._snapshots,
+            "errors": self._errors,
+            "repaired": self._repaired,
+        }
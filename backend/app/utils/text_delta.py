@@ -0,0 +1,32 @@
+"""Compact text deltas for replicating note edits.
+
+A delta replaces one span: keep `p` leading and `s` trailing characters of the base
+and put `t` in between. Typing and small edits touch a single region, so the delta is
+about as big as the edit itself; computing it is one linear prefix/suffix scan.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_delta(old: str, new: str) -> dict[str, Any]:
+    n = min(len(old), len(new))
+    p = 0
+    while p < n and old[p] == new[p]:
+        p += 1
+    s = 0
+    while s < n - p and old[len(old) - 1 - s] == new[len(new) - 1 - s]:
+        s += 1
+    return {"p": p, "s": s, "t": new[p : len(new) - s]}
+
+
+def apply_delta(old: str, delta: dict[str, Any]) -> str:
+    p, s, t = int(delta["p"]), int(delta["s"]), str(delta["t"])
+    if p < 0 or s < 0 or p + s > len(old):
+        raise ValueError("Delta does not fit its base")
+    return old[:p] + t + old[len(old) - s :]
@@ -0,0 +1,60 @@
+"""Benchmark the "files" and "sqlite" storage engines on the same workload.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_engines [--notes 2000] [--reads 2000] [--events 2000]
+
+Each engine gets a throw-away data dir. Reported per operation (mean, us):
+note create, note update, random note read, one page of 100 summaries, event emit.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.storage.engine import ENGINES, open_engine
+from app.storage.event_log import Event
+
+
+def _mean_us(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / max(n, 1) * 1e6
+
+
+def _run(name: str, base: Path, n_notes: int, n_reads: int, n_events: int) -> dict[str, float]:
+    engine = open_engine(base, name)
+    notes = engine.notes()
+    log = engine.event_log()
+    ids = []
+
+    out = {}
+    out["create"] = _mean_us(lambda i: ids.append(notes.create_note("bench", f"t{i}", "x" * 512).id), n_notes)
+    out["update"] = _mean_us(lambda i: notes.update_note("bench", ids[i % len(ids)], "u", "y" * 512), n_notes // 4)
+    out["read"] = _mean_us(lambda i: notes.get_note("bench", random.choice(ids)), n_reads)
+    out["page"] = _mean_us(lambda i: notes.page_summaries("bench", limit=100, descending=True), 50)
+    out["emit"] = _mean_us(lambda i: log.emit(Event(event_type="NOTE_UPDATED", user_id="bench", note_id=str(ids[0]))), n_events)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", type=int, default=2000)
+    ap.add_argument("--reads", type=int, default=2000)
+    ap.add_argument("--events", type=int, default=2000)
+    args = ap.parse_args()
+
+    ops = ("create", "update", "read", "page", "emit")
+    print(f"{'engine':>8} " + " ".join(f"{op + ' (us)':>12}" for op in ops))
+    for name in ENGINES:
+        with tempfile.TemporaryDirectory() as d:
+            r = _run(name, Path(d), args.notes, args.reads, args.events)
+            print(f"{name:>8} " + " ".join(f"{r[op]:>12.1f}" for op in ops))
+
+
+if __name__ == "__main__":
+    main()
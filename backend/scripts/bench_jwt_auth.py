@@ -0,0 +1,45 @@
+"""Benchmark bearer-token verification: full jwt.decode vs. the verified-token cache.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_jwt_auth [--tokens 100] [--requests 20000]
+
+Simulates --requests authenticated calls spread over --tokens distinct users and
+reports the mean verification cost per request for both paths.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+
+from app.utils import jwt_auth
+
+
+def _mean_us(fn, tokens: list[str], n: int) -> float:
+    picks = [random.choice(tokens) for _ in range(n)]
+    t0 = time.perf_counter()
+    for t in picks:
+        fn(t)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, default=100)
+    ap.add_argument("--requests", type=int, default=20000)
+    args = ap.parse_args()
+
+    os.environ.setdefault("JWT_SECRET", "bench-secret")
+    jwt_auth.load_keys()
+    tokens = [jwt_auth.create_access_token(f"user{i}") for i in range(args.tokens)]
+
+    full = _mean_us(jwt_auth.decode_token, tokens, args.requests)
+    cached = _mean_us(jwt_auth.verify_token, tokens, args.requests)
+    print(f"decode_token (no cache): {full:8.2f} us/request")
+    print(f"verify_token (cached):   {cached:8.2f} us/request   {jwt_auth.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare one-request-per-note imports with POST /notes:batchCreate.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_notes_batch [--notes 1000] [--batch 100]
+
+Runs the app in-process (TestClient) on a throw-away data dir and reports notes/s
+for both paths, including event writes.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+
+def _client(data_dir: str) -> TestClient:
+    os.environ["APP_DATA_DIR"] = data_dir
+    import app.api.notes
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.main)
+    return TestClient(app.main.app)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", type=int, default=1000)
+    ap.add_argument("--batch", type=int, default=100)
+    args = ap.parse_args()
+    h = {"X-User-Id": "bench"}
+    body = {"title": "t", "content": "x" * 512}
+
+    with tempfile.TemporaryDirectory() as d:
+        client = _client(d)
+        t0 = time.perf_counter()
+        for _ in range(args.notes):
+            client.post("/notes", headers=h, json=body)
+        single = args.notes / (time.perf_counter() - t0)
+
+    with tempfile.TemporaryDirectory() as d:
+        client = _client(d)
+        t0 = time.perf_counter()
+        for i in range(0, args.notes, args.batch):
+            n = min(args.batch, args.notes - i)
+            client.post("/notes:batchCreate", headers=h, json={"items": [body] * n})
+        batched = args.notes / (time.perf_counter() - t0)
+
+    print(f"single requests: {single:10.1f} notes/s")
+    print(f"batchCreate/{args.batch}: {batched:10.1f} notes/s  ({batched / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the per-note files layout with pack files (STORAGE_ENGINE=pack).
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_pack [--notes 10000] [--updates 10000] [--reads 2000]
+
+Store-level, on throw-away data dirs: create and update throughput (each write is
+fsynced in both layouts), a cold open + list_notes, point reads, and disk usage
+(allocated blocks and file count).
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.storage import notes_manifest, pack_store
+from app.storage.notes_store import NotesStore
+from app.storage.pack_store import PackNotesStore
+
+
+def _disk(d: Path) -> tuple[int, int]:
+    files = [p for p in d.rglob("*") if p.is_file()]
+    return sum(p.stat().st_blocks * 512 for p in files), len(files)
+
+
+def _run(name: str, make_store, d: Path, args) -> None:
+    rng = random.Random(7)
+    store = make_store(d)
+    body = "lorem ipsum dolor sit amet " * 20
+
+    t = time.perf_counter()
+    ids = [store.create_note("bench", f"note {i}", body).id for i in range(args.notes)]
+    create = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for i in range(args.updates):
+        store.update_note("bench", rng.choice(ids), "edited", body + str(i))
+    update = time.perf_counter() - t
+
+    # cold: drop resident manifests / pack indexes, as after a restart
+    notes_manifest._manifests.clear()
+    pack_store._packs.clear()
+    pack_store._open_packs.clear()
+    store = make_store(d)
+    t = time.perf_counter()
+    n = len(store.list_notes("bench"))
+    cold_list = time.perf_counter() - t
+
+    lat = []
+    for nid in rng.sample(ids, min(args.reads, len(ids))):
+        t = time.perf_counter()
+        store.get_note("bench", nid)
+        lat.append((time.perf_counter() - t) * 1e6)
+    lat.sort()
+    used, files = _disk(d)
+    print(
+        f"{name:6} create {args.notes / create:7.0f}/s  update {args.updates / update:7.0f}/s  "
+        f"cold list {cold_list:6.2f}s ({n})  get p50/p95 {statistics.median(lat):6.1f}/{lat[int(len(lat) * 0.95)]:6.1f} us  "
+        f"disk {used / 1e6:7.1f} MB in {files} files"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", type=int, default=10000)
+    ap.add_argument("--updates", type=int, default=10000)
+    ap.add_argument("--reads", type=int, default=2000)
+    args = ap.parse_args()
+
+    for name, make in (("files", NotesStore), ("pack", PackNotesStore)):
+        with tempfile.TemporaryDirectory() as d:
+            _run(name, make, Path(d), args)
+
+
+if __name__ == "__main__":
+    main()
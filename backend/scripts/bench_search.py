@@ -0,0 +1,119 @@
+"""Search index latency at different collection sizes.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_search [--notes 10000,100000] [--queries 300]
+
+Builds one user's index over synthetic notes (~80 words drawn from a skewed 20k-word
+vocabulary) and reports build time, reload time (from the snapshot, and from the journal
+alone as without one), incremental update latency and query latency (p50 / p95, ms) for
+one word, two words and a quoted phrase.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from app.storage.notes_store import Note
+from app.storage.search_index import SearchIndex
+
+VOCAB = [f"w{i}" for i in range(20_000)]
+WEIGHTS = [1.0 / (i + 1) for i in range(len(VOCAB))]
+
+
+def _words(rng: random.Random, n: int) -> list[str]:
+    return rng.choices(VOCAB, weights=WEIGHTS, k=n)
+
+
+def _note(rng: random.Random, i: int) -> Note:
+    now = "2026-01-01T00:00:00+00:00"
+    return Note(
+        id=uuid.UUID(int=rng.getrandbits(128)),
+        owner_user_id="bench",
+        title=" ".join(_words(rng, 5)),
+        content=" ".join(_words(rng, 80)),
+        created_at=now,
+        updated_at=now,
+        version=1,
+    )
+
+
+class _Summaries:
+    """Just enough of a notes store for SearchIndex.ensure_loaded (nothing to heal)."""
+
+    def __init__(self, notes: list[Note]):
+        self.notes = notes
+
+    def list_summaries(self, user_id: str) -> list[Note]:
+        return self.notes
+
+    def get_note(self, user_id: str, note_id: uuid.UUID) -> None:
+        return None
+
+
+def _pct(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"{statistics.median(samples) * 1000:8.2f} {p95 * 1000:8.2f}"
+
+
+def _bench(n: int, n_queries: int) -> None:
+    rng = random.Random(n)
+    notes = [_note(rng, i) for i in range(n)]
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(d) / "search_index.log"
+        idx = SearchIndex(path)
+        t0 = time.perf_counter()
+        idx.rebuild(notes)
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        SearchIndex(path).ensure_loaded(_Summaries(notes), "bench")
+        reload = time.perf_counter() - t0
+
+        snap = path.with_suffix(".snap")
+        kept = snap.read_bytes()
+        snap.unlink()
+        t0 = time.perf_counter()
+        SearchIndex(path).ensure_loaded(_Summaries(notes), "bench")
+        replay = time.perf_counter() - t0
+        snap.write_bytes(kept)
+
+        t_put = []
+        for i in range(200):
+            t0 = time.perf_counter()
+            idx.put(_note(rng, n + i))
+            t_put.append(time.perf_counter() - t0)
+
+        print(
+            f"notes={n}: build {build:.2f}s, reload {reload:.2f}s (journal only {replay:.2f}s), "
+            f"update p50/p95 {_pct(t_put)} ms"
+        )
+        for kind in ("one word", "two words", "phrase"):
+            lat = []
+            for _ in range(n_queries):
+                src = rng.choice(notes).content.split()
+                j = rng.randrange(len(src) - 1)
+                q = {"one word": src[j], "two words": f"{src[j]} {rng.choice(src)}", "phrase": f'"{src[j]} {src[j + 1]}"'}[kind]
+                t0 = time.perf_counter()
+                idx.search(q, limit=20)
+                lat.append(time.perf_counter() - t0)
+            print(f"  {kind:>10}: p50/p95 {_pct(lat)} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", default="10000,100000")
+    ap.add_argument("--queries", type=int, default=300)
+    args = ap.parse_args()
+    for n in (int(x) for x in args.notes.split(",")):
+        _bench(n, args.queries)
+
+
+if __name__ == "__main__":
+    main()
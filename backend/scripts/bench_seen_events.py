@@ -0,0 +1,66 @@
+"""Benchmark replication dedup: resident SeenEventsStore vs. re-reading seen_events.txt per event.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_seen_events [--history 0 100000 1000000] [--batch 1000]
+
+For each history size, a user is pre-seeded with that many seen ids, then one batch
+of new ids is checked + recorded. The legacy column replays the pre-index loop
+(read + parse the whole file, append one line) on a sample of the batch.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from app.storage.seen_events import SeenEventsStore
+
+
+def _legacy_ingest(seen_file: Path, ids: list[str]) -> None:
+    for event_id in ids:
+        seen = set()
+        if seen_file.exists():
+            seen = set(x.strip() for x in seen_file.read_text(encoding="utf-8").splitlines() if x.strip())
+        if event_id in seen:
+            continue
+        with seen_file.open("a", encoding="utf-8") as f:
+            f.write(event_id + "\n")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--history", type=int, nargs="+", default=[0, 100_000, 1_000_000])
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--legacy-sample", type=int, default=20)
+    args = ap.parse_args()
+
+    print(f"{'history':>10} {'resident ev/s':>14} {'legacy ev/s':>12}")
+    for n in args.history:
+        with tempfile.TemporaryDirectory() as d:
+            base = Path(d)
+            store = SeenEventsStore(base)
+            seen = store.for_user("bench")
+            seen.add_many(str(uuid.uuid4()) for _ in range(n))
+            seen.compact()
+
+            batch = [str(uuid.uuid4()) for _ in range(args.batch)]
+            t0 = time.perf_counter()
+            fresh = [x for x in batch if not seen.contains(x)]
+            seen.add_many(fresh)
+            resident = len(batch) / (time.perf_counter() - t0)
+
+            legacy_file = base / "legacy_seen.txt"
+            legacy_file.write_text("".join(str(uuid.uuid4()) + "\n" for _ in range(n)), encoding="utf-8")
+            sample = batch[: args.legacy_sample]
+            t0 = time.perf_counter()
+            _legacy_ingest(legacy_file, sample)
+            legacy = len(sample) / (time.perf_counter() - t0)
+
+            print(f"{n:>10} {resident:>14.0f} {legacy:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
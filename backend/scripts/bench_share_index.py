@@ -0,0 +1,66 @@
+"""Benchmark SharesStore.find_share_for_user (index) vs. the legacy users/* scan.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_share_index [--users 100 1000 10000] [--lookups 200]
+
+Each run builds a throw-away data dir with N users (one note + one share each)
+and reports the mean lookup latency for both strategies.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.storage.notes_store import NotesStore
+from app.storage.shares_store import SharesStore
+
+
+def _populate(base_dir: Path, n_users: int) -> list[tuple]:
+    notes = NotesStore(base_dir)
+    shares = SharesStore(base_dir)
+    out = []
+    for i in range(n_users):
+        owner = f"user{i}"
+        note = notes.create_note(user_id=owner, title="t", content="c")
+        s = shares.create_share(
+            owner_user_id=owner,
+            note_id=note.id,
+            shared_with_user_id=f"user{(i + 1) % n_users}",
+            mode="ro",
+        )
+        out.append((s.share_id, s.shared_with_user_id))
+    return out
+
+
+def _mean_us(fn, samples: list[tuple]) -> float:
+    t0 = time.perf_counter()
+    for share_id, user_id in samples:
+        assert fn(share_id=share_id, user_id=user_id) is not None
+    return (time.perf_counter() - t0) / len(samples) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, nargs="+", default=[100, 1000, 5000])
+    ap.add_argument("--lookups", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"{'users':>8} {'index (us)':>12} {'scan (us)':>12}")
+    for n in args.users:
+        with tempfile.TemporaryDirectory() as d:
+            base = Path(d)
+            created = _populate(base, n)
+            samples = [random.choice(created) for _ in range(args.lookups)]
+            store = SharesStore(base)
+            store.rebuild_index()
+            idx = _mean_us(store.find_share_for_user, samples)
+            scan = _mean_us(store.scan_share_for_user, samples[: max(1, args.lookups // 10)])
+            print(f"{n:>8} {idx:>12.1f} {scan:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the flat and sharded users layouts (see app.storage.user_layout) by user count.
+
+Usage (from the backend folder):
+
+    python -m scripts.bench_user_layout [--users 1000,10000,100000] [--lookups 2000]
+
+For each user count and layout, on a throw-away data dir with one user.json per user:
+user lookups (UsersStore.get) of existing users, on first access in the process and
+again, and of unknown users; creating new users; a full listing of the users (what
+share and lock recovery scan); and, for the flat dir, the time scripts/shard_users
+takes to move everyone to the sharded layout.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from app.storage import user_layout
+from app.storage.users_store import UsersStore
+from scripts.shard_users import migrate
+
+
+def _lat(fn, keys) -> list[float]:
+    out = []
+    for k in keys:
+        t = time.perf_counter()
+        fn(k)
+        out.append((time.perf_counter() - t) * 1e6)
+    out.sort()
+    return out
+
+
+def _run(layout: str, n: int, d: Path, args) -> None:
+    rng = random.Random(7)
+    user_layout.set_layout(d, layout)
+    store = UsersStore(d)
+    ids = [f"user-{i:07d}" for i in range(n)]
+    for uid in ids:
+        store.create(uid, "x")
+
+    user_layout._layouts.clear()  # as after a restart
+    store = UsersStore(d)
+    sample = rng.sample(ids, min(args.lookups, n))
+    hit = _lat(store.get, sample)
+    warm = _lat(store.get, sample)
+    miss = _lat(store.get, [f"nobody-{i}" for i in range(args.lookups)])
+
+    t = time.perf_counter()
+    for i in range(1000):
+        store.create(f"new-{i:07d}", "x")
+    create = time.perf_counter() - t
+
+    t = time.perf_counter()
+    listed = sum(1 for _ in user_layout.iter_user_dirs(d))
+    scan = time.perf_counter() - t
+
+    line = (
+        f"{n:>7} {layout:8} get p50/p95 {statistics.median(hit):6.1f}/{hit[int(len(hit) * 0.95)]:6.1f} us  "
+        f"again p50 {statistics.median(warm):6.1f} us  miss p50 {statistics.median(miss):6.1f} us  create {1000 / create:6.0f}/s  "
+        f"list {scan:6.2f}s ({listed})  users/ entries {sum(1 for _ in (d / 'users').iterdir())}"
+    )
+    if layout == "flat":
+        t = time.perf_counter()
+        moved = migrate(d, "sharded")["moved"]
+        line += f"  migrate {moved} users {time.perf_counter() - t:5.2f}s"
+    print(line)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", default="1000,10000,100000")
+    ap.add_argument("--lookups", type=int, default=2000)
+    args = ap.parse_args()
+
+    for n in (int(x) for x in args.users.split(",")):
+        for layout in user_layout.LAYOUTS:
+            with tempfile.TemporaryDirectory() as d:
+                _run(layout, n, Path(d), args)
+
+
+if __name__ == "__main__":
+    main()
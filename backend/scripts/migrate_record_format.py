@@ -0,0 +1,75 @@
+"""Switch a file-engine data dir to another record format and rewrite its records.
+
+Usage (from the backend folder):
+
+    python -m scripts.migrate_record_format --to bin1|json [--data-dir PATH]
+
+Writes the data dir's `record_format` file first, so anything written from then on
+uses the new format, then rewrites users/<id>/{notes,notes_prev,shares,locks}/*.json,
+users/<id>/user.json and share_index/*.json. Readers accept both formats, so the
+migration can be interrupted and re-run. Stop the API first: it reads the format once
+at startup. Note contents compressed with NOTES_COMPRESS stay compressed.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+from app.storage import record_codec, user_layout
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+_KINDS = ("notes", "notes_prev", "shares", "locks")
+
+
+def _in_format(data: bytes, fmt: str) -> bool:
+    return (data[:1] == record_codec.MAGIC) == (fmt == "bin1")
+
+
+def _rewrite(path: Path, fmt: str) -> bool:
+    data = path.read_bytes()
+    if _in_format(data, fmt):
+        return False
+    obj = record_codec.loads(data)
+    # compressed note contents keep their compact JSON layout (see NotesStore)
+    compact = isinstance(obj, dict) and "format" in obj
+    record_codec.write_atomic(path, obj, fmt, compact=compact)
+    return True
+
+
+def migrate(base_dir: Path, fmt: str) -> dict[str, int]:
+    record_codec.set_format(base_dir, fmt)
+    counts = {k: 0 for k in (*_KINDS, "users", "share_index", "errors")}
+
+    def run(kind: str, paths) -> None:
+        for p in paths:
+            try:
+                counts[kind] += _rewrite(p, fmt)
+            except (OSError, ValueError):
+                # corrupted files are skipped, same as the stores do
+                counts["errors"] += 1
+
+    for user_id, _ in user_layout.iter_user_dirs(base_dir):
+        user_dir = user_layout.user_dir(base_dir, user_id)
+        for kind in _KINDS:
+            run(kind, sorted((user_dir / kind).glob("*.json")))
+        if (user_dir / "user.json").exists():
+            run("users", [user_dir / "user.json"])
+    run("share_index", sorted((base_dir / "share_index").glob("*.json")))
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    ap.add_argument("--to", required=True, choices=record_codec.FORMATS)
+    args = ap.parse_args()
+
+    counts = migrate(Path(args.data_dir), args.to)
+    print(f"record format: {args.to}")
+    print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
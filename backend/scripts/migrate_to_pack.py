@@ -0,0 +1,70 @@
+"""Move a file-engine data dir's notes into per-user pack files.
+
+Usage (from the backend folder):
+
+    python -m scripts.migrate_to_pack [--data-dir PATH] [--remove]
+
+For every user, appends the previous version (users/<id>/notes_prev) and then the
+current version of each note to users/<id>/notes.pack, so get_previous keeps working.
+Shares, locks and events stay where they are: the pack engine uses the same files.
+Notes already in a pack with the same or a newer version are skipped, so the
+migration can be re-run. --remove deletes the note files once their user is packed.
+Stop the API first, then start it with STORAGE_ENGINE=pack.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from app.storage import note_format, user_layout
+from app.storage.pack_store import PackNotesStore
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def migrate(base_dir: Path, remove: bool = False) -> dict[str, int]:
+    store = PackNotesStore(base_dir)
+    counts = {"users": 0, "notes": 0, "skipped": 0, "errors": 0}
+    for user_id, p in user_layout.iter_user_dirs(base_dir):
+        if not (p / "notes").is_dir():
+            continue
+        user_dir = user_layout.user_dir(base_dir, user_id)
+        counts["users"] += 1
+        errors = counts["errors"]
+        for p in sorted((user_dir / "notes").glob("*.json")):
+            try:
+                raw = note_format.read(p)
+                existing = store.get_note(user_id, uuid.UUID(raw["id"]))
+                if existing is not None and existing.version >= int(raw["version"]):
+                    counts["skipped"] += 1
+                    continue
+                prev = user_dir / "notes_prev" / p.name
+                if prev.exists():
+                    store.apply_note_raw(note_format.read(prev))
+                store.apply_note_raw(raw)
+                counts["notes"] += 1
+            except Exception:
+                # corrupted files are skipped, same as the file engine does
+                counts["errors"] += 1
+        if remove and counts["errors"] == errors:
+            for name in ("notes", "notes_prev"):
+                shutil.rmtree(user_dir / name, ignore_errors=True)
+            (user_dir / "notes_manifest.log").unlink(missing_ok=True)
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    ap.add_argument("--remove", action="store_true", help="delete note files after packing them")
+    args = ap.parse_args()
+
+    counts = migrate(Path(args.data_dir), remove=args.remove)
+    print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Copy a file-engine data dir into the SQLite engine database.
+
+Usage (from the backend folder):
+
+    python -m scripts.migrate_to_sqlite [--data-dir PATH]
+
+Reads data/users/<id>/{notes,shares,locks,events} and writes them to
+APP_DATA_DIR/notes.db (or SQLITE_PATH). Rows are upserted, so the migration
+can be re-run; event seqs are preserved so replication cursors stay valid.
+Start the API with STORAGE_ENGINE=sqlite afterwards.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from app.storage import note_format, record_codec, user_layout
+from app.storage.event_log import EventLog
+from app.storage.notes_manifest import _key_us
+from app.storage.sqlite_engine import SqliteEngine
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def _read_json_dir(d: Path, decode=lambda raw: raw):
+    if not d.exists():
+        return
+    for p in sorted(d.glob("*.json")):
+        try:
+            yield decode(record_codec.load(p))
+        except Exception:
+            # corrupted files are skipped, same as the file engine does
+            continue
+
+
+def migrate(base_dir: Path) -> dict[str, int]:
+    engine = SqliteEngine.for_data_dir(base_dir)
+    log = EventLog(base_dir)
+    counts = {"users": 0, "notes": 0, "shares": 0, "locks": 0, "events": 0}
+    for user_id, _ in user_layout.iter_user_dirs(base_dir):
+        user_dir = user_layout.user_dir(base_dir, user_id)
+        counts["users"] += 1
+        with engine.tx() as c:
+            for n in _read_json_dir(user_dir / "notes", note_format.decode):
+                c.execute(
+                    "INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        n["owner_user_id"],
+                        str(n["id"]),
+                        n.get("title", ""),
+                        n.get("content", ""),
+                        n["created_at"],
+                        n["updated_at"],
+                        int(n.get("version", 1)),
+                        _key_us(n["created_at"]),
+                        _key_us(n["updated_at"]),
+                    ),
+                )
+                counts["notes"] += 1
+
+            for s in _read_json_dir(user_dir / "shares"):
+                c.execute(
+                    "INSERT OR REPLACE INTO shares VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        s["share_id"],
+                        s["owner_user_id"],
+                        s["shared_with_user_id"],
+                        s["note_id"],
+                        s["mode"],
+                        s["created_at"],
+                        s.get("expires_at"),
+                        int(bool(s.get("revoked", False))),
+                    ),
+                )
+                counts["shares"] += 1
+
+            for lk in _read_json_dir(user_dir / "locks"):
+                c.execute(
+                    "INSERT OR REPLACE INTO locks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        lk["owner_user_id"],
+                        lk["note_id"],
+                        lk["lock_id"],
+                        lk["holder_id"],
+                        lk["created_at"],
+                        lk["expires_at"],
+                        _key_us(lk["expires_at"]),
+                    ),
+                )
+                counts["locks"] += 1
+
+            # events.log may be gone once the active segment is sealed
+            if (user_dir / "events").is_dir():
+                for e in log.iter_events(user_id):
+                    c.execute(
+                        "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)",
+                        (user_id, int(e["seq"]), str(e.get("event_id", "")), json.dumps(e, ensure_ascii=False)),
+                    )
+                    counts["events"] += 1
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    args = ap.parse_args()
+
+    base = Path(args.data_dir)
+    counts = migrate(base)
+    print(", ".join(f"{v} {k}" for k, v in counts.items()) + f" -> {SqliteEngine.for_data_dir(base).db_path}")
+
+
+if __name__ == "__main__":
+    main()
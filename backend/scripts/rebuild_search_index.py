@@ -0,0 +1,50 @@
+"""Rebuild the per-user full-text search index from the notes.
+
+Usage (from the backend folder):
+
+    python -m scripts.rebuild_search_index [--data-dir PATH] [--user USER_ID ...]
+
+Without --user, every user with notes is reindexed. Uses STORAGE_ENGINE like the API.
+Defaults to APP_DATA_DIR (or ../data, same as the API modules).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+from app.storage import user_layout
+from app.storage.engine import open_engine
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def _all_users(engine, base_dir: Path) -> list[str]:
+    if engine.name == "sqlite":
+        return [r[0] for r in engine.conn().execute("SELECT DISTINCT owner_user_id FROM notes ORDER BY 1")]
+    return sorted(
+        user_id
+        for user_id, p in user_layout.iter_user_dirs(base_dir)
+        if (p / "notes").is_dir() or (p / "notes.pack").exists()
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    ap.add_argument("--user", action="append", default=[])
+    args = ap.parse_args()
+
+    base_dir = Path(args.data_dir)
+    engine = open_engine(base_dir)
+    notes = engine.notes()
+    total = 0
+    for user_id in args.user or _all_users(engine, base_dir):
+        n = notes.rebuild_search_index(user_id)
+        total += n
+        print(f"{user_id}: indexed {n} note(s)")
+    print(f"done: {total} note(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Rebuild the share_id -> owner index from the per-owner share files.
+
+Usage (from the backend folder):
+
+    python -m scripts.rebuild_share_index [--data-dir PATH]
+
+Defaults to APP_DATA_DIR (or ../data, same as the API modules).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+from app.storage.shares_store import SharesStore
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    args = ap.parse_args()
+
+    n = SharesStore(Path(args.data_dir)).rebuild_index()
+    print(f"indexed {n} share(s) under {Path(args.data_dir) / 'share_index'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Convert existing note files to a storage format (compressed or plain).
+
+Usage (from the backend folder):
+
+    python -m scripts.rewrite_notes [--data-dir PATH] [--codec off|zlib|zstd|auto] [--rate N]
+
+--codec defaults to NOTES_COMPRESS. Runs the same FormatRewriter the API starts with
+NOTES_REWRITE=1, in the foreground and unthrottled unless --rate is given. Run it with
+the API stopped (the per-note write lock is in-process); against a live server, use
+NOTES_REWRITE=1 instead. File engine only.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+
+from app.storage import note_format
+from app.storage.notes_store import NotesStore
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def _notes_bytes(base_dir: Path) -> int:
+    return sum(p.stat().st_size for p in base_dir.glob("users/*/notes/*.json"))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    ap.add_argument("--codec", default=None)
+    ap.add_argument("--rate", type=float, default=0.0, help="notes per second, 0 = unthrottled")
+    args = ap.parse_args()
+
+    if args.codec is not None:
+        os.environ["NOTES_COMPRESS"] = args.codec
+    codec = note_format.codec_from_env()
+    base_dir = Path(args.data_dir)
+    store = NotesStore(base_dir, codec=codec)
+
+    before = _notes_bytes(base_dir)
+    rewriter = note_format.FormatRewriter(store, codec, rate=args.rate)
+    rewriter.run()
+    after = _notes_bytes(base_dir)
+    s = rewriter.stats()
+    print(f"{s['codec']}: scanned {s['scanned']}, rewrote {s['rewritten']}, errors {s['errors']}")
+    print(f"note files: {before} -> {after} bytes")
+
+
+if __name__ == "__main__":
+    main()
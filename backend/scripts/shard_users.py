@@ -0,0 +1,108 @@
+"""Move a data dir's user directories to another layout (see app.storage.user_layout).
+
+Usage (from the backend folder):
+
+    python -m scripts.shard_users --to sharded|flat [--data-dir PATH] [--rate N]
+
+Writes the data dir's `users_layout` file, then moves every user directory: to
+users/ab/cd/<user_id> (sharded) or back to users/<user_id> (flat).
+
+--to sharded can run while the API serves requests, as long as the API already uses the
+sharded layout (restart it with USERS_LAYOUT=sharded first): the API then moves each user
+on first access and this script moves the others, `--rate` users per second at most.
+Either side finishes a move the other one started, and an interrupted run can be re-run.
+
+--to flat needs the API stopped.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from app.storage import user_layout
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
+
+def _to_sharded(base_dir: Path, counts: dict[str, int], rate: float) -> None:
+    pause = 1.0 / rate if rate > 0 else 0.0
+    for user_id, p in list(user_layout.iter_user_dirs(base_dir)):
+        counts["users"] += 1
+        if p.parent.parent.parent == base_dir / "users":
+            continue  # already in its shard
+        try:
+            if user_layout.move_user(base_dir, user_id):
+                counts["moved"] += 1
+                if pause:
+                    time.sleep(pause)
+        except OSError:
+            counts["errors"] += 1
+
+
+def _remove_empty_shards(users: Path) -> None:
+    for top in users.iterdir():
+        if not (top.is_dir() and user_layout._is_shard_name(top.name)):
+            continue
+        for d in (*top.iterdir(), top):
+            try:
+                d.rmdir()
+            except OSError:
+                pass  # not empty (or not a directory)
+
+
+def _to_flat(base_dir: Path, counts: dict[str, int]) -> None:
+    users = base_dir / "users"
+    parked = []
+    for user_id, p in list(user_layout.iter_user_dirs(base_dir)):
+        counts["users"] += 1
+        dst = users / user_id
+        if p == dst:
+            continue
+        try:
+            if dst.exists():
+                # a shard directory with the same name: park the user until shards are gone
+                moving = users / (user_id + user_layout._MOVING)
+                if p != moving:
+                    os.rename(p, moving)
+                parked.append((moving, dst))
+                continue
+            os.rename(p, dst)
+            counts["moved"] += 1
+        except OSError:
+            counts["errors"] += 1
+    if users.is_dir():
+        _remove_empty_shards(users)
+    for moving, dst in parked:
+        try:
+            os.rename(moving, dst)
+            counts["moved"] += 1
+        except OSError:
+            counts["errors"] += 1
+
+
+def migrate(base_dir: Path, layout: str, rate: float = 0.0) -> dict[str, int]:
+    user_layout.set_layout(base_dir, layout)
+    counts = {"users": 0, "moved": 0, "errors": 0}
+    if layout == "sharded":
+        _to_sharded(base_dir, counts, rate)
+    else:
+        _to_flat(base_dir, counts)
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data-dir", default=os.getenv("APP_DATA_DIR", str(DEFAULT_DATA_DIR)))
+    ap.add_argument("--to", required=True, choices=user_layout.LAYOUTS)
+    ap.add_argument("--rate", type=float, default=0.0, help="max users moved per second (0 = no limit)")
+    args = ap.parse_args()
+
+    counts = migrate(Path(args.data_dir), args.to, args.rate)
+    print(f"users layout: {args.to}")
+    print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import threading
+
+from app.storage.event_log import EventLog, Event
+
+
+def _emit_concurrently(log: EventLog, n: int) -> list:
+    commits = [None] * n
+    barrier = threading.Barrier(n)
+
+    def worker(i):
+        barrier.wait()
+        commits[i] = log.emit(Event(event_type="NOTE_CREATED", user_id="userG", note_id=str(i)))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return commits
+
+
+def test_group_mode_batches_fsyncs_and_keeps_seq_dense(tmp_path, monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (calls.append(fd), real_fsync(fd)))
+
+    log = EventLog(tmp_path, mode="group", window_ms=50, max_batch=64)
+    commits = _emit_concurrently(log, 16)
+
+    assert all(c.done for c in commits)
+    assert sorted(c.seq for c in commits) == list(range(1, 17))
+    assert len(calls) < 16
+    assert [e["seq"] for e in log.read_events("userG", limit=100)] == list(range(1, 17))
+
+
+def test_strict_mode_fsyncs_every_event(tmp_path, monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (calls.append(fd), real_fsync(fd)))
+
+    log = EventLog(tmp_path, mode="strict")
+    _emit_concurrently(log, 8)
+    assert len(calls) == 8
+
+
+def test_emit_without_wait_returns_commit_handle(tmp_path):
+    log = EventLog(tmp_path, mode="group", window_ms=1)
+    commit = log.emit(Event(event_type="LOCK_RELEASED", user_id="userG"), wait=False)
+    assert commit.wait(timeout=5)
+    assert commit.seq == 1
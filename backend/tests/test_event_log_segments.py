@@ -0,0 +1,150 @@
+import hashlib
+import hmac
+import importlib
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+import app.storage.event_log as el
+from app.storage.event_log import Event, EventLog, _events_dir
+
+
+def _emit(log, n, user="userS"):
+    return [log.emit(Event(event_type="NOTE_UPDATED", user_id=user, note_id=f"n{i}")).seq for i in range(n)]
+
+
+def test_rotation_keeps_reads_and_cursors_working(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=1024)
+    assert _emit(log, 40) == list(range(1, 41))
+
+    d = _events_dir(tmp_path, "userS")
+    segs = json.loads((d / "segments.json").read_text())["segments"]
+    assert len(segs) >= 3
+    assert segs[0]["first_seq"] == 1
+    assert all(a["last_seq"] + 1 == b["first_seq"] for a, b in zip(segs, segs[1:]))
+    assert all((d / "segments" / f"{s['first_seq']:020d}.log").stat().st_size == s["bytes"] for s in segs)
+
+    all_events = log.read_events("userS", limit=1000)
+    assert [e["seq"] for e in all_events] == list(range(1, 41))
+    for since in (0, 5, segs[1]["first_seq"] - 1, segs[1]["first_seq"], 39):
+        assert [e["seq"] for e in log.read_events("userS", since_seq=since, limit=7)] == list(range(since + 1, min(since + 8, 41)))
+    assert log.seq_for_event_id("userS", all_events[2]["event_id"]) == 3
+    assert log.seq_for_event_id("userS", all_events[-1]["event_id"]) == 40
+
+    # restart: headers come from segments.json, only the active tail is checked
+    el._states.clear()
+    log = EventLog(tmp_path, segment_bytes=1024)
+    assert log.last_seq("userS") == 40
+    assert _emit(log, 1) == [41]
+
+
+def test_segment_moved_but_not_recorded_is_recovered(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=1024)
+    _emit(log, 30)
+    d = _events_dir(tmp_path, "userS")
+    manifest = json.loads((d / "segments.json").read_text())
+    lost = manifest["segments"].pop()
+    (d / "segments.json").write_text(json.dumps(manifest))  # crash before the manifest update
+    (d / "segments" / "00000000000000099999.idx").write_bytes(b"x")  # half-done seal of another one
+
+    el._states.clear()
+    log = EventLog(tmp_path, segment_bytes=1024)
+    assert [e["seq"] for e in log.read_events("userS", limit=1000)] == list(range(1, 31))
+    segs = json.loads((d / "segments.json").read_text())["segments"]
+    assert segs[-1] == lost
+    assert not (d / "segments" / "00000000000000099999.idx").exists()
+
+
+def test_retention_waits_for_every_peer(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=1024, retention_seconds=0.001)
+    log.ack("userS", "peer-a", 0)
+    log.ack("userS", "peer-b", 0)
+    _emit(log, 40)
+    time.sleep(0.01)
+
+    d = _events_dir(tmp_path, "userS")
+    segs = json.loads((d / "segments.json").read_text())["segments"]
+    log.ack("userS", "peer-a", 40)
+    assert log.first_seq("userS") == 1  # peer-b has not consumed anything yet
+
+    log.ack("userS", "peer-b", segs[1]["last_seq"])
+    assert log.first_seq("userS") == segs[1]["last_seq"] + 1
+    assert not (d / "segments" / f"{segs[0]['first_seq']:020d}.log").exists()
+    assert (d / "segments" / f"{segs[2]['first_seq']:020d}.log").exists()
+    assert log.read_events("userS", since_seq=0, limit=1)[0]["seq"] == segs[1]["last_seq"] + 1
+
+
+def _ack(client, user_id, peer, seq, secret="test-repl-secret"):
+    body = json.dumps({"user_id": user_id, "peer": peer, "seq": seq}).encode()
+    token = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post("/replicate/ack", content=body, headers={"X-Replication-Token": token})
+
+
+def test_ack_is_signed_and_capped_at_the_last_event(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("REPL_SECRET", "test-repl-secret")
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    for m in (app.api.notes, app.api.replication, app.main):
+        importlib.reload(m)
+    client = TestClient(app.main.app)
+    for i in range(3):
+        client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": f"t{i}", "content": "c"})
+
+    assert _ack(client, "userA", "node-b", 2, secret="wrong").status_code == 401
+    assert client.post("/replicate/ack", json={"user_id": "userA", "peer": "node-b", "seq": 2}).status_code == 401
+    # a GET never records consumption, whatever it passes
+    client.get("/replicate/events?user_id=userA&since_seq=3&peer=node-b")
+    assert not (_events_dir(tmp_path, "userA") / "peers.json").exists()
+
+    r = _ack(client, "userA", "node-b", 10**9)
+    assert r.status_code == 200 and r.json()["seq"] == 3
+    assert json.loads((_events_dir(tmp_path, "userA") / "peers.json").read_text()) == {"node-b": 3}
+    assert _ack(client, "userA", "node-b", 1).json()["seq"] == 3  # never moves back
+
+
+def test_retention_keeps_everything_without_known_peers(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=1024, retention_seconds=0.001)
+    _emit(log, 40)
+    time.sleep(0.01)
+    assert log.apply_retention("userS") == 0
+    assert log.first_seq("userS") == 1
+
+
+def test_expired_cursor_gets_410(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("REPL_SECRET", "test-repl-secret")
+    monkeypatch.setenv("EVENT_LOG_SEGMENT_BYTES", "1024")
+    monkeypatch.setenv("EVENT_LOG_RETENTION_SECONDS", "0.001")
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    for m in (app.api.notes, app.api.replication, app.main):
+        importlib.reload(m)
+    client = TestClient(app.main.app)
+
+    for i in range(30):
+        client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": f"t{i}", "content": "c"})
+    time.sleep(0.01)
+    r = client.get("/replicate/events?user_id=userA&since_seq=30")
+    assert r.status_code == 200 and r.json() == []
+    assert app.api.replication.event_log.first_seq("userA") == 1  # no peer has acknowledged anything
+    assert _ack(client, "userA", "node-b", 30).status_code == 200
+
+    r = client.get("/replicate/events?user_id=userA&since_seq=0")
+    assert r.status_code == 410
+    first = app.api.replication.event_log.first_seq("userA")
+    assert first > 1
+    r = client.get(f"/replicate/events?user_id=userA&since_seq={first - 1}")
+    assert r.status_code == 200
+    assert [e["seq"] for e in r.json()] == list(range(first, 31))
+
+    monkeypatch.delenv("EVENT_LOG_SEGMENT_BYTES")
+    monkeypatch.delenv("EVENT_LOG_RETENTION_SECONDS")
+    for m in (app.api.notes, app.api.replication, app.main):
+        importlib.reload(m)
@@ -0,0 +1,66 @@
+import asyncio
+import importlib
+import time
+
+from fastapi.testclient import TestClient
+
+import app.utils.hash_pool as hp
+from app.utils.hash_pool import HashPool, HashPoolBusy
+
+
+def make_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("JWT_SECRET", "dev-secret-for-tests")
+
+    import app.api.auth
+    import app.main
+
+    importlib.reload(app.api.auth)
+    importlib.reload(app.main)
+    return TestClient(app.main.app)
+
+
+def test_pool_rejects_when_workers_and_queue_are_full():
+    pool = HashPool(max_workers=1, max_queue=1, retry_after=3)
+
+    async def burst():
+        return await asyncio.gather(*(pool.run(time.sleep, 0.3) for _ in range(3)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        pool.shutdown()
+    busy = [r for r in results if isinstance(r, HashPoolBusy)]
+    assert len(busy) == 1 and busy[0].retry_after == 3
+
+    stats = pool.stats()
+    assert stats["completed"] == 2 and stats["rejected"] == 1 and stats["peak_in_flight"] == 2
+    assert stats["avg_hash_ms"] >= 250
+    # the queued job waited for the single worker to finish the first one
+    assert stats["avg_wait_ms"] >= 100
+
+
+def test_login_and_register_run_on_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(hp, "_hash_pool", HashPool(max_workers=1, max_queue=4))
+    client = make_client(tmp_path, monkeypatch)
+    try:
+        assert client.post("/auth/register", json={"user_id": "userA", "password": "StrongPassw0rd!"}).status_code == 201
+        assert client.post("/auth/login", json={"user_id": "userA", "password": "StrongPassw0rd!"}).status_code == 200
+        assert client.post("/auth/login", json={"user_id": "userA", "password": "wrongwrongwrong"}).status_code == 401
+
+        stats = client.get("/metrics").json()["auth_hash"]
+        assert stats["completed"] == 3 and stats["in_flight"] == 0
+    finally:
+        hp._hash_pool.shutdown()
+
+
+def test_saturated_pool_returns_503_with_retry_after(tmp_path, monkeypatch):
+    pool = HashPool(max_workers=1, max_queue=0, retry_after=2)
+    pool._in_flight = 1  # the only worker slot is taken
+    monkeypatch.setattr(hp, "_hash_pool", pool)
+    client = make_client(tmp_path, monkeypatch)
+
+    r = client.post("/auth/register", json={"user_id": "userA", "password": "StrongPassw0rd!"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "2"
+    assert client.get("/metrics").json()["auth_hash"]["rejected"] == 1
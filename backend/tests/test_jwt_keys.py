@@ -0,0 +1,74 @@
+import json
+import os
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+import app.utils.jwt_auth as ja
+
+
+@pytest.fixture(autouse=True)
+def _reload_keys_after():
+    yield
+    ja.load_keys()
+
+
+def _write_keys(path, active, keys):
+    path.write_text(json.dumps({"active_kid": active, "keys": keys}), encoding="utf-8")
+
+
+def test_verified_tokens_are_cached_until_exp(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET", "s1")
+    monkeypatch.delenv("JWT_KEYS_FILE", raising=False)
+    ja.load_keys()
+
+    token = ja.create_access_token("userA")
+    assert ja.verify_token(token)["sub"] == "userA"
+    assert ja.verify_token(token)["sub"] == "userA"
+    assert ja.token_cache.stats()["hits"] == 1
+
+    # a cached token is not served past its exp: it goes back through full verification
+    decoded = []
+    real_decode = ja.decode_token
+    monkeypatch.setattr(ja, "decode_token", lambda t: decoded.append(t) or real_decode(t))
+    ja.verify_token(token)
+    assert decoded == []
+    monkeypatch.setattr(ja.time, "time", lambda: 10**12)
+    ja.verify_token(token)
+    assert decoded == [token]
+
+
+def test_keys_file_rotation_by_kid(tmp_path, monkeypatch):
+    keys_file = tmp_path / "jwt_keys.json"
+    _write_keys(keys_file, "k1", {"k1": "secret-1"})
+    monkeypatch.setenv("JWT_KEYS_FILE", str(keys_file))
+    monkeypatch.setenv("JWT_KEYS_RELOAD_SECONDS", "0")
+    ja.load_keys()
+
+    old = ja.create_access_token("userA")
+    assert jwt.get_unverified_header(old)["kid"] == "k1"
+
+    # rotate: new active key, old one kept for tokens already issued
+    _write_keys(keys_file, "k2", {"k1": "secret-1", "k2": "secret-2"})
+    os.utime(keys_file, ns=(time.time_ns(), time.time_ns() + 10**9))
+    new = ja.create_access_token("userB")
+    assert jwt.get_unverified_header(new)["kid"] == "k2"
+    assert ja.verify_token(old)["sub"] == "userA"
+    assert ja.verify_token(new)["sub"] == "userB"
+
+    # retire k1: cached verifications of k1 tokens are dropped with it
+    _write_keys(keys_file, "k2", {"k2": "secret-2"})
+    os.utime(keys_file, ns=(time.time_ns(), time.time_ns() + 2 * 10**9))
+    with pytest.raises(JWTError):
+        ja.verify_token(old)
+    assert ja.verify_token(new)["sub"] == "userB"
+
+
+def test_unknown_kid_is_rejected(monkeypatch):
+    monkeypatch.setenv("JWT_SECRET", "s1")
+    monkeypatch.delenv("JWT_KEYS_FILE", raising=False)
+    ja.load_keys()
+    forged = jwt.encode({"sub": "userA", "exp": int(time.time()) + 60}, "s1", algorithm="HS256", headers={"kid": "nope"})
+    with pytest.raises(JWTError):
+        ja.verify_token(forged)
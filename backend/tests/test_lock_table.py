@@ -0,0 +1,93 @@
+import threading
+import time
+
+import app.storage.locks_store as ls
+from app.storage.event_log import EventLog
+from app.storage.locks_store import LocksStore, _lock_path
+from app.storage.notes_store import NotesStore
+
+
+def _wait_for(pred, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_sweeper_expires_lock_and_emits_event(tmp_path):
+    note = NotesStore(tmp_path).create_note("userA", "t", "c")
+    log = EventLog(tmp_path)
+    locks = LocksStore(tmp_path, default_ttl_seconds=1, event_log=log)
+
+    lock = locks.acquire_lock("userA", note.id)
+    assert _lock_path(tmp_path, "userA", note.id).exists()
+
+    # nobody touches the lock; the sweeper still notices the expiry
+    assert _wait_for(lambda: any(e["event_type"] == "LOCK_EXPIRED" for e in log.read_events("userA")))
+    expired = [e for e in log.read_events("userA") if e["event_type"] == "LOCK_EXPIRED"]
+    assert len(expired) == 1 and expired[0]["lock_id"] == str(lock.lock_id)
+    assert not _lock_path(tmp_path, "userA", note.id).exists()
+    assert locks.require_valid_lock("userA", note.id, lock.lock_id) is False
+
+
+def test_lock_files_are_replayed_on_restart(tmp_path):
+    note = NotesStore(tmp_path).create_note("userA", "t", "c")
+    lock = LocksStore(tmp_path, sweeper=False).acquire_lock("userA", note.id)
+
+    # simulate a restart: drop the resident table, keep the journal files
+    ls._tables.pop(tmp_path)
+
+    locks = LocksStore(tmp_path, sweeper=False)
+    assert locks.require_valid_lock("userA", note.id, lock.lock_id) is True
+    assert locks.acquire_lock("userA", note.id).lock_id == lock.lock_id
+    assert locks.release_lock("userA", note.id) is True
+    assert not _lock_path(tmp_path, "userA", note.id).exists()
+
+
+def test_restart_skips_unreadable_lock_files_under_the_table_lock(tmp_path, monkeypatch):
+    note = NotesStore(tmp_path).create_note("userA", "t", "c")
+    lock = LocksStore(tmp_path, sweeper=False).acquire_lock("userA", note.id)
+    _lock_path(tmp_path, "userA", note.id).with_name("garbage.json").write_bytes(b"{not json")
+    ls._tables.pop(tmp_path)
+
+    owned = []
+    insert = ls._LockTable._insert
+    monkeypatch.setattr(ls._LockTable, "_insert", lambda self, k, r: (owned.append(self.cond._is_owned()), insert(self, k, r)))
+    locks = LocksStore(tmp_path, sweeper=False)
+    assert owned == [True]
+    assert locks.require_valid_lock("userA", note.id, lock.lock_id) is True
+
+
+def test_lock_file_is_written_outside_the_table_lock(tmp_path, monkeypatch):
+    notes = NotesStore(tmp_path)
+    a = notes.create_note("userA", "a", "c")
+    b = notes.create_note("userA", "b", "c")
+    locks = LocksStore(tmp_path, sweeper=False)
+    other = locks.acquire_lock("userA", b.id)
+
+    writing, proceed = threading.Event(), threading.Event()
+    write = ls._atomic_write_json
+
+    def slow_write(path, data, fmt):
+        writing.set()
+        assert proceed.wait(3)
+        write(path, data, fmt)
+
+    monkeypatch.setattr(ls, "_atomic_write_json", slow_write)
+    results = {}
+    t1 = threading.Thread(target=lambda: results.setdefault("first", locks.acquire_lock("userA", a.id)))
+    t2 = threading.Thread(target=lambda: results.setdefault("second", locks.acquire_lock("userA", a.id)))
+    t1.start()
+    assert writing.wait(3)
+    t2.start()
+
+    # other keys are served while the file is being fsynced
+    assert locks.require_valid_lock("userA", b.id, other.lock_id) is True
+    assert "second" not in results  # same key: waits for the outcome
+    proceed.set()
+    t1.join(3)
+    t2.join(3)
+    assert results["first"] == results["second"]
+    assert _lock_path(tmp_path, "userA", a.id).exists()
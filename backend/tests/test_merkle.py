@@ -0,0 +1,121 @@
+import asyncio
+import importlib
+import os
+import uuid
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.storage import merkle
+from app.storage.notes_store import NotesStore
+from app.utils.replicator import LocalSink, Peer, Replicator
+from app.utils.text_delta import content_hash
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+class StoreSink:
+    """The local replica as a plain NotesStore (the peer app owns the API module's store)."""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def merkle(self, user_id, prefixes):
+        return {"depth": merkle.DEPTH, "nodes": self.store.merkle_nodes(user_id, prefixes)}
+
+    async def apply_notes(self, user_id, payloads):
+        for p in payloads:
+            self.store.apply_note_raw(p)
+        return len(payloads)
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, app):
+        self.inner = httpx.ASGITransport(app=app)
+        self.paths = []
+
+    async def handle_async_request(self, request):
+        self.paths.append(request.url.path)
+        return await self.inner.handle_async_request(request)
+
+
+def test_tree_hashes_follow_note_digests():
+    a, b = merkle.MerkleTree(depth=2), merkle.MerkleTree(depth=2)
+    a._built = b._built = True
+    ids = ["0a1", "0a2", "3f0", "ff9"]
+    for t in (a, b):
+        for i in ids:
+            t.put(i, 1, "h")
+    assert a.node("")["hash"] == b.node("")["hash"] != ""
+    assert sorted(a.node("")["children"]) == ["0", "3", "f"]
+
+    b.put("3f0", 2, "h2")
+    assert a.node("")["hash"] != b.node("")["hash"]
+    diff = [d for d, h in a.node("")["children"].items() if b.node("")["children"][d] != h]
+    assert diff == ["3"]
+    assert b.node("3f")["notes"] == {"3f0": [2, "h2"]}
+
+
+def test_wins_is_deterministic():
+    assert merkle.wins((2, "a"), (1, "z"))
+    assert not merkle.wins((1, "z"), (2, "a"))
+    assert merkle.wins((1, "b"), (1, "a")) and not merkle.wins((1, "a"), (1, "b"))
+    assert merkle.wins((1, "a"), None)
+
+
+def test_repair_finds_divergent_notes_in_few_requests(tmp_path):
+    client = make_client(tmp_path / "a")
+    h = {"X-User-Id": "userA"}
+    ids = [client.post("/notes", headers=h, json={"title": f"t{i}", "content": f"c{i}"}).json()["id"] for i in range(300)]
+
+    local = NotesStore(tmp_path / "b")
+    for i in ids:
+        local.apply_note_raw(client.get(f"/notes/{i}", headers=h).json())
+    r = client.get("/replicate/merkle?user_id=userA").json()
+    assert r["nodes"][0]["hash"] == local.merkle_nodes("userA", [""])[0]["hash"]
+
+    # edits that never reached the replica (lost events / wiped seen set)
+    for i in ids[:2]:
+        lock = client.post(f"/notes/{i}/lock", headers=h).json()
+        client.put(f"/notes/{i}", headers=h, json={"title": "new", "content": "changed", "lock_id": lock["lock_id"]})
+
+    import app.main
+
+    transport = CountingTransport(app.main.app)
+    rep = Replicator(tmp_path / "b", [Peer("a", "http://a")], ["userA"], sink=StoreSink(local), transport=transport)
+    assert asyncio.run(rep.repair(rep.peers[0], "userA")) == 2
+    assert transport.paths.count("/replicate/merkle") == merkle.DEPTH + 1
+    assert transport.paths.count("/replicate/notes") == 1
+    assert all(local.get_note("userA", uuid.UUID(i)).content == "changed" for i in ids[:2])
+
+    transport.paths.clear()
+    assert asyncio.run(rep.repair(rep.peers[0], "userA")) == 0
+    assert transport.paths == ["/replicate/merkle"]
+
+
+def test_apply_repair_resolves_same_version_conflicts(tmp_path):
+    client = make_client(tmp_path)
+    h = {"X-User-Id": "userA"}
+    note = client.post("/notes", headers=h, json={"title": "t", "content": "mine"}).json()
+    theirs = dict(note, content="theirs")
+
+    applied = asyncio.run(LocalSink().apply_notes("userA", [theirs]))
+    expected = "theirs" if content_hash("theirs") > content_hash("mine") else "mine"
+    assert applied == (1 if expected == "theirs" else 0)
+    assert client.get(f"/notes/{note['id']}", headers=h).json()["content"] == expected
+
+    assert client.get("/replicate/merkle?user_id=userA&prefix=xyz").status_code == 400
+    assert client.get("/replicate/merkle?user_id=../x").status_code == 400
+    assert client.get(f"/replicate/notes?user_id=userA&id={note['id']}").json()[0]["content"] == expected
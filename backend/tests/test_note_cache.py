@@ -0,0 +1,51 @@
+import json
+
+from app.storage.notes_store import NotesStore, _note_path
+
+
+def test_reads_hit_cache_and_writes_go_through(tmp_path):
+    store = NotesStore(tmp_path, cache_bytes=1_000_000)
+    note = store.create_note("userA", "t", "c")
+
+    assert store.get_note("userA", note.id).title == "t"
+    assert store.cache.stats()["hits"] == 1
+
+    store.update_note("userA", note.id, "t2", "c2")  # read via cache, write-through
+    assert store.get_note("userA", note.id).version == 2
+    stats = store.cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 0
+
+
+def test_external_change_is_detected(tmp_path):
+    store = NotesStore(tmp_path, cache_bytes=1_000_000)
+    note = store.create_note("userA", "t", "c")
+
+    p = _note_path(tmp_path, "userA", note.id)
+    raw = json.loads(p.read_text(encoding="utf-8"))
+    raw.update(title="outside", version=9)
+    tmp = p.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(raw), encoding="utf-8")
+    tmp.replace(p)
+
+    assert store.get_note("userA", note.id).title == "outside"
+    assert store.cache.stats()["invalidations"] == 1
+
+    p.unlink()
+    assert store.get_note("userA", note.id) is None
+    assert store.cache.stats()["entries"] == 0
+
+
+def test_cache_is_bounded_in_bytes(tmp_path):
+    store = NotesStore(tmp_path, cache_bytes=3 * (256 + 1 + 1000))
+    ids = [store.create_note("userA", "t", "x" * 1000).id for _ in range(5)]
+    stats = store.cache.stats()
+    assert stats["entries"] == 3 and stats["evictions"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+    # least recently used went first
+    assert store.get_note("userA", ids[0]) is not None
+    assert store.cache.stats()["misses"] == 1
+
+
+def test_cache_disabled_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("NOTES_CACHE_BYTES", raising=False)
+    assert NotesStore(tmp_path).cache is None
@@ -0,0 +1,107 @@
+import os
+import uuid
+
+from app.storage.event_log import Event, EventLog
+
+H = {"X-User-Id": "userA"}
+
+
+def test_batch_create_get_update(client):
+    r = client.post("/notes:batchCreate", headers=H, json={"items": [{"title": f"t{i}", "content": "c"} for i in range(5)]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == [201] * 5
+    ids = [x["note"]["id"] for x in results]
+
+    missing = str(uuid.uuid4())
+    r = client.post("/notes:batchGet", headers=H, json={"ids": [ids[0], missing, ids[4]]})
+    got = r.json()["results"]
+    assert [x["status"] for x in got] == [200, 404, 200]
+    assert got[0]["note"]["title"] == "t0" and got[1] == {"status": 404, "error": "Note not found"}
+
+    lock0 = client.post(f"/notes/{ids[0]}/lock", headers=H).json()["lock_id"]
+    lock1 = client.post(f"/notes/{ids[1]}/lock", headers=H).json()["lock_id"]
+    items = [
+        {"id": ids[0], "title": "u0", "content": "x", "lock_id": lock0},
+        {"id": ids[1], "title": "u1", "content": "x", "lock_id": lock0},  # wrong lock
+        {"id": missing, "title": "u", "content": "x", "lock_id": lock1},
+        {"id": ids[1], "title": "u1", "content": "x", "lock_id": lock1},
+    ]
+    res = client.put("/notes:batchUpdate", headers=H, json={"items": items}).json()["results"]
+    assert [x["status"] for x in res] == [200, 409, 404, 200]
+    assert res[0]["note"]["version"] == 2
+    assert client.get(f"/notes/{ids[1]}", headers=H).json()["title"] == "u1"
+
+    # still routed to the single-note handlers
+    assert client.get(f"/notes/{ids[2]}", headers=H).status_code == 200
+
+    import app.api.notes as notes_api
+
+    events = notes_api.event_log.read_events("userA", limit=1000)
+    kinds = [e["event_type"] for e in events if e["event_type"].startswith("NOTE_")]
+    assert kinds == ["NOTE_CREATED"] * 5 + ["NOTE_UPDATED"] * 2
+
+
+def test_batch_limits_and_auth(client, monkeypatch):
+    import app.api.notes as notes_api
+
+    monkeypatch.setattr(notes_api, "BATCH_MAX", 3)
+    r = client.post("/notes:batchCreate", headers=H, json={"items": [{"title": "t"}] * 4})
+    assert r.status_code == 400
+    assert client.post("/notes:batchCreate", headers=H, json={"items": []}).status_code == 422
+    assert client.post("/notes:batchGet", json={"ids": [str(uuid.uuid4())]}).status_code == 401
+
+
+def test_emit_many_is_one_fsync_with_dense_seqs(tmp_path, monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (calls.append(fd), real_fsync(fd)))
+
+    log = EventLog(tmp_path, mode="strict")
+    log.emit(Event(event_type="NOTE_CREATED", user_id="userG", note_id="a"))
+    calls.clear()
+    commits = log.emit_many([Event(event_type="NOTE_CREATED", user_id="userG", note_id=str(i)) for i in range(10)])
+    assert [c.seq for c in commits] == list(range(2, 12))
+    assert len(calls) == 1
+    assert log.emit_many([]) == []
+
+
+def test_batch_reports_items_whose_events_fail(client, monkeypatch, caplog):
+    import app.api.notes as notes_api
+
+    real_emit_many = notes_api.event_log.emit_many
+    fail = {"times": 0}
+
+    def flaky_emit_many(events, *args, **kwargs):
+        if fail["times"]:
+            fail["times"] -= 1
+            raise OSError("disk full")
+        return real_emit_many(events, *args, **kwargs)
+
+    monkeypatch.setattr(notes_api.event_log, "emit_many", flaky_emit_many)
+
+    # one failure: retried
+    fail["times"] = 1
+    r = client.post("/notes:batchCreate", headers=H, json={"items": [{"title": "a", "content": "x"}]})
+    assert [x["status"] for x in r.json()["results"]] == [201]
+
+    # failing for good: the items report 500 (as POST /notes would), the failure is logged
+    fail["times"] = 2
+    r = client.post("/notes:batchCreate", headers=H, json={"items": [{"title": "b", "content": "x"}] * 2})
+    assert r.status_code == 200
+    assert r.json()["results"] == [{"status": 500, "error": "Event append failed"}] * 2
+    assert "not appended" in caplog.text
+
+    kinds = [e["event_type"] for e in notes_api.event_log.read_events("userA", limit=1000)]
+    assert kinds.count("NOTE_CREATED") == 1
+
+    # items that failed for another reason keep their own status
+    note_id = client.get("/notes", headers=H).json()[0]["id"]
+    lock = client.post(f"/notes/{note_id}/lock", headers=H).json()["lock_id"]
+    items = [
+        {"id": str(uuid.uuid4()), "title": "u", "content": "x", "lock_id": lock},
+        {"id": note_id, "title": "u", "content": "x", "lock_id": lock},
+    ]
+    fail["times"] = 2
+    res = client.put("/notes:batchUpdate", headers=H, json={"items": items}).json()["results"]
+    assert [x["status"] for x in res] == [404, 500]
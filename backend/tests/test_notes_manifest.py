@@ -0,0 +1,53 @@
+import json
+import os
+from pathlib import Path
+
+import app.storage.notes_manifest as nm
+from app.storage.notes_store import NotesStore, _note_path
+
+
+def test_list_is_served_from_manifest_without_bodies(client, monkeypatch):
+    headers = {"X-User-Id": "userA"}
+    ids = [client.post("/notes", headers=headers, json={"title": f"t{i}", "content": "x" * 1000}).json()["id"] for i in range(3)]
+
+    opened = []
+    real_read_text = Path.read_text
+    monkeypatch.setattr(Path, "read_text", lambda self, *a, **k: (opened.append(self), real_read_text(self, *a, **k))[1])
+
+    r = client.get("/notes", headers=headers)
+    assert r.status_code == 200
+    listed = r.json()
+    assert sorted(n["id"] for n in listed) == sorted(ids)
+    assert all("content" not in n for n in listed)
+    assert not [p for p in opened if p.suffix == ".json" and p.parent.name == "notes"]
+
+
+def test_manifest_tracks_updates_and_replicated_notes(tmp_path):
+    store = NotesStore(tmp_path)
+    note = store.create_note("userA", "t", "c")
+    store.update_note("userA", note.id, "t2", "c2")
+    raw = dict(note.to_dict(), id="11111111-1111-1111-1111-111111111111", title="r", version=5)
+    store.apply_note_raw(raw)
+
+    got = {str(s.id): (s.title, s.version) for s in store.list_summaries("userA")}
+    assert got == {str(note.id): ("t2", 2), raw["id"]: ("r", 5)}
+
+
+def test_manifest_heals_from_note_files(tmp_path):
+    store = NotesStore(tmp_path)
+    note = store.create_note("userA", "t", "c")
+
+    # edit a note behind the manifest's back, and add one it never saw
+    p = _note_path(tmp_path, "userA", note.id)
+    raw = json.loads(p.read_text(encoding="utf-8"))
+    raw.update(title="edited", version=7)
+    p.write_text(json.dumps(raw), encoding="utf-8")
+    os.utime(p, ns=(1, 1))
+    other = dict(raw, id="22222222-2222-2222-2222-222222222222", title="other")
+    (p.parent / f"{other['id']}.json").write_text(json.dumps(other), encoding="utf-8")
+
+    # simulate a restart
+    nm._manifests.clear()
+
+    got = {str(s.id): (s.title, s.version) for s in NotesStore(tmp_path).list_summaries("userA")}
+    assert got == {str(note.id): ("edited", 7), other["id"]: ("other", 7)}
@@ -0,0 +1,55 @@
+import time
+
+
+def _create(client, n, user="userA"):
+    ids = []
+    for i in range(n):
+        r = client.post("/notes", headers={"X-User-Id": user}, json={"title": f"t{i}", "content": "c"})
+        ids.append(r.json()["id"])
+        time.sleep(0.002)  # distinct timestamps
+    return ids
+
+
+def _walk(client, query, user="userA"):
+    seen, cursor = [], None
+    while True:
+        url = f"/notes?{query}" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url, headers={"X-User-Id": user})
+        assert r.status_code == 200
+        seen.extend(n["id"] for n in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_cursor_pages_cover_all_notes_in_order(client):
+    ids = _create(client, 7)
+    assert _walk(client, "limit=3&sort=created_at&order=asc") == ids
+    assert _walk(client, "limit=2&sort=created_at&order=desc") == ids[::-1]
+
+
+def test_updated_since_returns_only_changed_notes(client):
+    headers = {"X-User-Id": "userA"}
+    ids = _create(client, 4)
+    r = client.get("/notes?sort=updated_at&order=desc&limit=1", headers=headers)
+    since = r.json()[0]["updated_at"]
+
+    r = client.post(f"/notes/{ids[0]}/lock", headers=headers)
+    client.put(f"/notes/{ids[0]}", headers=headers, json={"title": "x", "content": "y", "lock_id": r.json()["lock_id"]})
+
+    changed = _walk(client, f"limit=10&sort=updated_at&order=asc&updated_since={since.replace('+', '%2B')}")
+    assert changed == [ids[3], ids[0]]
+
+    changed = _walk(client, f"limit=1&sort=created_at&order=asc&updated_since={since.replace('+', '%2B')}")
+    assert changed == [ids[0], ids[3]]
+
+
+def test_cursor_from_other_query_is_rejected(client):
+    _create(client, 3)
+    r = client.get("/notes?limit=1&sort=created_at", headers={"X-User-Id": "userA"})
+    cursor = r.headers["X-Next-Cursor"]
+
+    r = client.get(f"/notes?limit=1&sort=updated_at&cursor={cursor}", headers={"X-User-Id": "userA"})
+    assert r.status_code == 400
+    r = client.get("/notes?cursor=garbage", headers={"X-User-Id": "userA"})
+    assert r.status_code == 400
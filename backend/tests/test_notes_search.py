@@ -0,0 +1,175 @@
+import json
+import threading
+import uuid
+
+from app.storage import search_index
+from app.storage.notes_store import NotesStore
+from app.storage.sqlite_engine import SqliteEngine
+
+
+H = {"X-User-Id": "userA"}
+
+
+def _create(client, title, content):
+    return client.post("/notes", headers=H, json={"title": title, "content": content}).json()
+
+
+def _search(client, q, **params):
+    return client.get("/notes/search", headers=H, params={"q": q, **params})
+
+
+def test_search_ranks_title_hits_and_matches_phrases(client):
+    body = _create(client, "groceries", "buy apple pie ingredients")
+    title = _create(client, "apple pie", "grandma's recipe")
+    _create(client, "unrelated", "nothing to see")
+    reversed_ = _create(client, "pie apple", "reversed words")
+
+    hits = _search(client, "apple").json()
+    assert {h["id"] for h in hits[:2]} == {title["id"], reversed_["id"]}
+    assert hits[-1]["id"] == body["id"]
+    assert hits[0]["score"] >= hits[-1]["score"] > 0
+
+    phrase = {h["id"] for h in _search(client, '"apple pie"').json()}
+    assert phrase == {body["id"], title["id"]}
+    assert [h["id"] for h in _search(client, "apple recipe").json()] == [title["id"]]
+    assert _search(client, "missingword").json() == []
+
+    # other users' notes are not searched
+    assert client.get("/notes/search", headers={"X-User-Id": "userB"}, params={"q": "apple"}).json() == []
+
+
+def test_updates_are_indexed_incrementally(client):
+    note = _create(client, "draft", "first words")
+    assert len(_search(client, "first").json()) == 1
+
+    lock = client.post(f"/notes/{note['id']}/lock", headers=H).json()
+    r = client.put(
+        f"/notes/{note['id']}", headers=H, json={"title": "final", "content": "second words", "lock_id": lock["lock_id"]}
+    )
+    assert r.status_code == 200
+    assert _search(client, "first").json() == []
+    hit = _search(client, "second").json()[0]
+    assert (hit["id"], hit["title"], hit["version"]) == (note["id"], "final", 2)
+
+
+def test_pagination_via_next_cursor(client):
+    for i in range(5):
+        _create(client, f"note {i}", "shared " * (i + 1))
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = _search(client, "shared", **params)
+        seen += [h["id"] for h in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+    assert [h["id"] for h in _search(client, "shared", limit=5).json()] == seen
+
+    r = _search(client, "shared", limit=2)
+    assert _search(client, "other", cursor=r.headers["X-Next-Cursor"]).status_code == 400
+    assert _search(client, "shared", cursor="garbage").status_code == 400
+    assert client.get("/notes/search", headers=H).status_code == 422
+
+
+def test_index_heals_from_store_and_rebuilds(tmp_path):
+    store = NotesStore(tmp_path)
+    a = store.create_note("userA", "alpha", "one")
+    assert [h.id for h in store.search("userA", "alpha")[0]] == [str(a.id)]
+
+    # writes made while the index is not resident are picked up on the next load
+    search_index._indexes.clear()
+    b = store.create_note("userA", "beta", "two")
+    replicated = {
+        "id": str(uuid.uuid4()),
+        "owner_user_id": "userA",
+        "title": "gamma",
+        "content": "three",
+        "created_at": b.created_at,
+        "updated_at": b.updated_at,
+        "version": 1,
+    }
+    store.apply_note_raw(replicated)
+    assert [h.id for h in store.search("userA", "beta")[0]] == [str(b.id)]
+    assert [h.id for h in store.search("userA", "gamma")[0]] == [replicated["id"]]
+
+    # a lost journal is rebuilt from the notes
+    log = tmp_path / "users" / "userA" / "search_index.log"
+    log.unlink()
+    search_index._indexes.clear()
+    assert store.rebuild_search_index("userA") == 3
+    assert log.exists()
+    assert store.search("userA", "one")[0][0].id == str(a.id)
+
+
+def test_sqlite_engine_search(tmp_path):
+    store = SqliteEngine(tmp_path / "notes.db").notes()
+    a = store.create_note("userA", "meeting notes", "discuss the roadmap")
+    store.create_note("userA", "roadmap", "q3 roadmap draft")
+    hits, _ = store.search("userA", '"the roadmap"')
+    assert [h.id for h in hits] == [str(a.id)]
+    assert store.rebuild_search_index("userA") == 2
+
+
+def test_load_starts_from_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_index, "SNAPSHOT_TAIL", 4)
+    store = NotesStore(tmp_path)
+    notes = [store.create_note("userA", f"note {i}", f"body{i}") for i in range(20)]
+    store.rebuild_search_index("userA")
+    snap = tmp_path / "users" / "userA" / "search_index.snap"
+    assert snap.exists()
+    late = store.create_note("userA", "late", "tail")  # journaled after the snapshot
+
+    applied = []
+    real_apply = search_index.SearchIndex._apply
+
+    def counting_apply(self, rec):
+        applied.append(rec["id"])
+        real_apply(self, rec)
+
+    monkeypatch.setattr(search_index.SearchIndex, "_apply", counting_apply)
+    search_index._indexes.clear()
+    assert [h.id for h in store.search("userA", "body7")[0]] == [str(notes[7].id)]
+    assert [h.id for h in store.search("userA", "tail")[0]] == [str(late.id)]
+    assert applied == [str(late.id)]
+
+    # a snapshot that does not match the journal is ignored, wherever the journal differs
+    log = tmp_path / "users" / "userA" / "search_index.log"
+    data = log.read_bytes()
+    first = json.loads(data[: data.index(b"\n")])
+    word = first["tokens"].split()[-1].encode()  # the body of the journal's first record
+    log.write_bytes(data.replace(word, b"x" * len(word), 1))
+    search_index._indexes.clear()
+    applied.clear()
+    assert [h.id for h in store.search("userA", "x" * len(word))[0]] == [first["id"]]
+    assert len(applied) > 20
+
+
+def test_writes_during_a_load_do_not_wait_for_it(tmp_path):
+    store = NotesStore(tmp_path)
+    store.create_note("userA", "first", "one")
+    search_index._indexes.clear()
+    idx = search_index.index_for(tmp_path / "users" / "userA" / "search_index.log")
+
+    listing, release = threading.Event(), threading.Event()
+
+    class SlowStore:
+        def list_summaries(self, user_id):
+            listing.set()
+            release.wait(5)
+            return store.list_summaries(user_id)
+
+        def get_note(self, user_id, note_id):
+            return store.get_note(user_id, note_id)
+
+    loader = threading.Thread(target=idx.ensure_loaded, args=(SlowStore(), "userA"))
+    loader.start()
+    assert listing.wait(5)
+    written = threading.Thread(target=store.create_note, args=("userA", "second", "two"))
+    written.start()
+    written.join(5)
+    assert not written.is_alive()  # not blocked by the load
+    release.set()
+    loader.join(5)
+    assert [h.title for h in idx.search("two")[0]] == ["second"]
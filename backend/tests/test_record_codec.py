@@ -0,0 +1,136 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.storage import record_codec
+from app.storage.users_store import UsersStore
+from scripts.migrate_record_format import migrate
+
+
+def test_bin1_round_trips_and_is_compact():
+    now = datetime.now(timezone.utc).isoformat()
+    lock = {
+        "lock_id": str(uuid.uuid4()),
+        "note_id": str(uuid.uuid4()),
+        "owner_user_id": "userA",
+        "created_at": now,
+        "expires_at": None,
+        "revoked": False,
+        "version": 7,
+    }
+    odd = {
+        "ints": [0, -1, 127, 128, 2**40, -(2**63)],
+        "float": 1.5,
+        "zulu": "2026-01-01T00:00:00Z",  # not isoformat() output: kept as a string
+        "no_us": "2026-01-01T00:00:00+00:00",
+        "upper": str(uuid.uuid4()).upper(),
+        "text": "é" * 200,
+        "nested": {"k" * 200: [None, True, {}]},
+    }
+    for rec in (lock, odd):
+        data = record_codec.dumps(rec, "bin1")
+        assert data[:2] == record_codec.MAGIC + bytes([record_codec.VERSION])
+        assert record_codec.loads(data) == rec
+        assert record_codec.loads(record_codec.dumps(rec, "json")) == rec
+    assert len(record_codec.dumps(lock, "bin1")) < 0.65 * len(record_codec.dumps(lock, "json"))
+
+    data = record_codec.dumps(lock, "bin1")
+    for bad in (data[:-1], data + b"x", data[:1] + bytes([9]) + data[2:]):
+        with pytest.raises(ValueError):
+            record_codec.loads(bad)
+    with pytest.raises(TypeError):
+        record_codec.dumps({"n": 2**64}, "bin1")
+
+    data = record_codec.dumps({"f": 1.5}, "bin1")
+    with pytest.raises(ValueError):
+        record_codec.loads(data[:-3])  # truncated inside the double
+
+
+def test_typed_reads_give_uuid_objects(tmp_path):
+    note_id = uuid.uuid4()
+    rec = {"id": str(note_id), "ids": [str(note_id)], "created_at": datetime.now(timezone.utc).isoformat()}
+    for fmt in record_codec.FORMATS:
+        data = record_codec.dumps(rec, fmt)
+        assert record_codec.loads(data) == rec
+        typed = record_codec.loads(data, typed=True)
+        assert record_codec.as_uuid(typed["id"]) == note_id
+        assert typed["created_at"] == rec["created_at"]
+    assert record_codec.loads(record_codec.dumps(rec, "bin1"), typed=True)["ids"] == [str(note_id)]
+
+
+def test_typed_reads_keep_uuid_shaped_text_as_strings(bin1_client):
+    client = bin1_client
+    h = {"X-User-Id": "userA"}
+    title, content = str(uuid.uuid4()), str(uuid.uuid4())
+    r = client.post("/notes", headers=h, json={"title": title, "content": content})
+    assert r.status_code == 201
+    note_id = r.json()["id"]
+    r = client.get(f"/notes/{note_id}", headers=h)
+    assert r.status_code == 200
+    assert (r.json()["title"], r.json()["content"]) == (title, content)
+
+    import app.api.notes as notes_api
+
+    note = notes_api.store.get_note("userA", uuid.UUID(note_id))
+    assert isinstance(note.title, str) and isinstance(note.content, str)
+
+
+@pytest.fixture()
+def bin1_client(request, monkeypatch):
+    monkeypatch.setenv("RECORD_FORMAT", "bin1")
+    return request.getfixturevalue("client")
+
+
+def test_stores_write_and_read_bin1(bin1_client, tmp_path):
+    client = bin1_client
+    h = {"X-User-Id": "userA"}
+    note_id = client.post("/notes", headers=h, json={"title": "t", "content": "c"}).json()["id"]
+    lock_id = client.post(f"/notes/{note_id}/lock", headers=h).json()["lock_id"]
+    r = client.put(f"/notes/{note_id}", headers=h, json={"title": "t2", "content": "c2", "lock_id": lock_id})
+    assert r.status_code == 200
+    share_id = client.post(
+        f"/shares/notes/{note_id}", headers=h, json={"shared_with_user_id": "userB", "mode": "ro"}
+    ).json()["share_id"]
+    UsersStore(tmp_path).create("userC", "hash")
+
+    user = tmp_path / "users" / "userA"
+    files = [
+        user / "notes" / f"{note_id}.json",
+        user / "notes_prev" / f"{note_id}.json",
+        user / "locks" / f"{note_id}.json",
+        user / "shares" / f"{share_id}.json",
+        tmp_path / "share_index" / f"{share_id}.json",
+        tmp_path / "users" / "userC" / "user.json",
+    ]
+    assert all(p.read_bytes()[:1] == record_codec.MAGIC for p in files)
+
+    assert client.get(f"/notes/{note_id}", headers=h).json()["content"] == "c2"
+    assert client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"}).json()["title"] == "t2"
+    assert UsersStore(tmp_path).get("userC").hashed_password == "hash"
+
+
+def test_migration_switches_format_both_ways(client, tmp_path):
+    h = {"X-User-Id": "userA"}
+    note_id = client.post("/notes", headers=h, json={"title": "t", "content": "c"}).json()["id"]
+    client.post(f"/notes/{note_id}/lock", headers=h)
+    share_id = client.post(
+        f"/shares/notes/{note_id}", headers=h, json={"shared_with_user_id": "userB", "mode": "ro"}
+    ).json()["share_id"]
+    note_file = tmp_path / "users" / "userA" / "notes" / f"{note_id}.json"
+    before = note_file.read_bytes()
+    assert before[:1] == b"{"
+
+    counts = migrate(tmp_path, "bin1")
+    assert (counts["notes"], counts["locks"], counts["shares"], counts["share_index"]) == (1, 1, 1, 1)
+    assert (tmp_path / "record_format").read_text().strip() == "bin1"
+    assert record_codec.format_for(tmp_path) == "bin1"
+    assert note_file.read_bytes()[:1] == record_codec.MAGIC
+    assert migrate(tmp_path, "bin1")["notes"] == 0  # already migrated
+
+    # the running stores read either format
+    assert client.get(f"/notes/{note_id}", headers=h).json()["title"] == "t"
+    assert client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"}).status_code == 200
+
+    migrate(tmp_path, "json")
+    assert note_file.read_bytes() == before
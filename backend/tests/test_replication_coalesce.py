@@ -0,0 +1,80 @@
+import hashlib
+import hmac
+import importlib
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+def _update_many(client, note_id, n):
+    h = {"X-User-Id": "userA"}
+    lock = client.post(f"/notes/{note_id}/lock", headers=h).json()
+    for i in range(n):
+        r = client.put(f"/notes/{note_id}", headers=h, json={"title": f"v{i}", "content": "c", "lock_id": lock["lock_id"]})
+        assert r.status_code == 200
+
+
+def test_coalesce_reads_each_note_once(tmp_path, monkeypatch):
+    client = make_client(tmp_path)
+    h = {"X-User-Id": "userA"}
+    a = client.post("/notes", headers=h, json={"title": "a", "content": "c"}).json()["id"]
+    b = client.post("/notes", headers=h, json={"title": "b", "content": "c"}).json()["id"]
+    _update_many(client, a, 5)
+
+    import app.api.replication as repl
+
+    reads = []
+    real_get = repl.store.get_note
+    monkeypatch.setattr(repl.store, "get_note", lambda **kw: reads.append(kw["note_id"]) or real_get(**kw))
+
+    full = client.get("/replicate/events?user_id=userA&limit=1000").json()
+    assert len(reads) == 7
+    reads.clear()
+
+    events = client.get("/replicate/events?user_id=userA&limit=1000&coalesce=true").json()
+    assert sorted(map(str, reads)) == sorted([a, b])
+    assert [e["event_id"] for e in events] == [e["event_id"] for e in full]
+
+    with_payload = [e for e in events if "payload" in e]
+    assert {e["note_id"] for e in with_payload} == {a, b}
+    last_a = [e for e in events if e.get("note_id") == a and e["event_type"].startswith("NOTE_")][-1]
+    assert last_a["payload"]["title"] == "v4"
+    assert all(
+        e["payload_event_id"] == last_a["event_id"]
+        for e in events
+        if e.get("note_id") == a and e["event_type"].startswith("NOTE_") and e is not last_a
+    )
+
+
+def test_coalesced_batch_applies_on_receiver(tmp_path):
+    os.environ["REPL_SECRET"] = "test-repl-secret"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    client_a = make_client(tmp_path / "a")
+    note_id = client_a.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": "c"}).json()["id"]
+    _update_many(client_a, note_id, 3)
+    events = client_a.get("/replicate/events?user_id=userA&coalesce=true").json()
+
+    client_b = make_client(tmp_path / "b")
+    body = json.dumps(events).encode("utf-8")
+    token = hmac.new(b"test-repl-secret", body, hashlib.sha256).hexdigest()
+    r = client_b.post("/replicate/events", content=body, headers={"X-Replication-Token": token})
+    assert r.json() == {"applied": len(events)}
+
+    note = client_b.get(f"/notes/{note_id}", headers={"X-User-Id": "userA"}).json()
+    assert note["title"] == "v2" and note["version"] == 4
@@ -0,0 +1,70 @@
+import importlib
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+import app.storage.event_log as el
+from app.storage.event_log import EventLog, Event, _events_path, _events_index_path
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+def test_events_carry_seq_and_since_seq_resumes(tmp_path):
+    client = make_client(tmp_path)
+    for i in range(5):
+        client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": f"t{i}", "content": "c"})
+
+    events = client.get("/replicate/events?user_id=userA").json()
+    assert [e["seq"] for e in events] == [1, 2, 3, 4, 5]
+
+    r = client.get("/replicate/events?user_id=userA&since_seq=3&limit=1")
+    assert [e["seq"] for e in r.json()] == [4]
+
+    # legacy UUID cursor still accepted
+    r = client.get(f"/replicate/events?user_id=userA&since_event_id={events[1]['event_id']}")
+    assert [e["seq"] for e in r.json()] == [3, 4, 5]
+
+    r = client.get("/replicate/events?user_id=userA&since_seq=5")
+    assert r.json() == []
+
+
+def test_legacy_log_without_seq_is_indexed(tmp_path):
+    p = _events_path(tmp_path, "userL")
+    p.parent.mkdir(parents=True)
+    lines = [json.dumps({"event_id": f"e{i}", "event_type": "LOCK_RELEASED", "user_id": "userL"}) for i in range(3)]
+    p.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    log = EventLog(tmp_path)
+    assert [e["seq"] for e in log.read_events("userL", since_seq=1)] == [2, 3]
+    assert log.seq_for_event_id("userL", "e1") == 2
+
+    log.emit(Event(event_type="LOCK_RELEASED", user_id="userL"))
+    assert log.read_events("userL", since_seq=3)[0]["seq"] == 4
+
+
+def test_torn_tail_is_dropped_on_open(tmp_path):
+    log = EventLog(tmp_path)
+    log.emit(Event(event_type="LOCK_RELEASED", user_id="userT"))
+    with _events_path(tmp_path, "userT").open("ab") as f:
+        f.write(b'{"event_id": "half')
+
+    # simulate a restart: forget the in-process writer state
+    el._states.clear()
+
+    log = EventLog(tmp_path)
+    log.emit(Event(event_type="LOCK_RELEASED", user_id="userT"))
+    assert [e["seq"] for e in log.read_events("userT")] == [1, 2]
+    assert _events_index_path(tmp_path, "userT").stat().st_size == 2 * 16
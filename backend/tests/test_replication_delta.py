@@ -0,0 +1,129 @@
+import hashlib
+import hmac
+import importlib
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+from app.utils.text_delta import apply_delta, make_delta
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+def _post(client, events):
+    body = json.dumps(events).encode("utf-8")
+    token = hmac.new(os.environ["REPL_SECRET"].encode(), body, hashlib.sha256).hexdigest()
+    return client.post("/replicate/events", content=body, headers={"X-Replication-Token": token})
+
+
+def _edit(client, note_id, title, content):
+    h = {"X-User-Id": "userA"}
+    lock = client.post(f"/notes/{note_id}/lock", headers=h).json()
+    r = client.put(f"/notes/{note_id}", headers=h, json={"title": title, "content": content, "lock_id": lock["lock_id"]})
+    assert r.status_code == 200
+
+
+def test_make_and_apply_delta():
+    for old, new in [("abc", "abXc"), ("", "x"), ("aaaa", "aa"), ("same", "same"), ("ab", "ba")]:
+        assert apply_delta(old, make_delta(old, new)) == new
+    assert make_delta("x" * 1000, "x" * 500 + "Y" + "x" * 500)["t"] == "Y"
+
+
+def test_small_edit_ships_as_delta(tmp_path):
+    os.environ["REPL_SECRET"] = "test-repl-secret"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    big = "lorem ipsum " * 4000  # ~48KB
+
+    client_a = make_client(tmp_path / "a")
+    note_id = client_a.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": big}).json()["id"]
+    first = client_a.get("/replicate/events?user_id=userA").json()
+
+    client_b = make_client(tmp_path / "b")
+    assert _post(client_b, first).json() == {"applied": 1}
+
+    client_a = make_client(tmp_path / "a")
+    edited = big[:20000] + "EDIT" + big[20000:]
+    _edit(client_a, note_id, "t2", edited)
+    tail = client_a.get(f"/replicate/events?user_id=userA&since_seq={first[-1]['seq']}&delta=true").json()
+    upd = [e for e in tail if e["event_type"] == "NOTE_UPDATED"][0]
+    assert "payload" not in upd
+    assert upd["payload_delta"]["base_version"] == 1 and upd["payload_delta"]["version"] == 2
+    assert len(json.dumps(upd)) < 1000
+
+    client_b = make_client(tmp_path / "b")
+    assert _post(client_b, tail).json() == {"applied": len(tail)}
+    note = client_b.get(f"/notes/{note_id}", headers={"X-User-Id": "userA"}).json()
+    assert note["content"] == edited and note["title"] == "t2" and note["version"] == 2
+
+
+def test_several_edits_since_the_cursor_ship_full_payloads(tmp_path):
+    os.environ["REPL_SECRET"] = "test-repl-secret"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    big = "x" * 5000
+
+    client_a = make_client(tmp_path / "a")
+    note_id = client_a.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": big}).json()["id"]
+    first = client_a.get("/replicate/events?user_id=userA").json()
+    client_b = make_client(tmp_path / "b")
+    assert _post(client_b, first).json() == {"applied": 1}
+
+    client_a = make_client(tmp_path / "a")
+    for suffix in ("1", "12", "123"):
+        _edit(client_a, note_id, "t", big + suffix)
+    for coalesce in ("false", "true"):
+        tail = client_a.get(
+            f"/replicate/events?user_id=userA&since_seq={first[-1]['seq']}&delta=true&coalesce={coalesce}"
+        ).json()
+        assert not any("payload_delta" in e for e in tail)
+
+    # B is three versions behind: the coalesced tail applies without a full resend
+    client_b = make_client(tmp_path / "b")
+    assert _post(client_b, tail).json() == {"applied": len(tail)}
+    note = client_b.get(f"/notes/{note_id}", headers={"X-User-Id": "userA"}).json()
+    assert note["content"] == big + "123" and note["version"] == 4
+
+
+def test_base_mismatch_asks_for_full_payload(tmp_path):
+    os.environ["REPL_SECRET"] = "test-repl-secret"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    big = "x" * 5000
+
+    client_a = make_client(tmp_path / "a")
+    note_id = client_a.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": big}).json()["id"]
+    first = client_a.get("/replicate/events?user_id=userA").json()
+    _edit(client_a, note_id, "t", big + "1")
+    middle = client_a.get(f"/replicate/events?user_id=userA&since_seq={first[-1]['seq']}").json()
+    _edit(client_a, note_id, "t", big + "12")
+    tail = client_a.get(f"/replicate/events?user_id=userA&since_seq={middle[-1]['seq']}&delta=true").json()
+    assert all("payload_delta" in e for e in tail if e["event_type"] == "NOTE_UPDATED")
+    full = client_a.get(f"/replicate/events?user_id=userA&since_seq={middle[-1]['seq']}").json()
+
+    client_b = make_client(tmp_path / "b")
+    _post(client_b, first)
+    # B never got the middle range: it is at v1, the delta is against v2
+    r = _post(client_b, tail).json()
+    updates = [e["event_id"] for e in tail if e["event_type"] == "NOTE_UPDATED"]
+    assert r["need_full"] == updates
+    assert r["applied"] == len(tail) - len(updates)
+
+    # not marked seen, so the full resend is applied
+    r = _post(client_b, full).json()
+    assert r == {"applied": len(updates)}
+    note = client_b.get(f"/notes/{note_id}", headers={"X-User-Id": "userA"}).json()
+    assert note["content"] == big + "12" and note["version"] == 3
@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import importlib
+import json
+import os
+import zlib
+
+from fastapi.testclient import TestClient
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+def _post(client, path, body: bytes):
+    token = hmac.new(os.environ["REPL_SECRET"].encode(), body, hashlib.sha256).hexdigest()
+    return client.post(path, content=body, headers={"X-Replication-Token": token})
+
+
+def test_bootstrap_from_snapshot_then_tail(tmp_path):
+    os.environ["REPL_SECRET"] = "test-repl-secret"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    h = {"X-User-Id": "userA"}
+
+    client_a = make_client(tmp_path / "a")
+    ids = [client_a.post("/notes", headers=h, json={"title": f"t{i}", "content": "c"}).json()["id"] for i in range(3)]
+    lock = client_a.post(f"/notes/{ids[0]}/lock", headers=h).json()
+    for i in range(20):
+        client_a.put(f"/notes/{ids[0]}", headers=h, json={"title": f"v{i}", "content": "c", "lock_id": lock["lock_id"]})
+
+    r = client_a.get("/replicate/snapshot?user_id=userA")
+    assert r.status_code == 200
+    lines = [json.loads(x) for x in r.text.splitlines()]
+    head, notes, end = lines[0], lines[1:-1], lines[-1]
+    cursor = client_a.get("/replicate/events?user_id=userA&limit=1000").json()[-1]["seq"]
+    assert head == {"type": "snapshot", "user_id": "userA", "cursor": cursor, "notes": 3}
+    assert r.headers["X-Snapshot-Cursor"] == str(cursor)
+    assert sorted(n["payload"]["id"] for n in notes) == sorted(ids)
+    assert end == {"type": "end", "notes": 3}
+
+    # change on A after the snapshot: must come through the event tail
+    client_a.put(f"/notes/{ids[1]}", headers=h, json={"title": "late", "content": "c", "lock_id": client_a.post(f"/notes/{ids[1]}/lock", headers=h).json()["lock_id"]})
+    tail = client_a.get(f"/replicate/events?user_id=userA&since_seq={cursor}").json()
+
+    client_b = make_client(tmp_path / "b")
+    r = _post(client_b, "/replicate/snapshot", r.content)
+    assert r.json() == {"user_id": "userA", "applied": 3, "cursor": cursor}
+    assert _post(client_b, "/replicate/events", json.dumps(tail).encode()).status_code == 200
+
+    got = {n["id"]: n for n in (client_b.get(f"/notes/{i}", headers=h).json() for i in ids)}
+    assert got[ids[0]]["title"] == "v19" and got[ids[0]]["version"] == 21
+    assert got[ids[1]]["title"] == "late"
+
+
+def test_snapshot_gzip_and_truncation(tmp_path):
+    os.environ["REPL_SECRET"] = "test-repl-secret"
+    client = make_client(tmp_path)
+    client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": "c"})
+
+    with client.stream("GET", "/replicate/snapshot?user_id=userA", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        raw = b"".join(r.iter_raw())
+    body = zlib.decompress(raw, 31)
+    assert json.loads(body.splitlines()[-1]) == {"type": "end", "notes": 1}
+
+    truncated = b"\n".join(body.splitlines()[:-1]) + b"\n"
+    assert _post(client, "/replicate/snapshot", truncated).status_code == 400
+    assert client.get("/replicate/snapshot?user_id=../x").status_code == 400
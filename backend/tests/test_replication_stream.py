@@ -0,0 +1,82 @@
+import importlib
+import json
+import os
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils import compression
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+def _seed(client, n):
+    for i in range(n):
+        client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": f"t{i}", "content": "x" * 1000})
+
+
+def test_ndjson_stream_matches_json_array(tmp_path, monkeypatch):
+    client = make_client(tmp_path)
+    import app.api.replication as repl
+
+    monkeypatch.setattr(repl, "STREAM_CHUNK", 3)  # force several chunks
+    _seed(client, 10)
+
+    expected = client.get("/replicate/events?user_id=userA&since_seq=2&limit=7").json()
+    r = client.get(
+        "/replicate/events?user_id=userA&since_seq=2&limit=7",
+        headers={"Accept": "application/x-ndjson", "Accept-Encoding": "identity"},
+    )
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in r.headers
+    got = [json.loads(line) for line in r.text.splitlines()]
+    assert got == expected
+    assert [e["seq"] for e in got] == [3, 4, 5, 6, 7, 8, 9]
+    assert all(e["payload"]["content"] == "x" * 1000 for e in got)
+
+
+def test_ndjson_stream_gzip(tmp_path):
+    client = make_client(tmp_path)
+    _seed(client, 5)
+
+    with client.stream(
+        "GET",
+        "/replicate/events?user_id=userA&limit=1000",
+        headers={"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"},
+    ) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        raw = b"".join(r.iter_raw())
+    lines = zlib.decompress(raw, 31).decode("utf-8").splitlines()
+    assert [json.loads(line)["seq"] for line in lines] == [1, 2, 3, 4, 5]
+    assert len(raw) < sum(len(line) for line in lines)
+
+
+def test_pick_encoding():
+    assert compression.pick_encoding("gzip, deflate") == "gzip"
+    assert compression.pick_encoding("gzip;q=0, br") is None
+    assert compression.pick_encoding(None) is None
+    if compression._zstd is None:
+        assert compression.pick_encoding("zstd, gzip") == "gzip"
+    else:
+        assert compression.pick_encoding("gzip, zstd") == "zstd"
+
+
+@pytest.mark.skipif(compression._zstd is None, reason="zstandard not installed")
+def test_zstd_stream_compressor_round_trip():
+    c = compression.StreamCompressor("zstd")
+    data = c.compress(b'{"a": 1}\n') + c.compress(b'{"a": 2}\n') + c.finish()
+    out = compression._zstd.ZstdDecompressor().decompressobj().decompress(data)
+    assert out == b'{"a": 1}\n{"a": 2}\n'
@@ -0,0 +1,221 @@
+import asyncio
+import importlib
+import json
+import os
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.utils.replicator import LocalSink, Peer, Replicator, parse_peers
+
+
+def make_client(tmp_path):
+    os.environ["APP_DATA_DIR"] = str(tmp_path)
+
+    import app.api.notes
+    import app.api.replication
+    import app.main
+
+    importlib.reload(app.api.notes)
+    importlib.reload(app.api.replication)
+    importlib.reload(app.main)
+
+    return TestClient(app.main.app)
+
+
+class RecordingSink:
+    """Stands in for the local node: the peer app and LocalSink would share one process' stores."""
+
+    def __init__(self, refuse_deltas=False):
+        self.events = {}
+        self.snapshots = []
+        self.refuse_deltas = refuse_deltas
+        self.refused = []
+
+    async def apply_events(self, events):
+        need_full = []
+        for e in events:
+            if self.refuse_deltas and "payload_delta" in e:
+                need_full.append(e["event_id"])
+                self.refused.append(e["event_id"])
+                continue
+            self.events.setdefault(e["user_id"], {})[e["event_id"]] = e
+        return len(events) - len(need_full), need_full
+
+    async def apply_snapshot(self, lines):
+        self.snapshots.append(lines)
+        return {"user_id": lines[0]["user_id"], "applied": len(lines) - 2, "cursor": lines[0]["cursor"]}
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, app, fail_first=0):
+        self.inner = httpx.ASGITransport(app=app)
+        self.requests = []
+        self.fail_first = fail_first
+
+    async def handle_async_request(self, request):
+        self.requests.append(request.url)
+        if self.fail_first:
+            self.fail_first -= 1
+            return httpx.Response(503)
+        return await self.inner.handle_async_request(request)
+
+
+def _seed(client, users, n):
+    for u in users:
+        for i in range(n):
+            client.post("/notes", headers={"X-User-Id": u}, json={"title": f"{u}-{i}", "content": "c"})
+
+
+def test_parse_peers():
+    assert parse_peers("b=http://h:8001/, c = http://h:8002") == [Peer("b", "http://h:8001"), Peer("c", "http://h:8002")]
+    for bad in ("http://h:8001", "../x=http://h"):
+        try:
+            parse_peers(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def _ack(client, user_id, peer, seq):
+    import hashlib
+    import hmac
+
+    body = json.dumps({"user_id": user_id, "peer": peer, "seq": seq}).encode()
+    token = hmac.new(os.environ["REPL_SECRET"].encode(), body, hashlib.sha256).hexdigest()
+    return client.post("/replicate/ack", content=body, headers={"X-Replication-Token": token})
+
+
+def test_pulls_users_concurrently_and_resumes_from_cursor(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPL_SECRET", "test-repl-secret")
+    client = make_client(tmp_path / "a")
+    users = ["userA", "userB", "userC"]
+    _seed(client, users, 7)
+    import app.main
+
+    sink = RecordingSink()
+    transport = CountingTransport(app.main.app)
+    peer = Peer("node-a", "http://node-a")
+    rep = Replicator(tmp_path / "b", [peer], users, node_id="node-b", batch=3, sink=sink, transport=transport)
+
+    async def first():
+        await rep.sync_all()
+        await rep.aclose()
+
+    asyncio.run(first())
+    for u in users:
+        assert sorted(e["seq"] for e in sink.events[u].values()) == list(range(1, 8))
+        assert all(e["payload"]["owner_user_id"] == u for e in sink.events[u].values())
+    assert json.loads((tmp_path / "b" / "replicator" / "node-a.json").read_text()) == {u: 7 for u in users}
+    pulls = [url for url in transport.requests if url.path == "/replicate/events"]
+    assert all("delta=true" in str(url) for url in pulls)
+    # batches are acknowledged with a signed POST, not on the GET
+    for u in users:
+        peers = json.loads((tmp_path / "a" / "users" / u / "events" / "peers.json").read_text())
+        assert peers == {"node-b": 7}
+    assert rep.stats()["events"] == 21
+
+    # a fresh replicator picks up the persisted cursors and pulls only the new event
+    _seed(client, ["userB"], 1)
+    transport.requests.clear()
+    rep = Replicator(tmp_path / "b", [peer], users, batch=3, sink=sink, transport=transport)
+
+    async def second():
+        await rep.sync_all()
+        await rep.aclose()
+
+    asyncio.run(second())
+    assert len(transport.requests) == 3
+    assert rep.stats()["events"] == 1
+    assert max(e["seq"] for e in sink.events["userB"].values()) == 8
+
+
+def test_need_full_refetches_with_payloads(tmp_path):
+    client = make_client(tmp_path / "a")
+    h = {"X-User-Id": "userA"}
+    note_id = client.post("/notes", headers=h, json={"title": "t", "content": "x" * 5000}).json()["id"]
+    import app.main
+
+    sink = RecordingSink(refuse_deltas=True)
+    transport = CountingTransport(app.main.app)
+    rep = Replicator(tmp_path / "b", [Peer("a", "http://a")], ["userA"], sink=sink, transport=transport)
+    asyncio.run(rep.sync_all())
+
+    lock = client.post(f"/notes/{note_id}/lock", headers=h).json()
+    client.put(f"/notes/{note_id}", headers=h, json={"title": "t", "content": "x" * 5000 + "!", "lock_id": lock["lock_id"]})
+    transport.requests.clear()
+    rep = Replicator(tmp_path / "b", [Peer("a", "http://a")], ["userA"], sink=sink, transport=transport)
+    asyncio.run(rep.sync_all())
+
+    assert len(sink.refused) == 1
+    assert sink.events["userA"][sink.refused[0]]["payload"]["content"].endswith("!")
+    # only the refused note is fetched again, not the whole range
+    assert [url.path for url in transport.requests] == ["/replicate/events", "/replicate/notes"]
+    assert transport.requests[-1].params.get_list("id") == [note_id]
+    assert rep.stats()["refetched"] == 1
+
+
+def test_expired_cursor_bootstraps_from_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPL_SECRET", "test-repl-secret")
+    monkeypatch.setenv("EVENT_LOG_SEGMENT_BYTES", "1024")
+    monkeypatch.setenv("EVENT_LOG_RETENTION_SECONDS", "0.001")
+    client = make_client(tmp_path / "a")
+    _seed(client, ["userA"], 30)
+    import time
+
+    time.sleep(0.01)
+    assert _ack(client, "userA", "other", 30).status_code == 200  # lets retention drop segments
+    import app.main
+
+    sink = RecordingSink()
+    rep = Replicator(tmp_path / "b", [Peer("a", "http://a")], ["userA"], sink=sink, transport=httpx.ASGITransport(app=app.main.app))
+    asyncio.run(rep.sync_all())
+
+    assert len(sink.snapshots) == 1 and sink.snapshots[0][-1] == {"type": "end", "notes": 30}
+    assert json.loads((tmp_path / "b" / "replicator" / "a.json").read_text()) == {"userA": 30}
+
+    monkeypatch.delenv("EVENT_LOG_SEGMENT_BYTES")
+    monkeypatch.delenv("EVENT_LOG_RETENTION_SECONDS")
+    make_client(tmp_path / "a")
+
+
+def test_background_worker_backs_off_and_recovers(tmp_path):
+    client = make_client(tmp_path / "a")
+    _seed(client, ["userA"], 2)
+    import app.main
+
+    sink = RecordingSink()
+    transport = CountingTransport(app.main.app, fail_first=3)
+    rep = Replicator(
+        tmp_path / "b", [Peer("a", "http://a")], ["userA"], sink=sink, transport=transport,
+        poll_seconds=0.01, backoff_max=0.02,
+    )
+
+    async def run():
+        rep.start()
+        for _ in range(200):
+            if len(sink.events.get("userA", {})) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await rep.stop()
+
+    asyncio.run(run())
+    assert len(sink.events["userA"]) == 2
+    assert rep.stats()["errors"] == 3
+
+
+def test_local_sink_applies_pulled_batches(tmp_path):
+    client_a = make_client(tmp_path / "a")
+    _seed(client_a, ["userA"], 3)
+    import app.main
+
+    sink = RecordingSink()
+    rep = Replicator(tmp_path / "r", [Peer("a", "http://a")], ["userA"], sink=sink, transport=httpx.ASGITransport(app=app.main.app))
+    asyncio.run(rep.sync_all())
+    events = sorted(sink.events["userA"].values(), key=lambda e: e["seq"])
+
+    client_b = make_client(tmp_path / "b")
+    applied, need_full = asyncio.run(LocalSink().apply_events(events))
+    assert (applied, need_full) == (3, [])
+    titles = sorted(n["title"] for n in client_b.get("/notes", headers={"X-User-Id": "userA"}).json())
+    assert titles == ["userA-0", "userA-1", "userA-2"]
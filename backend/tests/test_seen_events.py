@@ -0,0 +1,64 @@
+import json
+import os
+
+from app.storage.seen_events import SeenEventsStore
+
+
+def test_seen_events_survive_compaction_and_reload(tmp_path):
+    store = SeenEventsStore(tmp_path, compact_every=5)
+    seen = store.for_user("userA")
+    ids = [f"e{i}" for i in range(12)]
+    seen.add_many(ids[:7])  # crosses compact_every -> folded into seen_events.bin
+    seen.add_many(ids[7:9])
+
+    rep_dir = tmp_path / "replication" / "userA"
+    assert (rep_dir / "seen_events.bin").stat().st_size == 7 * 16
+    assert (rep_dir / "seen_events.txt").read_text(encoding="utf-8").split() == ["e7", "e8"]
+
+    reloaded = SeenEventsStore(tmp_path, compact_every=5).for_user("userA")
+    assert all(reloaded.contains(x) for x in ids[:9])
+    assert not any(reloaded.contains(x) for x in ids[9:])
+    assert len(reloaded) == 9
+
+
+def test_legacy_seen_file_is_honored_without_bloom(tmp_path):
+    rep_dir = tmp_path / "replication" / "userA"
+    rep_dir.mkdir(parents=True)
+    (rep_dir / "seen_events.txt").write_text("a\nb\n", encoding="utf-8")
+
+    seen = SeenEventsStore(tmp_path, bloom=False).for_user("userA")
+    assert seen.contains("a") and seen.contains("b")
+    assert not seen.contains("c")
+
+
+def test_post_events_skips_duplicates_within_and_across_batches(client):
+    from app.utils.replication_auth import compute_replication_token
+
+    r = client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": "c"})
+    note = r.json()
+    ev = {"event_id": "ev-1", "event_type": "NOTE_CREATED", "user_id": "userA", "payload": note}
+
+    def post(events):
+        body = json.dumps(events).encode("utf-8")
+        return client.post(
+            "/replicate/events",
+            content=body,
+            headers={"Content-Type": "application/json", "X-Replication-Token": compute_replication_token(body)},
+        ).json()
+
+    assert post([ev, ev]) == {"applied": 1}
+    assert post([ev]) == {"applied": 0}
+
+
+def test_eviction_skips_pinned_sets_and_closed_sets_reload(tmp_path):
+    store = SeenEventsStore(tmp_path, max_resident_users=1)
+    with store.pinned("userA") as seen:
+        seen.add_many(["a1"])
+        store.for_user("userB")  # over the cap, but userA is in use
+        assert store.for_user("userA") is seen
+        assert seen.contains("a1")
+    store.for_user("userB")  # userA is no longer pinned: evicted and closed
+    assert seen.closed
+    assert seen.contains("a1")  # a holder of the evicted set still reads from disk
+    seen.add_many(["a2"])
+    assert store.for_user("userA").contains("a2")
@@ -0,0 +1,55 @@
+import json
+import os
+import uuid
+from pathlib import Path
+
+from app.storage.shares_store import SharesStore
+
+
+def _create_share(client, owner="userA", target="userB", mode="ro"):
+    r = client.post("/notes", headers={"X-User-Id": owner}, json={"title": "t", "content": "c"})
+    note_id = r.json()["id"]
+    r = client.post(
+        f"/shares/notes/{note_id}",
+        headers={"X-User-Id": owner},
+        json={"shared_with_user_id": target, "mode": mode},
+    )
+    assert r.status_code == 201
+    return r.json()["share_id"]
+
+
+def test_index_entry_written_and_removed_on_revoke(client):
+    share_id = _create_share(client)
+    data_dir = Path(os.environ["APP_DATA_DIR"])
+    entry = data_dir / "share_index" / f"{share_id}.json"
+    assert json.loads(entry.read_text(encoding="utf-8"))["owner_user_id"] == "userA"
+
+    r = client.post(f"/shares/{share_id}/revoke", headers={"X-User-Id": "userA"})
+    assert r.status_code == 200
+    assert not entry.exists()
+
+    r = client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"})
+    assert r.status_code == 404
+
+
+def test_missing_index_is_rebuilt_from_share_files(client):
+    share_id = _create_share(client)
+    data_dir = Path(os.environ["APP_DATA_DIR"])
+
+    # simulate a data dir that predates the index
+    for p in (data_dir / "share_index").iterdir():
+        p.unlink()
+
+    r = client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"})
+    assert r.status_code == 200
+    assert (data_dir / "share_index" / f"{share_id}.json").exists()
+
+
+def test_rebuild_index_skips_revoked(client):
+    live = _create_share(client)
+    revoked = _create_share(client)
+    client.post(f"/shares/{revoked}/revoke", headers={"X-User-Id": "userA"})
+
+    store = SharesStore(Path(os.environ["APP_DATA_DIR"]))
+    assert store.rebuild_index() == 1
+    assert store._index_get(uuid.UUID(live)) is not None
@@ -0,0 +1,137 @@
+import hashlib
+import hmac
+import importlib
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.storage.event_log import Event, EventLog
+from app.storage.locks_store import LocksStore
+from app.storage.notes_store import NotesStore
+from app.storage.shares_store import SharesStore
+from app.storage.sqlite_engine import SqliteEngine, SqliteLocksStore
+from scripts.migrate_to_sqlite import migrate
+
+
+@pytest.fixture()
+def sqlite_client(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("STORAGE_ENGINE", "sqlite")
+    monkeypatch.setenv("REPL_SECRET", "test-repl-secret")
+
+    import app.api.notes
+    import app.api.replication
+    import app.api.shares
+    import app.main
+
+    for m in (app.api.notes, app.api.shares, app.api.replication):
+        importlib.reload(m)
+    importlib.reload(app.main)
+    yield TestClient(app.main.app)
+
+    # later tests expect the default engine
+    monkeypatch.delenv("STORAGE_ENGINE")
+    for m in (app.api.notes, app.api.shares, app.api.replication):
+        importlib.reload(m)
+    importlib.reload(app.main)
+
+
+def test_notes_locks_and_events_over_sqlite(sqlite_client, tmp_path):
+    h = {"X-User-Id": "userA"}
+    ids = [sqlite_client.post("/notes", headers=h, json={"title": f"t{i}", "content": "c"}).json()["id"] for i in range(3)]
+    assert (tmp_path / "notes.db").exists()
+    assert not (tmp_path / "users").exists()
+
+    lock = sqlite_client.post(f"/notes/{ids[0]}/lock", headers=h).json()
+    r = sqlite_client.put(f"/notes/{ids[0]}", headers=h, json={"title": "new", "content": "c2", "lock_id": lock["lock_id"]})
+    assert r.status_code == 200 and r.json()["version"] == 2
+
+    r = sqlite_client.get("/notes?limit=2&sort=updated_at&order=desc", headers=h)
+    assert [n["id"] for n in r.json()][0] == ids[0]
+    r2 = sqlite_client.get(f"/notes?limit=2&cursor={r.headers['X-Next-Cursor']}", headers=h)
+    assert len(r.json()) + len(r2.json()) == 3 and "X-Next-Cursor" not in r2.headers
+
+    events = sqlite_client.get("/replicate/events?user_id=userA").json()
+    assert [e["seq"] for e in events] == list(range(1, len(events) + 1))
+    assert events[-1]["event_type"] == "NOTE_UPDATED" and events[-1]["payload"]["title"] == "new"
+    assert sqlite_client.get("/metrics").json()["storage_engine"] == "sqlite"
+
+
+def test_shares_over_sqlite(sqlite_client):
+    note_id = sqlite_client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": "c"}).json()["id"]
+    r = sqlite_client.post(
+        f"/shares/notes/{note_id}",
+        headers={"X-User-Id": "userA"},
+        json={"shared_with_user_id": "userB", "mode": "ro"},
+    )
+    share_id = r.json()["share_id"]
+    assert sqlite_client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"}).json()["title"] == "t"
+    assert sqlite_client.get(f"/shares/{share_id}", headers={"X-User-Id": "userC"}).status_code == 404
+
+    sqlite_client.post(f"/shares/{share_id}/revoke", headers={"X-User-Id": "userA"})
+    assert sqlite_client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"}).status_code == 404
+
+
+def test_replication_apply_over_sqlite(sqlite_client):
+    payload = {
+        "id": "11111111-1111-1111-1111-111111111111",
+        "owner_user_id": "userR",
+        "title": "remote",
+        "content": "c",
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": "2024-01-01T00:00:00+00:00",
+        "version": 3,
+    }
+    body = json.dumps([{"event_id": "e1", "event_type": "NOTE_CREATED", "user_id": "userR", "payload": payload}]).encode()
+    token = hmac.new(b"test-repl-secret", body, hashlib.sha256).hexdigest()
+    r = sqlite_client.post("/replicate/events", content=body, headers={"X-Replication-Token": token})
+    assert r.json() == {"applied": 1}
+    r = sqlite_client.get(f"/notes/{payload['id']}", headers={"X-User-Id": "userR"})
+    assert r.json()["version"] == 3
+
+
+def test_sqlite_lock_sweeper_emits_expiry(tmp_path):
+    engine = SqliteEngine(tmp_path / "sweep.db")
+    note = engine.notes().create_note("userA", "t", "c")
+    log = engine.event_log()
+    locks = SqliteLocksStore(engine, default_ttl_seconds=1, event_log=log)
+    lock = locks.acquire_lock("userA", note.id)
+
+    deadline = time.monotonic() + 3
+    while time.monotonic() < deadline and log.last_seq("userA") == 0:
+        time.sleep(0.02)
+    (e,) = log.read_events("userA")
+    assert e["event_type"] == "LOCK_EXPIRED" and e["lock_id"] == str(lock.lock_id)
+    assert locks.require_valid_lock("userA", note.id, lock.lock_id) is False
+
+
+def test_migrate_file_data_dir(tmp_path):
+    note = NotesStore(tmp_path).create_note("userA", "t", "c")
+    share = SharesStore(tmp_path).create_share("userA", note.id, "userB", "rw")
+    lock = LocksStore(tmp_path, sweeper=False).acquire_lock("userA", note.id)
+    log = EventLog(tmp_path)
+    for _ in range(3):
+        log.emit(Event(event_type="NOTE_UPDATED", user_id="userA", note_id=str(note.id)))
+
+    counts = migrate(tmp_path)
+    assert counts == {"users": 1, "notes": 1, "shares": 1, "locks": 1, "events": 3}
+    assert migrate(tmp_path) == counts  # idempotent
+
+    engine = SqliteEngine.for_data_dir(tmp_path)
+    assert engine.notes().get_note("userA", note.id) == note
+    assert engine.shares().find_share_for_user(share.share_id, "userB") == share
+    assert engine.locks().require_valid_lock("userA", note.id, lock.lock_id) is True
+    assert [e["seq"] for e in engine.event_log().read_events("userA", since_seq=1)] == [2, 3]
+    assert engine.event_log().emit(Event(event_type="X", user_id="userA")).seq == 4
+
+
+def test_migrate_events_from_sealed_segments(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=1)
+    for _ in range(3):
+        log.emit(Event(event_type="NOTE_UPDATED", user_id="userA", note_id="n"))
+    assert list((tmp_path / "users" / "userA" / "events" / "segments").glob("*.log"))
+
+    assert migrate(tmp_path)["events"] == 3
+    assert [e["seq"] for e in SqliteEngine.for_data_dir(tmp_path).event_log().read_events("userA")] == [1, 2, 3]
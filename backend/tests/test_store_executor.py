@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+from app.storage.aio import AsyncStore, IOExecutor
+
+
+class _Probe:
+    def where(self, x):
+        return threading.current_thread().name, x
+
+
+def test_async_store_runs_methods_on_executor():
+    ex = IOExecutor(max_workers=2)
+    probe = AsyncStore(_Probe(), executor=ex)
+
+    async def main():
+        return await asyncio.gather(*(probe.where(i) for i in range(5)))
+
+    results = asyncio.run(main())
+    assert [x for _, x in results] == list(range(5))
+    assert all(name.startswith("store-io") for name, _ in results)
+
+    stats = ex.stats()
+    assert stats["completed"] == 5 and stats["queue_depth"] == 0 and stats["active"] == 0
+    assert stats["peak_queue_depth"] >= 1
+
+
+def test_metrics_expose_executor_queue(client):
+    before = client.get("/metrics").json()["store_io"]["completed"]
+    r = client.post("/notes", headers={"X-User-Id": "userA"}, json={"title": "t", "content": "c"})
+    assert r.status_code == 201
+    client.get(f"/notes/{r.json()['id']}", headers={"X-User-Id": "userA"})
+
+    io = client.get("/metrics").json()["store_io"]
+    assert io["completed"] >= before + 3  # create + emit + get
+    assert {"queue_depth", "peak_queue_depth", "active", "avg_wait_ms", "max_workers"} <= set(io)
@@ -0,0 +1,106 @@
+import os
+import uuid
+
+import pytest
+
+from app.storage import user_layout
+from app.storage.locks_store import _LockTable
+from app.storage.notes_store import NotesStore
+from app.storage.shares_store import SharesStore
+from app.storage.users_store import UsersStore
+from scripts.shard_users import migrate
+
+
+def _shard_dir(base_dir, user_id):
+    a, b = user_layout.shard_of(user_id)
+    return base_dir / "users" / a / b / user_id
+
+
+@pytest.fixture()
+def sharded_client(request, monkeypatch):
+    monkeypatch.setenv("USERS_LAYOUT", "sharded")
+    return request.getfixturevalue("client")
+
+
+def test_api_on_sharded_layout(sharded_client, tmp_path):
+    client = sharded_client
+    h = {"X-User-Id": "userA"}
+    note_id = client.post("/notes", headers=h, json={"title": "t", "content": "c"}).json()["id"]
+    lock_id = client.post(f"/notes/{note_id}/lock", headers=h).json()["lock_id"]
+    r = client.put(f"/notes/{note_id}", headers=h, json={"title": "t2", "content": "c2", "lock_id": lock_id})
+    assert r.status_code == 200
+    share_id = client.post(
+        f"/shares/notes/{note_id}", headers=h, json={"shared_with_user_id": "userB", "mode": "ro"}
+    ).json()["share_id"]
+    assert client.get(f"/shares/{share_id}", headers={"X-User-Id": "userB"}).json()["content"] == "c2"
+
+    user = _shard_dir(tmp_path, "userA")
+    assert (user / "notes" / f"{note_id}.json").exists()
+    assert (user / "shares" / f"{share_id}.json").exists()
+    assert all(user_layout._is_shard_name(p.name) for p in (tmp_path / "users").iterdir())
+    assert client.get("/metrics").json()["users_layout"] == "sharded"
+
+
+def test_flat_users_move_on_first_access(tmp_path):
+    notes = NotesStore(tmp_path)
+    a = notes.create_note("userA", "a", "one")
+    b = notes.create_note("userB", "b", "two")
+    # a flat user whose id is the name of userA's top-level shard directory
+    clash = user_layout.shard_of("userA")[0]
+    c = notes.create_note(clash, "c", "three")
+    UsersStore(tmp_path).create("userB", "hash")
+    # an interrupted move
+    os.rename(tmp_path / "users" / "userB", tmp_path / "users" / ("userB" + user_layout._MOVING))
+
+    user_layout.set_layout(tmp_path, "sharded")
+    notes = NotesStore(tmp_path)
+    assert notes.get_note("userA", a.id).content == "one"
+    assert notes.get_note("userB", b.id).content == "two"
+    assert notes.get_note(clash, c.id).content == "three"
+    assert UsersStore(tmp_path).get("userB").hashed_password == "hash"
+    for user_id in ("userA", "userB", clash):
+        assert _shard_dir(tmp_path, user_id).is_dir()
+    assert not (tmp_path / "users" / "userA").exists()
+    assert not (tmp_path / "users" / ("userB" + user_layout._MOVING)).exists()
+
+
+
+def test_sharded_lookups_do_not_grow_memory(tmp_path, monkeypatch):
+    NotesStore(tmp_path).create_note("flat", "t", "c")
+    user_layout.set_layout(tmp_path, "sharded")
+    monkeypatch.setattr(user_layout, "_MAX_KNOWN", 2)
+    # a flat user left: users in place are remembered, at most _MAX_KNOWN of them
+    for i in range(5):
+        assert user_layout.user_dir(tmp_path, f"u{i}") == _shard_dir(tmp_path, f"u{i}")
+    st = user_layout._state(tmp_path)
+    assert st.settled is False and list(st.dirs) == ["u3", "u4"]
+
+    assert user_layout.move_user(tmp_path, "flat")
+    user_layout.set_layout(tmp_path, "sharded")
+    # settled: the path is computed, nothing is remembered
+    for i in range(5):
+        assert user_layout.user_dir(tmp_path, f"u{i}") == _shard_dir(tmp_path, f"u{i}")
+    st = user_layout._state(tmp_path)
+    assert st.settled is True and not st.dirs
+
+def test_shard_users_script_both_ways(client, tmp_path):
+    h = {"X-User-Id": "userA"}
+    note_id = client.post("/notes", headers=h, json={"title": "t", "content": "c"}).json()["id"]
+    client.post(f"/notes/{note_id}/lock", headers=h)
+    client.post(f"/shares/notes/{note_id}", headers=h, json={"shared_with_user_id": "userB", "mode": "ro"})
+    UsersStore(tmp_path).create("userC", "hash")
+
+    assert migrate(tmp_path, "sharded") == {"users": 2, "moved": 2, "errors": 0}
+    assert (tmp_path / "users_layout").read_text().strip() == "sharded"
+    assert dict(user_layout.iter_user_dirs(tmp_path)) == {
+        "userA": _shard_dir(tmp_path, "userA"),
+        "userC": _shard_dir(tmp_path, "userC"),
+    }
+    assert migrate(tmp_path, "sharded")["moved"] == 0
+    # recovery scans find the moved files
+    assert len(_LockTable(tmp_path, sweeper=False).locks) == 1
+    assert SharesStore(tmp_path).rebuild_index() == 1
+
+    assert migrate(tmp_path, "flat") == {"users": 2, "moved": 2, "errors": 0}
+    assert sorted(p.name for p in (tmp_path / "users").iterdir()) == ["userA", "userC"]
+    assert NotesStore(tmp_path).get_note("userA", uuid.UUID(note_id)).title == "t"